@@ -1,11 +1,12 @@
-from yaso_tsa.infra.TsaLabels import TsaLabels
+from yaso_tsa.infra.DatasetRegistry import load_dataset, TSA_MD_DEV, TSA_MD_TRAIN
 
 if __name__ == '__main__':
     '''
     This script demonstrates how to read the TSA-MD data files into TsaLabels objects.
+    The parsed files are cached (see DatasetRegistry), so the next runs do not parse them again.
     '''
-    dev = TsaLabels.read_json(path='TSA-MD.dev.json')
-    train = TsaLabels.read_json(path='TSA-MD.train.json')
+    dev = load_dataset(TSA_MD_DEV)
+    train = load_dataset(TSA_MD_TRAIN)
     print(f"TSA-MD training data contains: {train}")
     print(f"TSA-MD training development contains: {dev}")
 
@@ -0,0 +1,88 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+'''
+Measure the import time of the yaso_tsa entry points, as reported by "python -X importtime".
+
+Run from the main directory of the repository:
+    python benchmarks/import_time.py
+The median over several runs is reported for each entry point, along with the slowest imported modules.
+Use --output to save the results as json, for tracking them over time.
+'''
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ENTRY_POINTS = [
+    'yaso_tsa',
+    'yaso_tsa.evaluate_tsa',
+    'yaso_tsa.evaluation_server',
+    'yaso_tsa.sample_targets',
+    'yaso_tsa.data.restore_texts',
+]
+
+REPOSITORY_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_import_times(importtime_output):
+    '''
+    Parse the output of "python -X importtime".
+    :return: A dictionary from each imported module to its cumulative import time, in microseconds.
+    '''
+    result = {}
+    for line in importtime_output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, module_name = line[len('import time:'):].split('|')
+        result[module_name.strip()] = int(cumulative)
+    return result
+
+
+def measure(module_name, num_runs):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [REPOSITORY_DIRECTORY, env.get('PYTHONPATH')]))
+    runs = []
+    for _ in range(num_runs):
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module_name}'],
+            env=env, capture_output=True, text=True, check=True)
+        runs.append(parse_import_times(completed.stderr))
+    total = statistics.median(run[module_name] for run in runs)
+    slowest = sorted(runs[-1].items(), key=lambda item: item[1], reverse=True)
+    return {
+        'module': module_name,
+        'median_ms': total / 1000,
+        'slowest_imports_ms': {name: cumulative / 1000 for name, cumulative in slowest[:10] if name != module_name}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the import time of the yaso_tsa entry points.')
+    parser.add_argument('--num_runs', type=int, default=5, help='number of runs per entry point (default: 5)')
+    parser.add_argument('--output', help='path of a json file to save the results to')
+    parser.add_argument('--max_ms', type=float,
+                        help='fail if the import time of an entry point exceeds this number of milliseconds')
+    args = parser.parse_args()
+
+    results = [measure(module_name, args.num_runs) for module_name in ENTRY_POINTS]
+    for result in results:
+        print(f"{result['module']}: {result['median_ms']:.1f} ms")
+        for name, milliseconds in result['slowest_imports_ms'].items():
+            print(f'\t{name}: {milliseconds:.1f} ms')
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.max_ms is not None:
+        too_slow = [result['module'] for result in results if result['median_ms'] > args.max_ms]
+        if too_slow:
+            sys.exit(f'Import time exceeds {args.max_ms} ms: {too_slow}')
+
+
+if __name__ == '__main__':
+    main()
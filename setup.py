@@ -40,6 +40,7 @@ REQUIRED = install_requires
 # What packages are optional?
 EXTRAS = {
     # 'fancy feature': ['django'],
+    'parquet': ['pyarrow'],
 }
 
 # The rest you shouldn't have to touch too much :)
@@ -0,0 +1,82 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import unittest
+
+import numpy
+import pandas as pd
+
+from yaso_tsa.Analysis.Agreement import Agreement, FLEISS_KAPPA, KRIPPENDORFF_ALPHA, NUM_PAIRABLE_ITEMS, \
+    PERCENTAGE_UNANIMOUS, ENTROPY, get_interval_names
+from yaso_tsa.infra.TsaLabels import TsaLabels
+from test_utils import get_test_labels_path
+
+
+class TestAgreement(unittest.TestCase):
+
+    def test_fleiss_kappa(self):
+        # the example of Fleiss (1971), as given in Wikipedia: 10 items, 14 raters, 5 categories
+        counts = [
+            [0, 0, 0, 0, 14],
+            [0, 2, 6, 4, 2],
+            [0, 0, 3, 5, 6],
+            [0, 3, 9, 2, 0],
+            [2, 2, 8, 1, 1],
+            [7, 7, 0, 0, 0],
+            [3, 2, 6, 3, 0],
+            [2, 5, 3, 2, 2],
+            [6, 5, 2, 1, 0],
+            [0, 2, 2, 3, 7]
+        ]
+        self.assertAlmostEqual(Agreement.fleiss_kappa(counts), 0.210, places=3)
+
+    def test_krippendorff_alpha(self):
+        # the nominal example of Krippendorff (2011), with missing answers: 12 units, 5 categories
+        counts = [
+            [3, 0, 0, 0, 0],
+            [0, 3, 1, 0, 0],
+            [0, 0, 4, 0, 0],
+            [0, 0, 4, 0, 0],
+            [0, 4, 0, 0, 0],
+            [1, 1, 1, 1, 0],
+            [0, 0, 0, 4, 0],
+            [3, 1, 0, 0, 0],
+            [0, 4, 0, 0, 0],
+            [0, 0, 0, 0, 3],
+            [2, 0, 0, 0, 0],
+            [0, 0, 1, 0, 0]
+        ]
+        self.assertAlmostEqual(Agreement.krippendorff_alpha(counts), 0.743, places=3)
+
+    def test_entropy(self):
+        entropy = Agreement.entropy([[2, 2], [4, 0], [0, 0]])
+        self.assertAlmostEqual(entropy[0], 1)
+        self.assertAlmostEqual(entropy[1], 0)
+        self.assertTrue(numpy.isnan(entropy[2]))
+
+    def test_compute_with_bootstrap(self):
+        random_state = numpy.random.RandomState(0)
+        num_items = 2000
+        majority = random_state.randint(0, 4, size=num_items)
+        counts = random_state.multinomial(1, [0.1] * 4, size=(num_items, 7)).sum(axis=1)
+        counts[numpy.arange(num_items), majority] += 3
+        frame = pd.DataFrame(counts, columns=['sentiment_positive', 'sentiment_negative', 'sentiment_mixed',
+                                              'sentiment_none'])
+        frame['text'] = [f'sentence {i // 3}' for i in range(num_items)]
+        stats = Agreement.compute(TsaLabels(frame=frame), num_bootstrap_samples=200, random_state=1)
+        self.assertEqual(stats[NUM_PAIRABLE_ITEMS], num_items)
+        for name in [FLEISS_KAPPA, KRIPPENDORFF_ALPHA]:
+            low, high = get_interval_names(name)
+            self.assertLess(stats[low], stats[name])
+            self.assertLess(stats[name], stats[high])
+        # with many answers per item, kappa and alpha are close
+        self.assertAlmostEqual(stats[FLEISS_KAPPA], stats[KRIPPENDORFF_ALPHA], delta=0.01)
+
+    def test_labels_file(self):
+        tsa_labels = TsaLabels.read_json(path=get_test_labels_path())
+        stats = Agreement.compute(tsa_labels, num_bootstrap_samples=0)
+        item_stats = Agreement.get_item_stats(tsa_labels)
+        self.assertEqual(len(item_stats), tsa_labels.get_num_labels())
+        self.assertAlmostEqual(stats[PERCENTAGE_UNANIMOUS], 100 * (item_stats[ENTROPY] == 0).mean())
@@ -3,9 +3,10 @@
 # LICENSE: Apache License 2.0 (Apache-2.0)
 # http://www.apache.org/licenses/LICENSE-2.0
 
+import json
 from unittest import TestCase
 
-from yaso_tsa.Analysis.AnalzyedPredictions import AnalyzedPredictions, EXACT_MATCHER, TARGET_EXTRACTION, F1, PRECISION, RECALL, \
+from yaso_tsa.Analysis.AnalzyedPredictions import AnalyzedPredictions, EXACT_MATCHER, OVERLAP_MATCHER, TARGET_EXTRACTION, F1, PRECISION, RECALL, \
     NUM_PREDICTIONS, NUM_CORRECT, TARGETED_SENTIMENT_ANALYSIS, SENTIMENT_CLASSIFICATION
 from yaso_tsa.infra.TsaData import TsaData
 from yaso_tsa.infra.TsaLabels import TsaLabels
@@ -82,9 +83,55 @@ class TestAnalyzedPredictions(TestCase):
         assert_stat(task_name, label, RECALL, expected_recall)
         assert_stat(task_name, label, F1, expected_f1)
 
+    def test_confusion_matrix(self):
+        analysis = self.create_analysis()
+        confusion_matrix = analysis.get_confusion_matrix()
+        self.assertEqual(confusion_matrix.loc['positive', 'positive'], 2)
+        self.assertEqual(confusion_matrix.loc['negative', 'positive'], 1)
+        self.assertEqual(confusion_matrix.loc['negative', 'negative'], 0)
+        self.assertEqual(confusion_matrix.values.sum(), 3)
+
+    def test_sentiment_averaged_f1(self):
+        analysis = self.create_analysis()
+        self.assertAlmostEqual(analysis.get_stat(stat_name=AnalyzedPredictions.SENTIMENT_PREDICTION_MACRO_F1), 0.4)
+        self.assertAlmostEqual(analysis.get_stat(stat_name=AnalyzedPredictions.SENTIMENT_PREDICTION_MICRO_F1), 2/3)
+        # weighted by the number of labels: 2 positive, with F1 0.8, and 1 negative, with F1 0
+        self.assertAlmostEqual(analysis.get_stat(stat_name=AnalyzedPredictions.SENTIMENT_PREDICTION_WEIGHTED_F1), 1.6/3)
+
     def test_get_stat(self):
         analysis = self.create_analysis()
         with self.assertRaises(RuntimeError):
             analysis.get_stat()
         with self.assertRaises(RuntimeError):
             analysis.get_stat(stat_name='stat name', task_name='task_name')
+
+    def test_analyze_matchers(self):
+        predictions = TsaData.read_json(path=get_test_data_path())
+        tsa_labels = TsaLabels.read_json(path=get_test_labels_path())
+        analyses = AnalyzedPredictions.analyze_matchers(
+            predictions, tsa_labels, matchers=[EXACT_MATCHER, OVERLAP_MATCHER, [EXACT_MATCHER, OVERLAP_MATCHER]])
+        self.assertEqual(list(analyses), ['exact', 'overlap', 'exact+overlap'])
+        stats = AnalyzedPredictions.get_stats_by_matcher(analyses)
+        for matcher in [EXACT_MATCHER, OVERLAP_MATCHER]:
+            expected = AnalyzedPredictions(
+                tsa_data=predictions, labeled_data=tsa_labels, matchers=[matcher]).get_stats()
+            self.assertTrue(expected.fillna(-1).equals(stats[matcher[0]].fillna(-1)))
+
+    def test_grouped_stats(self):
+        with open(get_test_data_path()) as json_file:
+            records = json.load(json_file)
+        for i, record in enumerate(records):
+            record['source'] = 'first' if i == 0 else 'rest'
+        predictions = TsaData.from_json_records(records, meta_fields=['source'])
+        tsa_labels = TsaLabels.read_json(path=get_test_labels_path())
+        analysis = AnalyzedPredictions(tsa_data=predictions, labeled_data=tsa_labels, group_by='source')
+        self.assertEqual(list(analysis.grouped_stats.columns), ['first', 'rest'])
+        for source in ['first', 'rest']:
+            sentences = [record['text'] for record in records if record['source'] == source]
+            expected = AnalyzedPredictions(
+                tsa_data=predictions.select_sentences(sentences),
+                labeled_data=tsa_labels.select_sentences(sentences)).get_stats()
+            for stat_name, value in expected.items():
+                self.assertEqual(analysis.grouped_stats.loc[stat_name, source], value)
+        with self.assertRaises(ValueError):
+            analysis.get_grouped_stats('domain')
@@ -0,0 +1,80 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import json
+import math
+from unittest import TestCase
+
+import numpy
+
+from yaso_tsa.Analysis.AnalzyedPredictions import AnalyzedPredictions, TARGETED_SENTIMENT_ANALYSIS, \
+    SENTIMENT_CLASSIFICATION, TARGET_EXTRACTION, NUM_CORRECT, NUM_PREDICTIONS, PRECISION
+from yaso_tsa.Analysis.Calibration import Calibration, Recalibration, TEMPERATURE, ISOTONIC, MEAN_CONFIDENCE
+from yaso_tsa.infra.SentimentTargets import TARGET_SCORE
+from yaso_tsa.infra.TsaData import TsaData
+from yaso_tsa.infra.TsaLabels import TsaLabels
+from test_utils import get_test_data_path, get_test_labels_path
+
+
+class TestCalibration(TestCase):
+
+    def create_predictions(self):
+        with open(get_test_data_path()) as json_file:
+            records = json.load(json_file)
+        for i, target in enumerate(target for record in records for target in record['targets']):
+            target[TARGET_SCORE] = 0.95 - 0.2 * i
+        return TsaData.from_json_records(records)
+
+    def test_reliability_diagram(self):
+        analysis = AnalyzedPredictions(self.create_predictions(), TsaLabels.read_json(path=get_test_labels_path()))
+        calibration = Calibration(analysis)
+        diagram = calibration.get_reliability_diagram(TARGETED_SENTIMENT_ANALYSIS)
+        self.assertEqual(len(diagram), 10)
+        self.assertEqual(diagram[NUM_PREDICTIONS].sum(), analysis.stats['num predictions'])
+        self.assertAlmostEqual(diagram[NUM_CORRECT].sum() / diagram[NUM_PREDICTIONS].sum(),
+                               analysis.get_stat(task_name=TARGETED_SENTIMENT_ANALYSIS, metric=PRECISION))
+        # the sentiment prediction is evaluated on the correctly extracted targets
+        self.assertEqual(calibration.get_reliability_diagram(SENTIMENT_CLASSIFICATION)[NUM_PREDICTIONS].sum(),
+                         calibration.get_reliability_diagram(TARGET_EXTRACTION)[NUM_CORRECT].sum())
+        stats = calibration.get_calibration_stats()
+        self.assertGreaterEqual(stats[f'{TARGETED_SENTIMENT_ANALYSIS}: ECE'], 0)
+        self.assertLessEqual(stats[f'{TARGETED_SENTIMENT_ANALYSIS}: ECE'],
+                             stats[f'{TARGETED_SENTIMENT_ANALYSIS}: MCE'])
+
+    def test_calibration_errors(self):
+        scores = [0.05, 0.15, 0.95, 0.95, 1.0]
+        is_correct = [False, True, True, False, True]
+        diagram = Calibration.get_reliability_frame(scores, is_correct)
+        self.assertEqual(list(diagram[NUM_PREDICTIONS]), [1, 1, 0, 0, 0, 0, 0, 0, 0, 3])
+        self.assertTrue(math.isnan(diagram[MEAN_CONFIDENCE].iloc[2]))
+        expected_error, maximum_error = Calibration.get_calibration_errors(diagram)
+        self.assertAlmostEqual(expected_error, (0.05 + 0.85 + 3 * (2.9 / 3 - 2 / 3)) / 5)
+        self.assertAlmostEqual(maximum_error, 0.85)
+
+    def test_recalibration(self):
+        random_generator = numpy.random.default_rng(0)
+        scores = random_generator.random(2000)
+        # over-confident predictions
+        is_correct = random_generator.random(2000) < 0.5 + (scores - 0.5) / 2
+        before, _ = Calibration.get_calibration_errors(Calibration.get_reliability_frame(scores, is_correct))
+        for method in [TEMPERATURE, ISOTONIC]:
+            recalibration = Recalibration.fit(scores, is_correct, method=method)
+            calibrated = recalibration.transform(scores)
+            self.assertTrue(numpy.all(numpy.diff(calibrated[numpy.argsort(scores)]) >= -1e-12))
+            after, _ = Calibration.get_calibration_errors(Calibration.get_reliability_frame(calibrated, is_correct))
+            self.assertLess(after, before)
+        self.assertGreater(Recalibration.fit_temperature(scores, is_correct).temperature, 1)
+
+    def test_apply(self):
+        predictions = self.create_predictions()
+        recalibration = Recalibration(TEMPERATURE, temperature=2.)
+        calibrated = recalibration.apply(predictions)
+        original_scores = predictions.get_sentiment_targets().get_frame()[TARGET_SCORE]
+        calibrated_scores = calibrated.get_sentiment_targets().get_frame()[TARGET_SCORE]
+        self.assertAlmostEqual(original_scores.iloc[0], 0.95)
+        self.assertAlmostEqual(calibrated_scores.iloc[0], 1 / (1 + (0.05 / 0.95) ** 0.5))
+        self.assertEqual(calibrated.get_sentences(), predictions.get_sentences())
+        with self.assertRaises(ValueError):
+            Recalibration('unknown')
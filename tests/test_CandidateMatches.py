@@ -0,0 +1,56 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import random
+from collections import Counter
+from unittest import TestCase
+
+import pandas as pd
+
+from yaso_tsa.Analysis.AnalzyedPredictions import EXACT_MATCHER, OVERLAP_MATCHER
+from yaso_tsa.Analysis.CandidateMatches import CandidateMatches
+from yaso_tsa.infra.CategoricalLabel import CategoricalLabel
+from yaso_tsa.infra.LabeledCluster import LabeledCluster
+from yaso_tsa.infra.LabeledSpan import LabeledSpan
+from yaso_tsa.infra.SentimentTargets import SentimentTargets, SENTENCE_TEXT, TARGET_TEXT, TARGET_BEGIN, \
+    TARGET_END, TARGET_SENTIMENT
+
+
+class TestCandidateMatches(TestCase):
+
+    def test_accept_as_all_pairs(self):
+        random_generator = random.Random(0)
+        texts = ['first sentence of the test', 'second sentence of the test', 'third sentence']
+        cluster_labels = []
+        for text in texts[:2]:
+            spans = []
+            for _ in range(4):
+                begin = random_generator.randrange(0, 12)
+                spans.append(LabeledSpan(text=text, begin=begin, end=begin + random_generator.randrange(1, 5),
+                                         label=CategoricalLabel(Counter({'positive': 1}))))
+            cluster_labels += LabeledCluster.create_clusters(spans)
+        records = []
+        for _ in range(40):
+            text = random_generator.choice(texts)
+            begin = random_generator.randrange(0, 14)
+            end = begin + random_generator.randrange(1, 5)
+            records.append({SENTENCE_TEXT: text, TARGET_TEXT: text[begin:end], TARGET_BEGIN: begin, TARGET_END: end,
+                            TARGET_SENTIMENT: 'positive'})
+        predictions = SentimentTargets(pd.DataFrame(records))
+        candidate_matches = CandidateMatches(cluster_labels, predictions)
+        # a custom matcher, that also accepts predictions that do not overlap the cluster
+        same_sentence_matcher = ('same sentence', lambda cluster, prediction: cluster.text == prediction.text)
+        for matchers in [[EXACT_MATCHER], [OVERLAP_MATCHER], [EXACT_MATCHER, OVERLAP_MATCHER],
+                         [EXACT_MATCHER, same_sentence_matcher]]:
+            expected = []
+            for prediction_i, prediction in enumerate(candidate_matches.labeled_spans):
+                for cluster_i, cluster in enumerate(cluster_labels):
+                    for matcher in matchers:
+                        if matcher[1](cluster, prediction):
+                            expected.append((prediction_i, cluster_i, matcher[0]))
+                            break
+            self.assertEqual(candidate_matches.accept(matchers), expected)
+        self.assertTrue(len(candidate_matches.pairs) < len(cluster_labels) * len(records))
+        self.assertTrue(len(candidate_matches.accept([same_sentence_matcher])) > len(candidate_matches.pairs))
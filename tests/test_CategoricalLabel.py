@@ -6,7 +6,10 @@
 from unittest import TestCase
 from collections import Counter
 
-from yaso_tsa.infra.CategoricalLabel import CategoricalLabel
+import numpy
+import pandas as pd
+
+from yaso_tsa.infra.CategoricalLabel import CategoricalLabel, CategoricalLabels
 
 
 class TestCategoricalLabel(TestCase):
@@ -40,3 +43,31 @@ class TestCategoricalLabel(TestCase):
         label = CategoricalLabel.from_series(labels, index_label='label')
         self.assertTrue(label.most_common_label, 'positive')
         self.assertTrue(label.most_common_count, 1)
+
+    def test_from_frame_matches_from_series(self):
+        random_state = numpy.random.RandomState(0)
+        frame = pd.DataFrame({
+            'positive_count': random_state.randint(0, 3, size=200),
+            'negative_count': random_state.randint(0, 3, size=200),
+            'mixed_count': random_state.randint(0, 2, size=200),
+            'label': random_state.choice(['positive', 'none'], size=200)
+        })
+        labels_to_columns = {
+            'positive': 'positive_count',
+            'negative': 'negative_count',
+            'mixed': 'mixed_count',
+            'unknown': 'missing_column'
+        }
+        batch = CategoricalLabels.from_frame(frame, index_label='label', labels_to_columns=labels_to_columns)
+        self.assertEqual(len(batch), 200)
+        for i, (_, row) in enumerate(frame.iterrows()):
+            expected = CategoricalLabel(
+                Counter({label: row[column] for label, column in labels_to_columns.items()
+                         if column in row.index and row[column] > 0}) or Counter({row['label']: 1}))
+            label = batch[i]
+            self.assertEqual(label.counter, expected.counter)
+            self.assertEqual(label.most_common_label, expected.most_common_label)
+            self.assertEqual(label.most_common_count, expected.most_common_count)
+            self.assertEqual(label.is_inconclusive, expected.is_inconclusive)
+            self.assertEqual(batch.is_unanimous[i], expected.is_unanimous())
+            self.assertEqual(batch.get_most_common_labels()[i], expected.most_common_label)
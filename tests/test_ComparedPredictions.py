@@ -0,0 +1,55 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import json
+from unittest import TestCase
+
+from yaso_tsa.Analysis.AnalzyedPredictions import TARGETED_SENTIMENT_ANALYSIS, F1
+from yaso_tsa.Analysis.ComparedPredictions import ComparedPredictions, FLIP, INCORRECT_TO_CORRECT, DELTA, P_VALUE, \
+    NUM_ONLY_FIRST_CORRECT, NUM_ONLY_SECOND_CORRECT
+from yaso_tsa.infra.SentimentTargets import TARGET_TEXT
+from yaso_tsa.infra.TsaData import TsaData
+from yaso_tsa.infra.TsaLabels import TsaLabels
+from test_utils import get_test_data_path, get_test_labels_path
+
+
+class TestComparedPredictions(TestCase):
+
+    def create_comparison(self):
+        with open(get_test_data_path()) as json_file:
+            records = json.load(json_file)
+        predictions = TsaData.from_json_records(records)
+        # the second prediction set gets the sentiment of the color right
+        records[1]['targets'][1]['sentiment'] = 'negative'
+        other_predictions = TsaData.from_json_records(records)
+        return ComparedPredictions(
+            predictions, other_predictions, labeled_data=TsaLabels.read_json(path=get_test_labels_path()))
+
+    def test_flips(self):
+        comparison = self.create_comparison()
+        self.assertEqual(len(comparison.get_aligned_predictions()), 3)
+        flips = comparison.get_flips()
+        self.assertEqual(list(flips[TARGET_TEXT]), ['color'])
+        self.assertEqual(list(flips[FLIP]), [INCORRECT_TO_CORRECT])
+        sentence_flips = comparison.get_sentence_flips()
+        self.assertEqual(list(sentence_flips.index), ['This is a great car, with an ugly color'])
+        self.assertEqual(list(sentence_flips[DELTA]), [1])
+
+    def test_deltas_and_tests(self):
+        comparison = self.create_comparison()
+        f1_name = f'{TARGETED_SENTIMENT_ANALYSIS}: {F1}'
+        self.assertAlmostEqual(comparison.get_stat_deltas().loc[f1_name, DELTA], 1 / 3)
+        mcnemar = comparison.mcnemar_test()
+        self.assertEqual(mcnemar[NUM_ONLY_FIRST_CORRECT], 0)
+        self.assertEqual(mcnemar[NUM_ONLY_SECOND_CORRECT], 1)
+        self.assertEqual(mcnemar[P_VALUE], 1)
+        bootstrap = comparison.paired_bootstrap(num_samples=100, random_state=0)
+        self.assertAlmostEqual(bootstrap[DELTA], 1 / 3)
+        self.assertGreaterEqual(bootstrap[P_VALUE], 0)
+
+    def test_binomial_test(self):
+        # two-sided p-value of 1 out of 10
+        self.assertAlmostEqual(ComparedPredictions.binomial_test(1, 10), 22 / 1024)
+        self.assertEqual(ComparedPredictions.binomial_test(0, 0), 1)
@@ -0,0 +1,103 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from yaso_tsa.infra.DatasetRegistry import DatasetRegistry, TSA_MD_DEV, SEMEVAL, YASO
+from yaso_tsa.infra.TsaLabels import TsaLabels
+from test_utils import get_test_labels_path, get_test_xml_data_path
+
+
+class TestDatasetRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.temporary_directory.name, 'cache')
+        self.labels_path = os.path.join(self.temporary_directory.name, 'labels.json')
+        shutil.copyfile(get_test_labels_path(), self.labels_path)
+        self.num_reads = 0
+
+    def tearDown(self):
+        self.temporary_directory.cleanup()
+
+    def read_json(self, path):
+        self.num_reads += 1
+        return TsaLabels.read_json(path)
+
+    def create_registry(self, **kwargs):
+        registry = DatasetRegistry(cache_dir=self.cache_dir, **kwargs)
+        registry.register('labels', self.read_json, default_path=self.labels_path)
+        return registry
+
+    def test_memory_cache(self):
+        registry = self.create_registry(use_disk_cache=False)
+        first = registry.load('labels')
+        second = registry.load('labels')
+        self.assertEqual(self.num_reads, 1)
+        self.assertEqual(second.get_num_labels(), 4)
+        pd.testing.assert_frame_equal(first.get_frame(), second.get_frame())
+        # modified labels do not change the cached labels
+        first.add_property('new_column', 1)
+        second.get_frame()['other_column'] = 1
+        second.get_sentences_frame()['sentence_column'] = 1
+        third = registry.load('labels')
+        self.assertNotIn('new_column', third.get_frame().columns)
+        self.assertNotIn('other_column', third.get_frame().columns)
+        self.assertNotIn('sentence_column', third.get_sentences_frame().columns)
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+    def test_disk_cache(self):
+        loaded = self.create_registry().load('labels')
+        cached = self.create_registry().load('labels')
+        self.assertEqual(self.num_reads, 1)
+        pd.testing.assert_frame_equal(loaded.get_frame(), cached.get_frame())
+        pd.testing.assert_frame_equal(loaded.get_sentences_frame(), cached.get_sentences_frame())
+
+    def test_stale_cache(self):
+        registry = self.create_registry()
+        registry.load('labels')
+        stat = os.stat(self.labels_path)
+        os.utime(self.labels_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        registry.load('labels')
+        self.assertEqual(self.num_reads, 2)
+        self.create_registry().load('labels')
+        self.assertEqual(self.num_reads, 2)
+
+    def test_corrupt_cache(self):
+        registry = self.create_registry()
+        registry.load('labels')
+        with open(registry.get_cache_path('labels', os.path.abspath(self.labels_path)), 'wb') as f:
+            f.write(b'not a pickle')
+        self.assertEqual(self.create_registry().load('labels').get_num_labels(), 4)
+        self.assertEqual(self.num_reads, 2)
+
+    def test_least_recently_used(self):
+        registry = self.create_registry(max_size=1, use_disk_cache=False)
+        registry.load('labels')
+        registry.load(TSA_MD_DEV)
+        self.assertEqual([name for name, _ in registry.keys()], [TSA_MD_DEV])
+        registry.load('labels')
+        self.assertEqual(self.num_reads, 2)
+
+    def test_builtin_datasets(self):
+        registry = self.create_registry(use_disk_cache=False)
+        self.assertEqual(registry.load(TSA_MD_DEV).get_num_labels(), 311)
+        semeval = registry.load(SEMEVAL, path=get_test_xml_data_path())
+        self.assertEqual(semeval.get_num_labels(), len(TsaLabels.read_xml(get_test_xml_data_path()).get_frame()))
+        with self.assertRaises(ValueError):
+            registry.load(SEMEVAL)
+        with self.assertRaises(ValueError):
+            registry.load('unknown')
+        with self.assertRaises(FileNotFoundError):
+            registry.load(YASO, path=os.path.join(self.temporary_directory.name, 'yaso.json'))
+
+
+if __name__ == '__main__':
+    unittest.main()
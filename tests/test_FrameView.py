@@ -0,0 +1,52 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import unittest
+
+import pandas as pd
+
+from yaso_tsa.infra.FrameView import FrameView
+
+
+class TestFrameView(unittest.TestCase):
+
+    def test_chained_selections(self):
+        frame = pd.DataFrame({'a': [0, 1, 2, 3, 4], 'b': list('vwxyz')})
+        view = FrameView(frame).select([True, False, True, True, True]).select([2, 0, 1])
+        self.assertTrue(view.is_view())
+        self.assertEqual(len(view), 3)
+        self.assertListEqual(list(view.get_column('b')), ['y', 'v', 'x'])
+        self.assertListEqual(list(view.get_frame()['a']), [3, 0, 2])
+        self.assertFalse(view.is_view())
+
+    def test_copy_on_write(self):
+        frame = pd.DataFrame({'a': [0, 1, 2]})
+        rows = FrameView(frame)
+        view = rows.select([False, True, True])
+        # the frame is shared with the view, so it is copied before it is modified
+        rows.get_writable_frame()['a'] = 10
+        self.assertListEqual(list(view.get_frame()['a']), [1, 2])
+        view.get_writable_frame()['a'] = 20
+        self.assertListEqual(list(rows.get_frame()['a']), [10, 10, 10])
+        # a frame that was passed as shared is never modified
+        shared = FrameView(frame, is_shared=True)
+        shared.get_writable_frame()['a'] = 30
+        self.assertListEqual(list(frame['a']), [0, 1, 2])
+
+    def test_returned_frame_is_not_modified(self):
+        rows = FrameView(pd.DataFrame({'a': [0, 1, 2]}))
+        returned = rows.get_frame()
+        rows.get_writable_frame()['a'] = 10
+        self.assertListEqual(list(returned['a']), [0, 1, 2])
+        self.assertListEqual(list(rows.get_frame()['a']), [10, 10, 10])
+
+    def test_read_frame_is_not_copied(self):
+        frame = pd.DataFrame({'a': [0, 1, 2]})
+        rows = FrameView(frame)
+        self.assertIs(rows.read_frame(), frame)
+        # the read frame is not kept, so the rows are modified in place
+        self.assertIs(rows.get_writable_frame(), frame)
+        rows.get_frame()
+        self.assertIsNot(rows.get_writable_frame(), frame)
@@ -0,0 +1,59 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import copy
+import json
+import unittest
+
+from yaso_tsa.Analysis.AnalzyedPredictions import AnalyzedPredictions
+from yaso_tsa.Analysis.IncrementalAnalyzedPredictions import IncrementalAnalyzedPredictions
+from yaso_tsa.Analysis.LabelIndex import LabelIndex
+from yaso_tsa.infra.TsaData import TsaData
+from yaso_tsa.infra.TsaLabels import TsaLabels
+from test_utils import get_test_data_path, get_test_labels_path
+
+
+class TestIncrementalAnalyzedPredictions(unittest.TestCase):
+
+    def setUp(self):
+        self.label_index = LabelIndex(TsaLabels.read_json(path=get_test_labels_path()))
+        with open(get_test_data_path(), encoding='utf-8') as f:
+            self.predictions = json.load(f)
+
+    def assert_same_stats(self, stats, tsa_data):
+        expected = AnalyzedPredictions(tsa_data=tsa_data, label_index=self.label_index).get_stats()
+        self.assertSetEqual(set(stats.index), set(expected.index))
+        for name, value in expected.items():
+            self.assertAlmostEqual(stats[name], value, msg=name)
+
+    def test_update(self):
+        incremental = IncrementalAnalyzedPredictions(self.label_index)
+        tsa_data = TsaData.from_json_records(self.predictions)
+        self.assert_same_stats(incremental.update(tsa_data), tsa_data)
+        self.assertEqual(incremental.num_rematched_sentences, 3)
+
+        # an update with the same predictions does not match any sentence again
+        self.assert_same_stats(incremental.update(tsa_data), tsa_data)
+        self.assertEqual(incremental.num_rematched_sentences, 0)
+
+        changed = copy.deepcopy(self.predictions)
+        changed[1]['targets'][1]['sentiment'] = 'negative'
+        tsa_data = TsaData.from_json_records(changed)
+        self.assert_same_stats(incremental.update(tsa_data), tsa_data)
+        self.assertEqual(incremental.num_rematched_sentences, 1)
+
+    def test_removed_sentences(self):
+        incremental = IncrementalAnalyzedPredictions(self.label_index)
+        incremental.update(TsaData.from_json_records(self.predictions))
+        tsa_data = TsaData.from_json_records(self.predictions[1:])
+        self.assert_same_stats(incremental.update(tsa_data), tsa_data)
+        self.assertEqual(incremental.num_rematched_sentences, 0)
+
+    def test_hash_does_not_depend_on_target_order(self):
+        reordered = copy.deepcopy(self.predictions)
+        reordered[1]['targets'].reverse()
+        hashes = IncrementalAnalyzedPredictions.hash_sentences(TsaData.from_json_records(self.predictions))
+        reordered_hashes = IncrementalAnalyzedPredictions.hash_sentences(TsaData.from_json_records(reordered))
+        self.assertTrue(hashes.equals(reordered_hashes))
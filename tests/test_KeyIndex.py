@@ -0,0 +1,45 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import unittest
+
+import pandas as pd
+
+from yaso_tsa.infra.KeyIndex import KeyIndex
+from yaso_tsa.infra.SentimentTargets import SENTENCE_TEXT, TARGET_BEGIN, TARGET_END
+from yaso_tsa.infra.TsaLabels import TsaLabels
+from test_utils import get_test_labels_path
+
+
+class TestKeyIndex(unittest.TestCase):
+
+    def test_contains_spans(self):
+        labels_index = KeyIndex.for_spans(TsaLabels.read_json(path=get_test_labels_path()).get_frame())
+        self.assertEqual(len(labels_index), 4)
+        lookup = pd.DataFrame({
+            'sentence': ['This is a great car', 'This is a great car', 'Not a labeled sentence'],
+            'begin': [16, 16, 16],
+            'end': [19, 18, 19]
+        })
+        found = labels_index.contains(lookup, key_columns=['sentence', 'begin', 'end'])
+        self.assertListEqual(list(found), [True, False, False])
+
+    def test_offsets_compared_as_integers(self):
+        labels = pd.DataFrame({SENTENCE_TEXT: ['a car'], TARGET_BEGIN: ['2'], TARGET_END: ['5']})
+        lookup = pd.DataFrame({SENTENCE_TEXT: ['a car'], TARGET_BEGIN: [2], TARGET_END: [5]})
+        self.assertListEqual(list(KeyIndex.for_spans(labels).contains(lookup)), [True])
+
+    def test_empty_index(self):
+        labels_index = KeyIndex.for_spans(TsaLabels().get_frame())
+        self.assertEqual(len(labels_index), 0)
+        lookup = pd.DataFrame({SENTENCE_TEXT: ['a car'], TARGET_BEGIN: [2], TARGET_END: [5]})
+        self.assertListEqual(list(labels_index.contains(lookup)), [False])
+
+    def test_semi_and_anti_join(self):
+        frame = pd.DataFrame({'key': ['a', 'b', 'c', 'a'], 'value': [1, 2, 3, 4]})
+        other = pd.DataFrame({'key': ['a', 'd']})
+        self.assertListEqual(list(KeyIndex.semi_join(frame, other, key_columns=['key'])['value']), [1, 4])
+        self.assertListEqual(list(KeyIndex.anti_join(frame, other, key_columns=['key'])['value']), [2, 3])
+        self.assertEqual(len(KeyIndex.anti_join(frame, other.iloc[:0], key_columns=['key'])), 4)
@@ -0,0 +1,30 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import unittest
+
+from yaso_tsa.Analysis.AnalzyedPredictions import AnalyzedPredictions
+from yaso_tsa.Analysis.LabelIndex import LabelIndex
+from yaso_tsa.infra.TsaData import TsaData
+from yaso_tsa.infra.TsaLabels import TsaLabels
+from test_utils import get_test_data_path, get_test_labels_path
+
+
+class TestLabelIndex(unittest.TestCase):
+
+    def test_get_clusters(self):
+        tsa_labels = TsaLabels.read_json(path=get_test_labels_path())
+        label_index = LabelIndex(tsa_labels)
+        self.assertEqual(label_index.get_num_clusters(), len(tsa_labels.get_valid_targets().as_labeled_clusters()))
+        self.assertEqual(len(label_index.get_clusters(sentences=['This is a great car'])), 1)
+        self.assertEqual(len(label_index.get_clusters(sentences=['Not a labeled sentence'])), 0)
+        self.assertEqual(len(label_index.non_targets_index), 1)
+
+    def test_evaluate_with_label_index(self):
+        predictions = TsaData.read_json(path=get_test_data_path())
+        tsa_labels = TsaLabels.read_json(path=get_test_labels_path())
+        expected = AnalyzedPredictions(tsa_data=predictions, labeled_data=tsa_labels).get_stats()
+        stats = AnalyzedPredictions(tsa_data=predictions, label_index=LabelIndex(tsa_labels)).get_stats()
+        self.assertDictEqual(expected.to_dict(), stats.to_dict())
@@ -3,10 +3,15 @@
 # LICENSE: Apache License 2.0 (Apache-2.0)
 # http://www.apache.org/licenses/LICENSE-2.0
 
+from collections import Counter
 from unittest import TestCase
 
+import numpy
+
+from yaso_tsa.infra.CategoricalLabel import CategoricalLabel
 from yaso_tsa.infra.LabeledCluster import LabeledCluster
 from yaso_tsa.infra.LabeledSpan import LabeledSpan
+from yaso_tsa.infra.LabeledTarget import LabeledTarget
 import pandas as pd
 
 
@@ -42,4 +47,36 @@ class TestLabeledSpan(TestCase):
         clusters = LabeledCluster.create_clusters(labeled_targets)
         self.assertEqual(len(clusters), 3)
 
+    def test_assign_clusters_as_create_clusters(self):
+        random_state = numpy.random.RandomState(0)
+        begins = random_state.randint(0, 60, size=300)
+        frame = pd.DataFrame({
+            'text': [f'sentence {i}' + ' ' * 80 for i in random_state.randint(0, 20, size=300)],
+            'target_text': 'x',
+            'location_begin': begins,
+            'location_end': begins + random_state.randint(1, 6, size=300),
+            'sentiment': random_state.choice(['positive', 'negative'], size=300)
+        })
+        cluster_ids = LabeledCluster.assign_clusters(frame)
+        expected = set()
+        for _, sentence_frame in frame.groupby('text'):
+            for cluster in LabeledCluster.create_clusters(LabeledTarget.create(frame=sentence_frame)):
+                expected.add((cluster.text, cluster.span.left, cluster.span.right))
+        clusters, members = LabeledCluster.get_cluster_frames(frame)
+        self.assertEqual(len(clusters), len(expected))
+        self.assertEqual(set(zip(clusters['text'], clusters['location_begin'], clusters['location_end'])), expected)
+        self.assertEqual(len(members), len(frame))
+        self.assertEqual(clusters['num_items'].sum(), len(frame))
+        self.assertEqual(len(set(cluster_ids)), len(expected))
 
+    def test_to_frame(self):
+        text = 'some text which is not very short'
+        labeled_spans = [
+            LabeledSpan(text=text, begin=5, end=8, label=CategoricalLabel(Counter(positive=2))),
+            LabeledSpan(text=text, begin=5, end=15, label=CategoricalLabel(Counter(positive=1, negative=1)))
+        ]
+        frame = LabeledCluster.to_frame(LabeledCluster.create_clusters(labeled_spans))
+        self.assertEqual(len(frame), 1)
+        self.assertEqual(frame['sentiment'][0], 'positive')
+        self.assertEqual(frame['detected_positive'][0], 3)
+        self.assertEqual(frame['target_text_1'][0], 'text which')
@@ -0,0 +1,96 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import json
+import math
+import os
+import random
+import tempfile
+from unittest import TestCase
+
+from yaso_tsa.Analysis.AnalzyedPredictions import AnalyzedPredictions, EXACT_MATCHER, OVERLAP_MATCHER
+from yaso_tsa.Analysis.LabelIndex import LabelIndex
+from yaso_tsa.Analysis.LightweightEvaluator import LightweightEvaluator
+from yaso_tsa.infra.TsaData import TsaData
+from yaso_tsa.infra.TsaLabels import TsaLabels
+from test_utils import get_test_data_path, get_test_labels_path
+
+SENTIMENTS = ['positive', 'negative', 'mixed', 'none']
+
+
+def create_records(random_generator, num_sentences):
+    '''
+    :return: Random labels and predictions records of the same sentences, in the json format.
+    '''
+    words = ['food', 'service', 'the', 'car', 'is', 'great', 'bad', 'screen', 'price', 'room']
+    labels, predictions = [], []
+    for sentence_i in range(num_sentences):
+        tokens = [random_generator.choice(words) for _ in range(random_generator.randint(3, 8))]
+        text = ' '.join(tokens) + f' {sentence_i}'
+        offsets = []
+        for token in tokens:
+            begin = offsets[-1][1] + 1 if offsets else 0
+            offsets.append((begin, begin + len(token)))
+
+        def create_targets(num_targets, sentiments, **fields):
+            spans = set()
+            for _ in range(num_targets):
+                first = random_generator.randrange(len(tokens))
+                last = min(len(tokens) - 1, first + random_generator.choice([0, 0, 1]))
+                spans.add((offsets[first][0], offsets[last][1]))
+            return [{'text': text[begin:end], 'location': {'begin': begin, 'end': end},
+                     'sentiment': random_generator.choice(sentiments), **fields}
+                    for begin, end in sorted(spans)]
+
+        labels.append({'text': text, 'targets': create_targets(random_generator.randint(0, 4), SENTIMENTS)})
+        predictions.append({'text': text, 'targets': create_targets(
+            random_generator.randint(0, 4), SENTIMENTS[:3] + ['neutral'], confidence=0.5)})
+    return labels, predictions
+
+
+class TestLightweightEvaluator(TestCase):
+
+    def assert_stats_equal(self, stats, expected_stats):
+        for stat_name, value in stats.items():
+            if value is None:
+                self.assertIsNone(expected_stats[stat_name], stat_name)
+            elif math.isnan(value):
+                self.assertTrue(math.isnan(expected_stats[stat_name]), stat_name)
+            else:
+                self.assertAlmostEqual(value, expected_stats[stat_name], msg=stat_name)
+
+    def test_as_analyzed_predictions(self):
+        label_index = LabelIndex(TsaLabels.read_json(path=get_test_labels_path()))
+        with open(get_test_data_path()) as json_file:
+            records = json.load(json_file)
+        for matchers in [[EXACT_MATCHER], [OVERLAP_MATCHER]]:
+            expected_stats = AnalyzedPredictions(
+                tsa_data=TsaData.from_json_records(records), label_index=label_index, matchers=matchers).stats
+            evaluator = LightweightEvaluator(label_index, matchers=matchers)
+            predictions = LightweightEvaluator.from_json_records(records)
+            self.assert_stats_equal(evaluator.evaluate(predictions), expected_stats)
+            self.assert_stats_equal(evaluator.evaluate_all_stats(predictions), expected_stats)
+
+    def test_random_as_analyzed_predictions(self):
+        random_generator = random.Random(0)
+        labels, predictions = create_records(random_generator, num_sentences=50)
+        with tempfile.TemporaryDirectory() as directory:
+            labels_path = os.path.join(directory, 'labels.json')
+            with open(labels_path, 'w') as json_file:
+                json.dump(labels, json_file)
+            label_index = LabelIndex(TsaLabels.read_json(path=labels_path))
+        for matchers in [[EXACT_MATCHER], [OVERLAP_MATCHER], [EXACT_MATCHER, OVERLAP_MATCHER]]:
+            evaluator = LightweightEvaluator(label_index, matchers=matchers)
+            for _ in range(5):
+                batch = random_generator.sample(predictions, 10)
+                expected_stats = AnalyzedPredictions(
+                    tsa_data=TsaData.from_json_records(batch), label_index=label_index, matchers=matchers).stats
+                self.assert_stats_equal(
+                    evaluator.evaluate_all_stats(LightweightEvaluator.from_json_records(batch)), expected_stats)
+
+    def test_unsupported_matcher(self):
+        label_index = LabelIndex(TsaLabels.read_json(path=get_test_labels_path()))
+        with self.assertRaises(ValueError):
+            LightweightEvaluator(label_index, matchers=[('custom', lambda cluster, span: True)])
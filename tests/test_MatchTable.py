@@ -0,0 +1,44 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import pickle
+from unittest import TestCase
+
+from yaso_tsa.Analysis.AnalzyedPredictions import AnalyzedPredictions, EXACT_MATCHER, OVERLAP_MATCHER, PREDICTION, \
+    LABELS, MATCH_TYPES
+from yaso_tsa.infra.TsaData import TsaData
+from yaso_tsa.infra.TsaLabels import TsaLabels
+from test_utils import get_test_data_path, get_test_labels_path
+
+
+class TestMatchTable(TestCase):
+
+    def test_as_matched_frames(self):
+        analysis = AnalyzedPredictions(
+            tsa_data=TsaData.read_json(path=get_test_data_path()),
+            labeled_data=TsaLabels.read_json(path=get_test_labels_path()),
+            matchers=[EXACT_MATCHER, OVERLAP_MATCHER])
+        match_table = pickle.loads(pickle.dumps(analysis.predictions_match_table))
+        matched_predictions = analysis.matched_predictions
+        self.assertEqual(list(match_table.get_num_matches_per_prediction()), list(matched_predictions['# labels']))
+        self.assertEqual(list(match_table.get_match_types()),
+                         [match_type for match_types in matched_predictions[MATCH_TYPES] for match_type in match_types])
+        for prediction_id, (prediction, clusters) in enumerate(
+                zip(matched_predictions[PREDICTION], matched_predictions[LABELS])):
+            resolved = match_table.get_prediction(prediction_id)
+            self.assertTrue(resolved.is_same_span(prediction))
+            self.assertEqual(resolved.label.counter, prediction.label.counter)
+            resolved_clusters = [match_table.get_cluster(cluster_id)
+                                 for cluster_id in match_table.get_matched_cluster_ids(prediction_id)]
+            self.assertEqual([cluster.span for cluster in resolved_clusters], [cluster.span for cluster in clusters])
+            self.assertEqual([cluster.majority_label() for cluster in resolved_clusters],
+                             [cluster.majority_label() for cluster in clusters])
+
+        labels_match_table = analysis.labels_match_table
+        # the tables are built once, and share the tables of the clusters
+        self.assertIs(analysis.labels_match_table, labels_match_table)
+        self.assertIs(labels_match_table.clusters, analysis.predictions_match_table.clusters)
+        self.assertEqual(list(labels_match_table.get_num_matches_per_cluster()),
+                         list(analysis.matched_labels['# predictions']))
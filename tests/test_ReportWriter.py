@@ -0,0 +1,49 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import tempfile
+from unittest import TestCase
+
+import pandas as pd
+
+from yaso_tsa.Analysis.AnalzyedPredictions import AnalyzedPredictions
+from yaso_tsa.Analysis.ReportWriter import ReportWriter, CSV, CSV_GZ
+from yaso_tsa.infra.TsaData import TsaData
+from yaso_tsa.infra.TsaLabels import TsaLabels
+from test_utils import get_test_data_path, get_test_labels_path
+
+
+class TestReportWriter(TestCase):
+
+    def create_analysis(self):
+        return AnalyzedPredictions(
+            tsa_data=TsaData.read_json(path=get_test_data_path()),
+            labeled_data=TsaLabels.read_json(path=get_test_labels_path()))
+
+    def test_write_long_reports(self):
+        analysis = self.create_analysis()
+        with tempfile.TemporaryDirectory() as directory:
+            paths = ReportWriter(report_format=CSV_GZ).write(analysis, directory)
+            self.assertEqual(set(paths), {'all', 'labeled', 'predictions', 'prediction_matches', 'clusters',
+                                          'cluster_members', 'cluster_matches'})
+            predictions = pd.read_csv(paths['predictions'])
+            self.assertEqual(len(predictions), len(analysis.matched_predictions))
+            self.assertEqual(predictions[AnalyzedPredictions.TARGET_EXTRACTION_CORRECT].sum(),
+                             analysis.matched_predictions[AnalyzedPredictions.TARGET_EXTRACTION_CORRECT].sum())
+            prediction_matches = pd.read_csv(paths['prediction_matches'])
+            self.assertEqual(len(prediction_matches), analysis.matched_predictions['# labels'].sum())
+            clusters = pd.read_csv(paths['clusters'])
+            self.assertEqual(list(clusters['is_covered_label']), list(analysis.matched_labels['is_covered_label']))
+
+    def test_write_csv_reports(self):
+        analysis = self.create_analysis()
+        with tempfile.TemporaryDirectory() as directory:
+            paths = ReportWriter(report_format=CSV).write(analysis, directory)
+            self.assertIn('matched_predictions', paths)
+            self.assertEqual(len(pd.read_csv(paths['all'])), len(analysis.predictions_with_labels_frame))
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            ReportWriter(report_format='xlsx')
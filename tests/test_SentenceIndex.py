@@ -0,0 +1,31 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import unittest
+
+from yaso_tsa.infra.SentenceIndex import SentenceIndex
+
+
+class TestSentenceIndex(unittest.TestCase):
+
+    def test_index(self):
+        index = SentenceIndex(['b', 'a', 'b', 'c', 'a', 'b'])
+        self.assertEqual(len(index), 3)
+        self.assertListEqual(index.get_sentences(), ['b', 'a', 'c'])
+        self.assertListEqual(list(index.get_rows('b')), [0, 2, 5])
+        self.assertListEqual(list(index.get_rows('c')), [3])
+        self.assertListEqual(list(index.get_rows('d')), [])
+        self.assertListEqual(list(index.get_sentence_sizes()), [3, 2, 1])
+        self.assertListEqual(list(index.rows_mask({'a', 'c', 'd'})), [False, True, False, True, True, False])
+
+    def test_missing_sentences(self):
+        index = SentenceIndex(['a', None, 'a'])
+        self.assertListEqual(index.get_sentences(), ['a'])
+        self.assertListEqual(list(index.rows_mask(['a'])), [True, False, True])
+
+    def test_empty(self):
+        index = SentenceIndex([])
+        self.assertEqual(len(index), 0)
+        self.assertListEqual(list(index.rows_mask(['a'])), [])
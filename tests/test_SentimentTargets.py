@@ -7,8 +7,11 @@ import unittest
 import os
 import pandas as pd
 
-from yaso_tsa.infra.SentimentTargets import SentimentTargets, SENTENCE_TEXT, TARGET_TEXT, TARGET_BEGIN, TARGET_END
-from test_utils import get_test_data_path
+from yaso_tsa.infra.SentimentTargets import SentimentTargets, SENTENCE_TEXT, TARGET_TEXT, TARGET_BEGIN, TARGET_END, \
+    TARGET_SENTIMENT
+from yaso_tsa.infra.TargetFilter import TargetFilter
+from yaso_tsa.infra.TsaLabels import TsaLabels
+from test_utils import get_test_data_path, get_test_labels_path
 
 
 class TestSentimentTargets(unittest.TestCase):
@@ -52,3 +55,67 @@ class TestSentimentTargets(unittest.TestCase):
         self.assertEqual(selected.get_num_targets(), 3)
         selected = sentiment_targets.select_targets(required_sentiment=['negative'])
         self.assertEqual(selected.get_num_targets(), 0)
+
+    def test_select_targets_with_filters(self):
+        sentiment_targets = SentimentTargets.read_json(path=get_test_data_path())
+        frame = sentiment_targets.get_frame()
+        by_function = sentiment_targets.select_targets(condition=lambda row: row[TARGET_TEXT] == 'car')
+        by_filter = sentiment_targets.select_targets(condition=TargetFilter.equals(TARGET_TEXT, 'car'))
+        self.assertEqual(by_filter.get_num_targets(), by_function.get_num_targets())
+        self.assertEqual(
+            sentiment_targets.select_targets(condition=TargetFilter.matches('^c')).get_num_targets(),
+            sum(frame[TARGET_TEXT].str.startswith('c')))
+        short = TargetFilter.span_length(maximum=3)
+        self.assertEqual(
+            sentiment_targets.select_targets(condition=short).get_num_targets(),
+            sum(frame[TARGET_END] - frame[TARGET_BEGIN] <= 3))
+        # all the given conditions should hold
+        selected = sentiment_targets.select_targets(
+            required_sentiment=['positive'],
+            filters=[~short, TargetFilter.between(TARGET_BEGIN, minimum=0)])
+        self.assertEqual(selected.get_num_targets(), sum(frame[TARGET_END] - frame[TARGET_BEGIN] > 3))
+        either = TargetFilter.equals(TARGET_TEXT, 'car') | ~TargetFilter.equals(TARGET_TEXT, 'car')
+        self.assertEqual(sentiment_targets.select_targets(condition=either).get_num_targets(), 3)
+        self.assertEqual(SentimentTargets().select_targets(condition=short).get_num_targets(), 0)
+
+    def test_remove_and_intersect_targets(self):
+        sentiment_targets = SentimentTargets.read_json(path=get_test_data_path())
+        labels = TsaLabels.read_json(path=get_test_labels_path())
+        remaining = sentiment_targets.remove_targets(labels)
+        kept = sentiment_targets.intersect(labels)
+        self.assertEqual(remaining.get_num_targets() + kept.get_num_targets(), sentiment_targets.get_num_targets())
+        self.assertEqual(sentiment_targets.remove_targets(sentiment_targets).get_num_targets(), 0)
+        self.assertEqual(sentiment_targets.intersect(sentiment_targets).get_num_targets(), 3)
+
+    def test_remove_labeled(self):
+        sentiment_targets = SentimentTargets.read_json(path=get_test_data_path())
+        labels = TsaLabels.read_json(path=get_test_labels_path())
+        expected = sum(not labels.is_labeled(target_text, text) for target_text, text in
+                       zip(sentiment_targets.get_frame()[TARGET_TEXT], sentiment_targets.get_frame()[SENTENCE_TEXT]))
+        self.assertEqual(sentiment_targets.remove_labeled(labels).get_num_targets(), expected)
+
+    def test_selections_share_rows(self):
+        sentiment_targets = SentimentTargets.read_json(path=get_test_data_path())
+        frame = sentiment_targets.get_frame()
+        expected_order = frame.sample(frac=1, random_state=SentimentTargets.get_random_state())
+        self.assertListEqual(
+            list(sentiment_targets.shuffle().get_frame().index), list(expected_order.index))
+        selected = sentiment_targets.select_sentences(['This is a great car, with an ugly color'])\
+            .select_targets(required_sentiment=['positive'])
+        self.assertEqual(selected.get_num_targets(), 2)
+        # modifying the selection does not modify the targets it was selected from, and vice versa
+        selected.add_property('flag', 1)
+        sentiment_targets.update_sentiment(old='positive', new='negative')
+        self.assertNotIn('flag', sentiment_targets.get_frame().columns)
+        self.assertListEqual(list(selected.get_frame()[TARGET_SENTIMENT]), ['positive', 'positive'])
+        self.assertListEqual(list(sentiment_targets.get_frame()[TARGET_SENTIMENT]), ['negative'] * 3)
+
+    def test_frames_are_not_shared(self):
+        sentiment_targets = SentimentTargets.read_json(get_test_data_path())
+        from_frame = SentimentTargets(frame=sentiment_targets.get_frame())
+        sentiment_targets.update_sentiment(old='positive', new='negative')
+        self.assertListEqual(list(from_frame.get_frame()[TARGET_SENTIMENT]), ['positive'] * 3)
+        frame = from_frame.get_frame().copy()
+        from_copy = SentimentTargets(frame=frame)
+        frame[TARGET_SENTIMENT] = 'none'
+        self.assertListEqual(list(from_copy.get_frame()[TARGET_SENTIMENT]), ['positive'] * 3)
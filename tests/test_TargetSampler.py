@@ -0,0 +1,94 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import json
+import os
+import tempfile
+import unittest
+from collections import Counter
+
+import numpy
+
+from yaso_tsa.infra.JsonRecordReader import JsonRecordReader
+from yaso_tsa.infra.SentimentTargets import SentimentTargets, TARGET_SENTIMENT, TARGET_TEXT
+from yaso_tsa.infra.TargetSampler import TargetSampler
+from yaso_tsa.infra.TsaLabels import TsaLabels
+from test_utils import get_test_data_path, get_test_labels_path
+
+
+def create_records(num_sentences):
+    sentiments = ['positive', 'negative', 'neutral']
+    return [
+        {'text': f'sentence {i}',
+         'source': 'a' if i % 2 else 'b',
+         'targets': [{'text': 'sentence', 'location': {'begin': 0, 'end': 8},
+                      'sentiment': sentiments[i % 3], 'confidence': (i % 10) / 10}]}
+        for i in range(num_sentences)
+    ]
+
+
+class TestTargetSampler(unittest.TestCase):
+
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temporary_directory.cleanup()
+
+    def test_stratified_positions(self):
+        strata = ['a'] * 5 + ['b'] * 2 + ['c'] * 10
+        positions = TargetSampler.stratified_positions(strata, num_per_stratum=3, random_state=1)
+        self.assertEqual(Counter(strata[i] for i in positions), Counter({'a': 3, 'b': 2, 'c': 3}))
+        self.assertEqual(len(set(positions)), len(positions))
+        same_seed = TargetSampler.stratified_positions(strata, num_per_stratum=3, random_state=1)
+        self.assertListEqual(list(positions), list(same_seed))
+        quotas = TargetSampler.stratified_positions(strata, num_per_stratum={'c': 4}, random_state=1)
+        self.assertEqual(Counter(strata[i] for i in quotas), Counter({'c': 4}))
+
+    def test_confidence_bins(self):
+        bins = TargetSampler.get_confidence_bins([0, 0.75, 1.0, 1.5, numpy.nan])
+        self.assertListEqual(list(bins), ['[0, 0.7)', '[0.7, 0.8)', '[0.9, 1.1)', None, None])
+
+    def test_sample_targets(self):
+        sentiment_targets = SentimentTargets.from_json_records(create_records(30), meta_fields=['source'])
+        sampled = sentiment_targets.group_and_sample_targets(group_column=TARGET_SENTIMENT, num_targets_to_sample=4)
+        self.assertEqual(dict(sampled.get_sentiment_counts()), {'positive': 4, 'negative': 4, 'none': 4})
+        sampled = sentiment_targets.sample_targets(num_targets_to_sample=100, required_sentiment_in_samples=['none'])
+        self.assertEqual(sampled.get_num_targets(), 10)
+
+    def test_sample_by_confidence_with_small_bins(self):
+        tsa_labels = TsaLabels.read_json(path=get_test_labels_path())
+        tsa_labels.add_confidence_bin()
+        sampled = tsa_labels.sample_by_confidence(num_to_sample=10)
+        self.assertEqual(sampled.get_num_labels(), tsa_labels.get_num_labels())
+
+    def test_sample_files(self):
+        records = create_records(200)
+        json_path = os.path.join(self.temporary_directory.name, 'records.json')
+        jsonl_path = os.path.join(self.temporary_directory.name, 'records.jsonl')
+        with open(json_path, 'w') as json_file:
+            json.dump(records, json_file, indent=2)
+        with open(jsonl_path, 'w') as jsonl_file:
+            jsonl_file.writelines(json.dumps(record) + '\n' for record in records)
+        self.assertListEqual(list(JsonRecordReader(json_path, chunk_size=50)), records)
+        self.assertListEqual(list(JsonRecordReader(jsonl_path, chunk_size=50)), records)
+        from_json = TargetSampler.sample_files(json_path, num_per_stratum=5, stratify_by='source', seed=3,
+                                               meta_fields=['source'])
+        from_jsonl = TargetSampler.sample_files(jsonl_path, num_per_stratum=5, stratify_by='source', seed=3,
+                                                meta_fields=['source'])
+        self.assertEqual(dict(from_json.get_frame()['source'].value_counts()), {'a': 5, 'b': 5})
+        self.assertTrue(from_json.get_frame().equals(from_jsonl.get_frame()))
+        by_sentiment = TargetSampler.sample_files(json_path, num_per_stratum=3, stratify_by=TARGET_SENTIMENT)
+        self.assertEqual(dict(by_sentiment.get_sentiment_counts()), {'none': 3, 'positive': 3, 'negative': 3})
+        everything = TargetSampler.sample_files([json_path, jsonl_path], num_per_stratum=1000)
+        self.assertEqual(everything.get_num_targets(), 400)
+
+    def test_reservoir_is_uniform(self):
+        counts = Counter()
+        for seed in range(500):
+            sampled = TargetSampler.sample_files(get_test_data_path(), num_per_stratum=1, seed=seed)
+            counts.update(sampled.get_frame()[TARGET_TEXT])
+        # the test data has two 'car' targets and one 'color' target
+        self.assertAlmostEqual(counts['car'] / 500, 2 / 3, delta=0.08)
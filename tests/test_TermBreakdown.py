@@ -0,0 +1,75 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import json
+from unittest import TestCase
+
+from yaso_tsa.Analysis.AnalzyedPredictions import AnalyzedPredictions, TARGET_EXTRACTION, \
+    TARGETED_SENTIMENT_ANALYSIS, NUM_PREDICTIONS, NUM_LABELED_CLUSTERS, F1
+from yaso_tsa.Analysis.TermBreakdown import TermBreakdown
+from yaso_tsa.infra.TsaData import TsaData
+from yaso_tsa.infra.TsaLabels import TsaLabels
+from test_utils import get_test_data_path, get_test_labels_path
+
+
+class TestTermBreakdown(TestCase):
+
+    def create_breakdown(self, records=None, **kwargs):
+        if records is None:
+            records = self.read_records()
+        analysis = AnalyzedPredictions(TsaData.from_json_records(records),
+                                       TsaLabels.read_json(path=get_test_labels_path()), **kwargs)
+        return analysis, TermBreakdown(analysis)
+
+    @staticmethod
+    def read_records():
+        with open(get_test_data_path()) as json_file:
+            return json.load(json_file)
+
+    def test_term_counts(self):
+        # an unlabeled prediction, that is also an ignore label, is not evaluated, but is subtracted twice by the
+        # evaluation with ignore_unlabeled
+        records = self.read_records()
+        records[0]['targets'].append(
+            {'text': 'great', 'location': {'begin': 10, 'end': 15}, 'sentiment': 'positive', 'confidence': 0.9})
+        ignore_labels = TsaLabels.from_tsa_data(TsaData.from_json_records(records))
+        for kwargs in [{}, {'ignore_unlabeled': True}, {'ignore_unlabeled': True, 'ignore_labels': ignore_labels}]:
+            analysis, breakdown = self.create_breakdown(records, **kwargs)
+            counts = breakdown.term_counts.sum()
+            for task_name, correct_column in [
+                    (TARGET_EXTRACTION, AnalyzedPredictions.TARGET_EXTRACTION_CORRECT),
+                    (TARGETED_SENTIMENT_ANALYSIS, AnalyzedPredictions.FULL_PIPELINE_CORRECT)]:
+                self.assertEqual(counts[correct_column], analysis.get_stat(task_name=task_name, metric='num correct'))
+                num_subtracted_twice = 1 if 'ignore_labels' in kwargs else 0
+                self.assertEqual(counts[NUM_PREDICTIONS] - num_subtracted_twice,
+                                 analysis.get_stat(task_name=task_name, metric='num predictions'), msg=kwargs)
+            self.assertTrue((breakdown.term_counts[NUM_PREDICTIONS] >= 0).all())
+            self.assertEqual(counts[NUM_LABELED_CLUSTERS], analysis.stats[NUM_LABELED_CLUSTERS])
+
+    def test_terms(self):
+        _, breakdown = self.create_breakdown()
+        # the color is extracted, with the wrong sentiment (its span in the test data is "olor")
+        color = breakdown.get_term(' The  Olor')
+        self.assertEqual(color[f'{TARGET_EXTRACTION}: {F1}'], 1)
+        self.assertEqual(color[f'{TARGETED_SENTIMENT_ANALYSIS}: {F1}'], 0)
+        self.assertEqual(color['sentiment prediction: accuracy'], 0)
+        with self.assertRaises(KeyError):
+            breakdown.get_term('unknown')
+        hardest = breakdown.get_hardest_terms()
+        self.assertEqual(hardest.index[0], 'olor')
+        self.assertTrue((hardest[NUM_LABELED_CLUSTERS] >= 1).all())
+        self.assertEqual(list(breakdown.get_hardest_terms(num_terms=1).index), ['olor'])
+        combined = TermBreakdown.combine([breakdown, breakdown])
+        self.assertEqual(combined.loc['olor', NUM_LABELED_CLUSTERS], 2 * color[NUM_LABELED_CLUSTERS])
+        self.assertEqual(combined.loc['olor', f'{TARGET_EXTRACTION}: {F1}'], 1)
+
+    def test_normalize_target_texts(self):
+        self.assertEqual(list(TsaLabels.normalize_target_texts(['The  Battery life', 'theater', 'the'])),
+                         ['battery life', 'theater', 'the'])
+
+    def test_without_predictions(self):
+        breakdown = TermBreakdown(AnalyzedPredictions(
+            TsaData.from_json_records([]), TsaLabels.read_json(path=get_test_labels_path())))
+        self.assertTrue(breakdown.terms.empty)
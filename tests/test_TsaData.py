@@ -58,3 +58,11 @@ class TestTsaData(unittest.TestCase):
         self.assertEqual(len(tsa_data.get_sentences_without_targets()), 1)
 
 
+
+    def test_sentences_without_targets_after_selecting_targets(self):
+        tsa_data = TsaData.read_json(path=get_test_data_path())
+        self.assertEqual(len(tsa_data.get_sentences_without_targets()), 1)
+        tsa_data.select_targets(required_sentiment=['negative'])
+        self.assertEqual(len(tsa_data.get_sentences_without_targets()), 3)
+        selected = tsa_data.select_sentences(['This is a great car', 'Not in the data'])
+        self.assertListEqual(selected.get_sentences(), ['This is a great car'])
@@ -115,3 +115,13 @@ class TestTsaData(unittest.TestCase):
         self.assertEqual(4, tsa_labels.get_num_labels())
         extended_labels = tsa_labels.extend_labels()
         self.assertEqual(4, extended_labels.get_num_labels())
+
+    def test_remove_and_intersect(self):
+        tsa_labels = TsaLabels.read_json(path=get_test_labels_path())
+        non_targets = tsa_labels.get_non_targets()
+        remaining = tsa_labels.remove(non_targets)
+        self.assertEqual(remaining.get_num_labels(), tsa_labels.get_num_labels() - non_targets.get_num_labels())
+        self.assertEqual(tsa_labels.intersect(non_targets).get_num_labels(), non_targets.get_num_labels())
+        # offsets that were loaded as strings are still matched
+        as_strings = TsaLabels(frame=non_targets.get_frame().astype({TARGET_BEGIN: str, TARGET_END: str}))
+        self.assertEqual(tsa_labels.remove(as_strings).get_num_labels(), remaining.get_num_labels())
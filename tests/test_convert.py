@@ -0,0 +1,100 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import json
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from yaso_tsa.convert import convert
+from yaso_tsa.infra.JsonRecordReader import JsonRecordReader
+from yaso_tsa.infra.SentimentTargets import SENTENCE_TEXT, TARGET_TEXT, TARGET_BEGIN, TARGET_END, TARGET_SENTIMENT
+from yaso_tsa.infra.TsaData import TsaData
+from yaso_tsa.infra.TsaLabels import TsaLabels
+from test_utils import get_test_labels_path, get_test_xml_data_path
+
+TSA_MD_DEV_PATH = os.path.join('..', 'TSA-MD', 'TSA-MD.dev.json')
+KEY_COLUMNS = [TARGET_TEXT, SENTENCE_TEXT, TARGET_BEGIN, TARGET_END, TARGET_SENTIMENT]
+
+
+def get_targets(tsa_labels):
+    frame = tsa_labels.get_frame()[KEY_COLUMNS]
+    return sorted((target_text, text, int(begin), int(end), sentiment)
+                  for target_text, text, begin, end, sentiment in frame.itertuples(index=False))
+
+
+class TestConvert(unittest.TestCase):
+
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temporary_directory.cleanup()
+
+    def get_path(self, name):
+        return os.path.join(self.temporary_directory.name, name)
+
+    def test_xml_to_json(self):
+        self.assertEqual(convert(get_test_xml_data_path(), self.get_path('data.json')), 3)
+        converted = TsaLabels.read_json(self.get_path('data.json'))
+        expected = TsaLabels.read_xml(get_test_xml_data_path())
+        self.assertEqual(get_targets(converted), get_targets(expected))
+        self.assertEqual(converted.get_num_sentences(), expected.get_num_sentences())
+        convert(self.get_path('data.json'), self.get_path('data.xml'))
+        self.assertEqual(get_targets(TsaLabels.read_xml(self.get_path('data.xml'))), get_targets(expected))
+
+    def test_json_roundtrip(self):
+        convert(get_test_labels_path(), self.get_path('labels.jsonl'), batch_size=1)
+        convert(self.get_path('labels.jsonl'), self.get_path('labels.json'))
+        with open(self.get_path('labels.json'), encoding='utf-8') as f:
+            self.assertEqual(json.load(f), list(JsonRecordReader(get_test_labels_path())))
+
+    def test_json_to_csv(self):
+        convert(get_test_labels_path(), self.get_path('labels.csv'), extra_columns=['confidence'])
+        sentiment_targets = TsaData.read_json(get_test_labels_path()).get_sentiment_targets()
+        sentiment_targets.to_csv(self.get_path('expected.csv'), extra_columns=['confidence'], with_sentiment=True,
+                                 shuffle=False)
+        pd.testing.assert_frame_equal(pd.read_csv(self.get_path('labels.csv')),
+                                      pd.read_csv(self.get_path('expected.csv')))
+        self.assertEqual(convert(self.get_path('labels.csv'), self.get_path('labels.json')), 2)
+        self.assertEqual(get_targets(TsaLabels.read_json(self.get_path('labels.json'))),
+                         get_targets(TsaLabels.read_json(get_test_labels_path())))
+
+    def test_shuffled_csv(self):
+        labels = TsaLabels.read_json(TSA_MD_DEV_PATH)
+        TsaData.read_json(TSA_MD_DEV_PATH).get_sentiment_targets().to_csv(self.get_path('shuffled.csv'),
+                                                                          with_sentiment=True)
+        with self.assertRaises(ValueError):
+            convert(self.get_path('shuffled.csv'), self.get_path('labels.json'))
+        num_sentences = convert(self.get_path('shuffled.csv'), self.get_path('labels.json'), group_rows=True)
+        self.assertEqual(num_sentences, labels.get_frame()[SENTENCE_TEXT].nunique())
+        self.assertEqual(get_targets(TsaLabels.read_json(self.get_path('labels.json'))), get_targets(labels))
+
+    def test_csv_values(self):
+        with open(self.get_path('values.csv'), 'w', encoding='utf-8') as f:
+            f.write('target_text,text,location_begin,location_end,sentiment,count,score,note\n'
+                    'food,The food,4,8,positive,3,-0.5,nan\n'
+                    'The,The food,0,3,none,,1e-3,inf\n')
+        convert(self.get_path('values.csv'), self.get_path('values.json'))
+        with open(self.get_path('values.json'), encoding='utf-8') as f:
+            targets = json.load(f)[0]['targets']
+        self.assertEqual([(target['count'], target['score'], target['note']) for target in targets],
+                         [(3, -0.5, 'nan'), (None, 0.001, 'inf')])
+
+    def test_errors(self):
+        with open(self.get_path('invalid.json'), 'w', encoding='utf-8') as f:
+            f.write('[{"text": "A sentence", "targets": []}, {"text": ')
+        with self.assertRaises(ValueError):
+            convert(self.get_path('invalid.json'), self.get_path('invalid.jsonl'))
+        with self.assertRaises(OSError):
+            convert(get_test_labels_path(), self.get_path('missing/labels.csv'), batch_size=1, queue_size=1)
+        with self.assertRaises(ValueError):
+            convert(get_test_labels_path(), self.get_path('labels.txt'))
+
+
+if __name__ == '__main__':
+    unittest.main()
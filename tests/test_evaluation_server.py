@@ -0,0 +1,111 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import json
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from yaso_tsa.Analysis.AnalzyedPredictions import AnalyzedPredictions
+from yaso_tsa.evaluation_server import EvaluationServer, LabelIndexCache, EVALUATE_PATH, LABELS_PATH
+from yaso_tsa.infra.TsaData import TsaData
+from yaso_tsa.infra.TsaLabels import TsaLabels
+from test_utils import get_test_data_path, get_test_labels_path, get_test_labels_with_the_path
+
+
+class TestEvaluationServer(unittest.TestCase):
+
+    def setUp(self):
+        self.server = EvaluationServer(address=('127.0.0.1', 0), labels_paths=[get_test_labels_path()])
+        self.server_thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.server_thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.server_thread.join()
+
+    def post(self, request):
+        http_request = urllib.request.Request(
+            self.server.get_url() + EVALUATE_PATH,
+            data=json.dumps(request).encode('utf-8'),
+            headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(http_request) as response:
+            return json.loads(response.read())
+
+    def test_evaluate(self):
+        with open(get_test_data_path(), encoding='utf-8') as f:
+            predictions = json.load(f)
+        stats = self.post({'labels_path': get_test_labels_path(), 'predictions': predictions})
+        expected = AnalyzedPredictions(
+            tsa_data=TsaData.read_json(path=get_test_data_path()),
+            labeled_data=TsaLabels.read_json(path=get_test_labels_path())
+        ).get_stats()
+        self.assertEqual(set(stats), set(expected.index))
+        for name, value in expected.items():
+            self.assertAlmostEqual(stats[name], value, msg=name)
+
+    def test_empty_predictions(self):
+        # the stats without predictions include NaN values, that are returned as null
+        http_request = urllib.request.Request(
+            self.server.get_url() + EVALUATE_PATH,
+            data=json.dumps({'labels_path': get_test_labels_path(), 'predictions': []}).encode('utf-8'),
+            headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(http_request) as response:
+            body = response.read().decode('utf-8')
+
+        def reject_constant(constant):
+            raise ValueError(f'Invalid json constant {constant}')
+
+        stats = json.loads(body, parse_constant=reject_constant)
+        self.assertIn(None, stats.values())
+
+    def test_concurrent_requests(self):
+        with open(get_test_data_path(), encoding='utf-8') as f:
+            predictions = json.load(f)
+        request = {'labels_path': get_test_labels_path(), 'predictions': predictions}
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(self.post, [request] * 8))
+        self.assertTrue(all(result == results[0] for result in results))
+
+    def test_loaded_labels(self):
+        with urllib.request.urlopen(self.server.get_url() + LABELS_PATH) as response:
+            loaded = json.loads(response.read())
+        self.assertListEqual(loaded, [{'labels_path': get_test_labels_path(), 'extend_labels': False}])
+
+    def test_bad_request(self):
+        with self.assertRaises(urllib.error.HTTPError) as cm:
+            self.post({'labels_path': 'missing_labels.json', 'predictions': []})
+        self.assertEqual(cm.exception.code, 400)
+        with self.assertRaises(urllib.error.HTTPError) as cm:
+            self.post({'labels_path': get_test_labels_path(), 'predictions': [], 'matchers': ['unknown']})
+        self.assertEqual(cm.exception.code, 400)
+        for predictions in [[1, 2], {'text': 'A sentence'}, [{'targets': []}], [{'text': 'A sentence', 'targets': [1]}]]:
+            with self.assertRaises(urllib.error.HTTPError) as cm:
+                self.post({'labels_path': get_test_labels_path(), 'predictions': predictions})
+            self.assertEqual(cm.exception.code, 400, msg=predictions)
+
+
+class TestLabelIndexCache(unittest.TestCase):
+
+    def test_least_recently_used_is_evicted(self):
+        cache = LabelIndexCache(max_size=2)
+        first = cache.get(get_test_labels_path())
+        cache.get(get_test_labels_with_the_path())
+        self.assertIs(cache.get(get_test_labels_path()), first)
+        cache.get(get_test_labels_path(), extend_labels=True)
+        self.assertListEqual(cache.keys(), [
+            (get_test_labels_path(), False),
+            (get_test_labels_path(), True)
+        ])
+
+    def test_failed_load(self):
+        cache = LabelIndexCache()
+        with self.assertRaises(OSError):
+            cache.get('missing_labels.json')
+        self.assertListEqual(cache.keys(), [])
+        self.assertDictEqual(cache._LabelIndexCache__loading_locks, {})
@@ -0,0 +1,35 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import os
+import subprocess
+import sys
+import unittest
+
+import yaso_tsa
+
+
+class TestLazyImports(unittest.TestCase):
+
+    HEAVY_MODULES = ['pandas', 'numpy', 'nltk']
+
+    def get_imported_heavy_modules(self, module_name):
+        repository_directory = os.path.dirname(os.path.dirname(os.path.abspath(yaso_tsa.__file__)))
+        env = dict(os.environ)
+        env['PYTHONPATH'] = repository_directory
+        completed = subprocess.run(
+            [sys.executable, '-c', f'import sys, {module_name}; '
+                                   f'print(",".join(m for m in {self.HEAVY_MODULES} if m in sys.modules))'],
+            env=env, capture_output=True, text=True, check=True)
+        return completed.stdout.strip()
+
+    def test_entry_points_do_not_import_heavy_modules(self):
+        for module_name in ['yaso_tsa', 'yaso_tsa.evaluate_tsa', 'yaso_tsa.evaluation_server',
+                            'yaso_tsa.sample_targets', 'yaso_tsa.data.restore_texts']:
+            self.assertEqual(self.get_imported_heavy_modules(module_name), '', msg=module_name)
+
+
+if __name__ == '__main__':
+    unittest.main()
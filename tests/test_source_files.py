@@ -0,0 +1,66 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import bz2
+import gzip
+import json
+import lzma
+import os
+import tempfile
+import unittest
+import zipfile
+
+from yaso_tsa.infra.JsonRecordReader import write_json_records
+from yaso_tsa.data.source_files import open_source, list_source_files, source_exists, split_archive_path
+
+CONTENT = '{"review_body": "Great. Really"}\n{"review_body": "Bad"}\n'
+
+
+class TestSourceFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.directory = self.temporary_directory.name
+
+    def tearDown(self):
+        self.temporary_directory.cleanup()
+
+    def test_open_compressed(self):
+        for extension, opener in [('', open), ('.gz', gzip.open), ('.bz2', bz2.open), ('.xz', lzma.open)]:
+            path = os.path.join(self.directory, f'dataset_en_test.json{extension}')
+            with opener(path, 'wt', encoding='utf-8') as f:
+                f.write(CONTENT)
+            with open_source(path, encoding='utf-8') as f:
+                self.assertEqual(f.read(), CONTENT, msg=extension)
+            with open_source(path) as f:
+                f.seek(len(CONTENT.split('\n')[0]) + 1)
+                self.assertEqual(f.readline(), b'{"review_body": "Bad"}\n', msg=extension)
+
+    def test_zip_archive(self):
+        archive_path = os.path.join(self.directory, 'OpinosisDataset1.0_0.zip')
+        with zipfile.ZipFile(archive_path, 'w') as archive:
+            archive.writestr('OpinosisDataset1.0/topics/b.txt.data', 'b\n')
+            archive.writestr('OpinosisDataset1.0/topics/a.txt.data', 'a\n')
+            archive.writestr('OpinosisDataset1.0/summaries-gold/a/a.1.gold', 'summary\n')
+        self.assertEqual(split_archive_path(f'{archive_path}/topics'), (archive_path, 'topics'))
+        topic_files = list_source_files(f'{archive_path}/topics', '*.txt.data')
+        self.assertEqual(topic_files, [f'{archive_path}/OpinosisDataset1.0/topics/{name}.txt.data'
+                                       for name in ['a', 'b']])
+        self.assertEqual(list_source_files(archive_path, '*.txt.data'), topic_files)
+        with open_source(f'{archive_path}/topics/b.txt.data', encoding='utf-8') as f:
+            self.assertEqual(f.read(), 'b\n')
+        self.assertTrue(source_exists(f'{archive_path}/topics/a.txt.data'))
+        self.assertFalse(source_exists(f'{archive_path}/topics/c.txt.data'))
+
+    def test_write_json_records(self):
+        path = os.path.join(self.directory, 'yaso.json')
+        for records in [[], [{'text': 'Café', 'targets': [{'begin': 0}]}, {'text': None}]]:
+            self.assertEqual(write_json_records(iter(records), path), len(records))
+            with open(path, encoding='utf-8') as f:
+                self.assertEqual(f.read(), json.dumps(records, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    unittest.main()
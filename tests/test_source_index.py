@@ -0,0 +1,138 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import json
+import os
+import tempfile
+import unittest
+import zipfile
+
+from yaso_tsa.data.restore_texts import restore_amazon, restore_sst, restore_opinosis, restore_semeval_14, \
+    restore_text
+from yaso_tsa.data.source_index import txt_sha1, build_index, is_stale, load_or_build_index, restore_from_index, \
+    get_index_path
+
+SST_SENTENCES = ['A -LRB- very -RRB- good film .', 'Not good at all .', 'A training sentence .']
+OPINOSIS_SENTENCES = {'battery_life_ipod.txt.data': [' The battery life is great . ', 'It dies fast.'],
+                      'screen_garmin.txt.data': ['The screen is crisp.é']}
+SEMEVAL_SENTENCES = ['Great food &amp; service', ' The wine list was short. ']
+
+
+class TestSourceIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        directory = self.temporary_directory.name
+        self.sst_dir = os.path.join(directory, 'sst')
+        os.makedirs(self.sst_dir)
+        with open(os.path.join(self.sst_dir, 'datasetSentences.txt'), 'w', encoding='utf-8') as f:
+            f.write('sentence_index\tsentence\n')
+            f.writelines(f'{i + 1}\t{sentence}\n' for i, sentence in enumerate(SST_SENTENCES))
+        with open(os.path.join(self.sst_dir, 'datasetSplit.txt'), 'w', encoding='utf-8') as f:
+            f.write('sentence_index,splitset_label\n1,2\n2,2\n3,1\n')
+        self.topics_dir = os.path.join(directory, 'topics')
+        os.makedirs(self.topics_dir)
+        for topic_file, sentences in OPINOSIS_SENTENCES.items():
+            with open(os.path.join(self.topics_dir, topic_file), 'w', encoding='utf-8') as f:
+                f.writelines(f'{sentence}\n' for sentence in sentences)
+        self.xml_file = os.path.join(directory, 'Laptops_Test_Gold.xml')
+        with open(self.xml_file, 'w', encoding='utf-8') as f:
+            f.write('<?xml version="1.0" encoding="UTF-8"?>\n<sentences>\n')
+            f.writelines(f'<sentence id="{i}">\n<text>{sentence}</text>\n</sentence>\n'
+                         for i, sentence in enumerate(SEMEVAL_SENTENCES))
+            f.write('</sentences>\n')
+        self.index_dir = os.path.join(directory, 'index')
+
+    def tearDown(self):
+        self.temporary_directory.cleanup()
+
+    def get_sources(self, sst_dir=None, topics_dir=None, xml_file=None):
+        return [
+            ('SST2', {'sst_dir': sst_dir or self.sst_dir}, restore_sst,
+             ['A (very) good film .', 'Not good at all .']),
+            ('Opinosis', {'topics_dir': topics_dir or self.topics_dir}, restore_opinosis,
+             ['The battery life is great .', 'It dies fast.', 'The screen is crisp.é']),
+            ('SemEval14', {'xml_files': [xml_file or self.xml_file]}, restore_semeval_14,
+             ['Great food & service', 'The wine list was short.'])
+        ]
+
+    def create_archive(self):
+        '''
+        :return: A zip archive of the sources, with a top directory, as the archives of the upstream datasets.
+        '''
+        directory = self.temporary_directory.name
+        archive_path = os.path.join(directory, 'sources.zip')
+        with zipfile.ZipFile(archive_path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for root, _, files in os.walk(directory):
+                for name in files:
+                    path = os.path.join(root, name)
+                    if path != archive_path:
+                        archive.write(path, arcname=os.path.join('sources', os.path.relpath(path, directory)))
+        return archive_path
+
+    def test_restore_from_index(self):
+        for src, src_kwargs, restore_fun, texts in self.get_sources():
+            hashes = [txt_sha1(text) for text in texts] + [txt_sha1('missing')]
+            index = build_index(src, src_kwargs)
+            restored = restore_from_index(index, hashes)
+            self.assertEqual(restored, restore_fun(hashes, **src_kwargs), msg=src)
+            self.assertEqual(len(restored), len(texts), msg=src)
+
+    def test_restore_from_archive(self):
+        archive_path = self.create_archive()
+        sources = self.get_sources(sst_dir=f'{archive_path}/sst', topics_dir=f'{archive_path}/topics',
+                                   xml_file=f'{archive_path}/Laptops_Test_Gold.xml')
+        for src, src_kwargs, restore_fun, texts in sources:
+            hashes = [txt_sha1(text) for text in texts]
+            restored = restore_fun(hashes, **src_kwargs)
+            self.assertEqual(len(restored), len(texts), msg=src)
+            self.assertEqual(restore_from_index(build_index(src, src_kwargs), hashes), restored, msg=src)
+
+    def test_restore_amazon(self):
+        import nltk
+        try:
+            nltk.sent_tokenize('A sentence.')
+        except LookupError:
+            self.skipTest('The nltk punkt tokenizer is not installed')
+        reviews_file = os.path.join(self.temporary_directory.name, 'dataset_en_test.json')
+        reviews = [{'review_id': 'en_1', 'review_body': 'Great phone. The battery is weak.'},
+                   {'review_id': 'en_2', 'review_body': 'Works well.'}]
+        with open(reviews_file, 'w', encoding='utf-8') as f:
+            f.writelines(f'{json.dumps(review)}\n' for review in reviews)
+        src_kwargs = {'reviews_file': reviews_file}
+        hashes = [('en_1', txt_sha1('The battery is weak.')), ('en_2', txt_sha1('Works well.')),
+                  ('en_3', txt_sha1('missing'))]
+        restored = restore_amazon(hashes, **src_kwargs)
+        self.assertEqual({hash_key: sentence['text'] for hash_key, sentence in restored.items()},
+                         {hashes[0]: 'The battery is weak.', hashes[1]: 'Works well.'})
+        self.assertEqual(restore_from_index(build_index('Amazon', src_kwargs), hashes), restored)
+
+    def test_stale_index(self):
+        src, src_kwargs, _, texts = self.get_sources()[1]
+        index = load_or_build_index(src, src_kwargs, self.index_dir)
+        self.assertTrue(os.path.exists(get_index_path(self.index_dir, src)))
+        self.assertFalse(is_stale(index, src, src_kwargs))
+        with open(os.path.join(self.topics_dir, 'screen_garmin.txt.data'), 'a', encoding='utf-8') as f:
+            f.write('A new sentence.\n')
+        self.assertTrue(is_stale(index, src, src_kwargs))
+        index = load_or_build_index(src, src_kwargs, self.index_dir)
+        self.assertFalse(is_stale(index, src, src_kwargs))
+        self.assertIn(txt_sha1('A new sentence.'), index['entries'])
+
+    def test_restore_text(self):
+        data = [{'text': None, 'source': 'SemEval14', 'text_hash': txt_sha1('The wine list was short.')},
+                {'text': 'A visible sentence.', 'source': 'YASO'}]
+        out_json = os.path.join(self.temporary_directory.name, 'yaso.json')
+        src_param = {'SemEval14': {'xml_files': [self.xml_file]}, 'YASO': None}
+        for _ in range(2):
+            restore_text([dict(record) for record in data], out_json, src_param, index_dir=self.index_dir)
+            with open(out_json, encoding='utf-8') as f:
+                restored = json.load(f)
+            self.assertEqual([record['text'] for record in restored],
+                             ['The wine list was short.', 'A visible sentence.'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,231 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import numpy
+import pandas
+
+from yaso_tsa.infra.CategoricalLabel import CategoricalLabels
+from yaso_tsa.infra.SentimentTargets import SENTENCE_TEXT
+from yaso_tsa.infra.TsaLabels import TsaLabels, POSITIVE_ANSWER_COUNT, NEGATIVE_ANSWER_COUNT, MIXED_ANSWER_COUNT, \
+    NONE_ANSWER_COUNT
+
+SENTIMENT_ANSWER_COUNT_COLUMNS = [POSITIVE_ANSWER_COUNT, NEGATIVE_ANSWER_COUNT, MIXED_ANSWER_COUNT, NONE_ANSWER_COUNT]
+
+FLEISS_KAPPA = 'fleiss kappa'
+KRIPPENDORFF_ALPHA = 'krippendorff alpha'
+MEAN_ENTROPY = 'mean entropy'
+PERCENTAGE_UNANIMOUS = '% unanimous'
+PERCENTAGE_INCONCLUSIVE = '% inconclusive'
+NUM_ITEMS = 'num items'
+NUM_PAIRABLE_ITEMS = 'num pairable items'
+NUM_SENTENCES = 'num sentences'
+ENTROPY = 'entropy'
+IS_UNANIMOUS = 'is unanimous'
+IS_INCONCLUSIVE = 'is inconclusive'
+
+DEFAULT_NUM_BOOTSTRAP_SAMPLES = 1000
+DEFAULT_CONFIDENCE_LEVEL = 0.95
+
+
+def get_interval_names(stat_name):
+    return f'{stat_name} low', f'{stat_name} high'
+
+
+class Agreement:
+
+    '''
+    Inter-annotator agreement of labels with answer counts, e.g. the number of annotators that chose each sentiment
+    for each target. All the statistics are computed from the counts matrix (a row per item, a column per category),
+    as sums of per item terms, so they are vectorized over the items. The confidence intervals are computed by
+    bootstrapping the sentences, since the targets of a sentence are annotated together.
+    '''
+
+    @staticmethod
+    def get_counts(frame, count_columns=SENTIMENT_ANSWER_COUNT_COLUMNS):
+        '''
+        :return: The counts matrix of the given count columns, with missing counts as zeros.
+        '''
+        missing_columns = [column_name for column_name in count_columns if column_name not in frame.columns]
+        if missing_columns:
+            raise ValueError(f'Missing "{missing_columns}" count columns from frame.')
+        return numpy.nan_to_num(frame[count_columns].to_numpy(dtype=float))
+
+    @staticmethod
+    def entropy(counts, base=2):
+        '''
+        :return: The entropy of the distribution of the answers of each item, or NaN for an item without answers.
+        '''
+        counts = numpy.asarray(counts, dtype=float)
+        num_answers = counts.sum(axis=1, keepdims=True)
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            probabilities = counts / num_answers
+            terms = numpy.where(probabilities > 0, probabilities * numpy.log(probabilities), 0)
+        result = -terms.sum(axis=1) / numpy.log(base)
+        result[num_answers[:, 0] == 0] = numpy.nan
+        return result
+
+    @staticmethod
+    def fleiss_kappa(counts):
+        '''
+        Fleiss' kappa, allowing a different number of answers per item. Items with less than two answers are ignored.
+        '''
+        counts = numpy.asarray(counts, dtype=float)
+        return Agreement.fleiss_kappa_from_sums(Agreement.get_fleiss_terms(counts).sum(axis=0, keepdims=True))[0]
+
+    @staticmethod
+    def get_fleiss_terms(counts):
+        '''
+        :return: For each item: [is pairable, the agreement of the item, the counts of each category], zeroed for
+        items with less than two answers.
+        '''
+        num_answers = counts.sum(axis=1)
+        is_pairable = num_answers >= 2
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            item_agreement = ((counts ** 2).sum(axis=1) - num_answers) / (num_answers * (num_answers - 1))
+        return numpy.column_stack([
+            is_pairable,
+            numpy.where(is_pairable, item_agreement, 0),
+            counts * is_pairable[:, None]
+        ])
+
+    @staticmethod
+    def fleiss_kappa_from_sums(sums):
+        '''
+        :param sums: Sums of the terms of get_fleiss_terms, a row for each (e.g. bootstrap) sample.
+        :return: The kappa of each sample.
+        '''
+        num_items, agreement_sum, category_sums = sums[:, 0], sums[:, 1], sums[:, 2:]
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            observed = agreement_sum / num_items
+            category_proportions = category_sums / category_sums.sum(axis=1, keepdims=True)
+            expected = (category_proportions ** 2).sum(axis=1)
+            return (observed - expected) / (1 - expected)
+
+    @staticmethod
+    def krippendorff_alpha(counts):
+        '''
+        Krippendorff's alpha for nominal data. Items with less than two answers are not pairable, and are ignored.
+        '''
+        counts = numpy.asarray(counts, dtype=float)
+        return Agreement.krippendorff_alpha_from_sums(
+            Agreement.get_krippendorff_terms(counts).sum(axis=0, keepdims=True))[0]
+
+    @staticmethod
+    def get_krippendorff_terms(counts):
+        '''
+        :return: For each item: [its agreeing pairs in the coincidence matrix, its pairable counts of each category].
+        '''
+        num_answers = counts.sum(axis=1)
+        is_pairable = num_answers >= 2
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            coincidences = ((counts ** 2).sum(axis=1) - num_answers) / (num_answers - 1)
+        return numpy.column_stack([
+            numpy.where(is_pairable, coincidences, 0),
+            counts * is_pairable[:, None]
+        ])
+
+    @staticmethod
+    def krippendorff_alpha_from_sums(sums):
+        '''
+        :param sums: Sums of the terms of get_krippendorff_terms, a row for each (e.g. bootstrap) sample.
+        :return: The alpha of each sample.
+        '''
+        agreeing, category_sums = sums[:, 0], sums[:, 1:]
+        num_pairable = category_sums.sum(axis=1)
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            return 1 - (num_pairable - 1) * (num_pairable - agreeing) / \
+                (num_pairable ** 2 - (category_sums ** 2).sum(axis=1))
+
+    @staticmethod
+    def bootstrap_sums(terms, sentences, num_samples=DEFAULT_NUM_BOOTSTRAP_SAMPLES, random_state=None):
+        '''
+        Resample the sentences with replacement, and sum the per item terms of the items of the resampled sentences.
+        :param terms: The per item terms of statistics, e.g. get_fleiss_terms(counts).
+        :param sentences: The sentence of each item.
+        :param random_state: A seed or a numpy random Generator.
+        :return: A matrix of the sums of the terms, a row for each bootstrap sample.
+        '''
+        random_generator = numpy.random.default_rng(random_state)
+        codes, unique_sentences = pandas.factorize(numpy.asarray(sentences, dtype=object), use_na_sentinel=False)
+        num_sentences = len(unique_sentences)
+        if num_sentences == 0:
+            return numpy.full((num_samples, terms.shape[1]), numpy.nan)
+        # the terms of each sentence are summed once, so each sample costs O(num sentences)
+        sentence_terms = numpy.column_stack([
+            numpy.bincount(codes, weights=terms[:, i], minlength=num_sentences) for i in range(terms.shape[1])
+        ])
+        sample_sums = numpy.empty((num_samples, terms.shape[1]))
+        for i in range(num_samples):
+            resampled = random_generator.integers(0, num_sentences, num_sentences, dtype=numpy.int32)
+            sample_sums[i] = numpy.bincount(resampled, minlength=num_sentences).astype(float) @ sentence_terms
+        return sample_sums
+
+    @staticmethod
+    def get_confidence_interval(samples, confidence_level=DEFAULT_CONFIDENCE_LEVEL):
+        '''
+        :return: The (low, high) bounds of the percentile interval of the samples of a statistic.
+        '''
+        alpha = (1 - confidence_level) / 2
+        if numpy.isnan(samples).all():
+            return numpy.nan, numpy.nan
+        low, high = numpy.nanpercentile(samples, [100 * alpha, 100 * (1 - alpha)])
+        return low, high
+
+    @staticmethod
+    def get_item_stats(tsa_labels: TsaLabels, count_columns=SENTIMENT_ANSWER_COUNT_COLUMNS):
+        '''
+        :return: A frame with the entropy, and whether the answers are unanimous or inconclusive, for each label.
+        '''
+        frame = tsa_labels.get_frame()
+        counts = Agreement.get_counts(frame, count_columns)
+        categorical_labels = CategoricalLabels(count_columns, counts)
+        return pandas.DataFrame({
+            ENTROPY: Agreement.entropy(counts),
+            IS_UNANIMOUS: categorical_labels.is_unanimous,
+            IS_INCONCLUSIVE: categorical_labels.is_inconclusive
+        }, index=frame.index)
+
+    @staticmethod
+    def compute(tsa_labels: TsaLabels, count_columns=SENTIMENT_ANSWER_COUNT_COLUMNS,
+                num_bootstrap_samples=DEFAULT_NUM_BOOTSTRAP_SAMPLES, confidence_level=DEFAULT_CONFIDENCE_LEVEL,
+                random_state=None):
+        '''
+        :param tsa_labels: Labels with answer count columns.
+        :param count_columns: The answer count column of each category.
+        :param num_bootstrap_samples: The number of bootstrap samples for the confidence intervals, 0 for none.
+        :param random_state: The seed of the bootstrap samples.
+        :return: A series of agreement statistics.
+        '''
+        frame = tsa_labels.get_frame()
+        counts = Agreement.get_counts(frame, count_columns)
+        item_stats = Agreement.get_item_stats(tsa_labels, count_columns)
+        fleiss_terms = Agreement.get_fleiss_terms(counts)
+        krippendorff_terms = Agreement.get_krippendorff_terms(counts)
+        stats = {
+            NUM_ITEMS: len(counts),
+            NUM_PAIRABLE_ITEMS: int(fleiss_terms[:, 0].sum()),
+            NUM_SENTENCES: frame[SENTENCE_TEXT].nunique(),
+            FLEISS_KAPPA: Agreement.fleiss_kappa_from_sums(fleiss_terms.sum(axis=0, keepdims=True))[0],
+            KRIPPENDORFF_ALPHA: Agreement.krippendorff_alpha_from_sums(
+                krippendorff_terms.sum(axis=0, keepdims=True))[0],
+            MEAN_ENTROPY: numpy.nanmean(item_stats[ENTROPY]) if len(counts) else numpy.nan,
+            PERCENTAGE_UNANIMOUS: 100 * item_stats[IS_UNANIMOUS].mean() if len(counts) else numpy.nan,
+            PERCENTAGE_INCONCLUSIVE: 100 * item_stats[IS_INCONCLUSIVE].mean() if len(counts) else numpy.nan
+        }
+        if num_bootstrap_samples > 0:
+            # both statistics are computed on the same bootstrap samples
+            sample_sums = Agreement.bootstrap_sums(
+                numpy.hstack([fleiss_terms, krippendorff_terms]),
+                frame[SENTENCE_TEXT],
+                num_samples=num_bootstrap_samples,
+                random_state=random_state)
+            num_fleiss_terms = fleiss_terms.shape[1]
+            for name, samples in [
+                (FLEISS_KAPPA, Agreement.fleiss_kappa_from_sums(sample_sums[:, :num_fleiss_terms])),
+                (KRIPPENDORFF_ALPHA, Agreement.krippendorff_alpha_from_sums(sample_sums[:, num_fleiss_terms:]))
+            ]:
+                low_name, high_name = get_interval_names(name)
+                stats[low_name], stats[high_name] = Agreement.get_confidence_interval(samples, confidence_level)
+        return pandas.Series(stats)
@@ -7,14 +7,18 @@ import os
 import statistics
 from collections import Counter
 from pathlib import Path
-from typing import List, Callable, Tuple
+from typing import List, Callable, Tuple, Dict
 
 import numpy
 import pandas
 
+from yaso_tsa.Analysis.CandidateMatches import CandidateMatches
+from yaso_tsa.Analysis.LabelIndex import LabelIndex
+from yaso_tsa.Analysis.MatchTable import MatchTable
+from yaso_tsa.infra.KeyIndex import KeyIndex
 from yaso_tsa.infra.LabeledCluster import LabeledCluster
 from yaso_tsa.infra.LabeledSpan import LabeledSpan
-from yaso_tsa.infra.SentimentTargets import SentimentTargets, TARGET_SCORE
+from yaso_tsa.infra.SentimentTargets import SentimentTargets, TARGET_SCORE, SENTENCE_TEXT
 from yaso_tsa.infra.TsaData import TsaData
 from yaso_tsa.infra.TsaLabels import TsaLabels
 
@@ -30,14 +34,24 @@ NUM_LABELED_INPUT_SENTENCES_WITH_PREDICTIONS = 'num labeled input sentences with
 NUM_LABELS = 'num labels'
 NUM_LABELED_CLUSTERS = 'num labeled clusters'
 
+NUM_VALID_LABELS = 'num valid labels'
+NUM_NON_VALID_LABELS = 'num non-valid labels'
+NUM_UNLABELED = 'num_unlabeled'
+NUM_IGNORE_LABELS = 'num_ignore_labels'
+
 PERCENTAGE_COVERED_VALID_TARGET_GROUPS = '% covered valid target groups'
 NUM_COVERED_VALID_TARGET_GROUPS = '# covered valid target groups'
 
 MAJORITY_LABEL = 'label.majority_label'
+# The label that the predicted sentiment is compared to: the label of the exactly matched span, if any,
+# otherwise the majority label.
+REFERENCE_LABEL = 'label.reference_label'
+PREDICTED_LABEL = 'prediction.label'
 LABELS = 'labels'
 PREDICTIONS = 'predictions'
 MATCH_TYPES = 'match_types'
 PREDICTION = 'prediction'
+PREDICTION_SPAN_COLUMNS = ['prediction.sentence_text', 'prediction.begin', 'prediction.end']
 
 # Evaluated tasks:
 TARGET_EXTRACTION = 'target extraction'
@@ -51,6 +65,9 @@ F1 = 'F1'
 F05 = 'F05'
 
 
+# The sentiment labels, in the order of their codes in the confusion matrix.
+SENTIMENT_LABELS = ['positive', 'negative', 'mixed', 'none']
+
 # Evaluation counts:
 IS_CORRECT = 'is correct'
 NUM_CORRECT = 'num correct'
@@ -79,6 +96,8 @@ class AnalyzedPredictions:
     # Names of stats that are returned in the results stats
     NUM_UNLABELED = 'num_unlabeled'
     SENTIMENT_PREDICTION_MACRO_F1 = 'sentiment prediction: Macro-F1'
+    SENTIMENT_PREDICTION_MICRO_F1 = 'sentiment prediction: Micro-F1'
+    SENTIMENT_PREDICTION_WEIGHTED_F1 = 'sentiment prediction: Weighted-F1'
     NUM_NONE_PREDICTIONS_OF_VALID_TARGETS = 'num_none_predictions_with_valid_targets'
 
     # Names of columns the are included in the matched frames
@@ -86,84 +105,80 @@ class AnalyzedPredictions:
     SENTIMENT_PREDICTION_CORRECT = get_measure_name(task_name=SENTIMENT_CLASSIFICATION, metric=IS_CORRECT)
     FULL_PIPELINE_CORRECT = get_measure_name(task_name=TARGETED_SENTIMENT_ANALYSIS, metric=IS_CORRECT)
 
+    # Names of the counts in the sentence counts frame, in addition to the per-class sentiment counts
+    SENTENCE_COUNTS = [
+        NUM_INPUT_SENTENCES, NUM_LABELED_INPUT_SENTENCES, NUM_TARGET_PREDICTIONS,
+        NUM_LABELED_INPUT_SENTENCES_WITH_PREDICTIONS, NUM_LABELS, NUM_VALID_LABELS, NUM_NON_VALID_LABELS,
+        NUM_LABELED_CLUSTERS, NUM_COVERED_VALID_TARGET_GROUPS, NUM_UNLABELED, NUM_IGNORE_LABELS,
+        TARGET_EXTRACTION_CORRECT, SENTIMENT_PREDICTION_CORRECT, FULL_PIPELINE_CORRECT
+    ]
+
     def __init__(
         self,
         tsa_data: TsaData,
-        labeled_data: TsaLabels,
+        labeled_data: TsaLabels = None,
         ignore_unlabeled=False,
         name=None,
         matchers=[EXACT_MATCHER],
-        ignore_labels=TsaLabels()
+        ignore_labels=TsaLabels(),
+        label_index: LabelIndex = None,
+        candidate_matches: Tuple[CandidateMatches, CandidateMatches] = None,
+        group_by=None
     ):
-        # restrict the labeled data to input sentences
-        labeled_data = labeled_data.select_sentences(sentences=tsa_data.get_sentences())
-        all_predictions = tsa_data.get_sentiment_targets()
-        predictions = all_predictions.select_targets(required_sentiment=['positive', 'negative', 'mixed'])
-        # restrict the evaluated predictions to labeled sentences
-        predictions = predictions.select_sentences(labeled_data.get_sentences())
-        valid_targets = labeled_data.get_valid_targets()
-        non_targets = labeled_data.get_non_targets()
-        labeled_clusters = valid_targets.as_labeled_clusters()
-        num_labeled_clusters = len(labeled_clusters)
-        self.stats = {
-            NUM_INPUT_SENTENCES: len(tsa_data.get_sentences()),
-            NUM_LABELED_INPUT_SENTENCES: labeled_data.get_num_sentences(),
-            NUM_LABELED_INPUT_SENTENCES_WITH_PREDICTIONS: predictions.get_num_sentences(),
-            NUM_TARGET_PREDICTIONS: predictions.get_num_targets(),
-            'num labels': labeled_data.get_num_labels(),
-            'num valid labels': valid_targets.get_num_labels(),
-            NUM_LABELED_CLUSTERS: num_labeled_clusters,
-            'num non-valid labels': non_targets.get_num_labels()}
+        '''
+        :param matchers: The (name, match function) of each matcher of the matching policy, e.g. EXACT_MATCHER. The
+        built-in matchers are evaluated only on the predictions and clusters of the same sentence with overlapping
+        spans; a policy with any other matcher is evaluated on every pair of a prediction and a cluster.
+        :param label_index: Optional labels that were already prepared for evaluation. When given, the
+        labeled_data is not used, and the labels are not clustered again.
+        :param candidate_matches: Optional candidate matches of the same tsa_data and label_index, as returned by
+        find_candidate_matches, so that evaluating several matchers finds them once (see analyze_matchers).
+        :param group_by: Optional sentence field (e.g. source or domain) to also compute the stats of each of its
+        values, in grouped_stats (see get_grouped_stats).
+        '''
+        input_sentences = tsa_data.get_sentences()
+        if label_index is None:
+            # restrict the labeled data to input sentences
+            label_index = LabelIndex(labeled_data.select_sentences(sentences=input_sentences))
+            labeled_data = label_index.labeled_data
+        else:
+            labeled_data = label_index.select_sentences(sentences=input_sentences)
+        if candidate_matches is None:
+            candidate_matches = AnalyzedPredictions.find_candidate_matches(tsa_data, label_index)
+        predictions_matches, all_predictions_matches = candidate_matches
+        labeled_clusters = predictions_matches.cluster_labels
+        predictions = predictions_matches.predictions
         self.matched_predictions = self.match_predictions_to_labels(
             cluster_labels=labeled_clusters,
             predictions=predictions,
-            matchers=matchers)
+            matchers=matchers,
+            candidate_matches=predictions_matches)
         self.matched_labels = self.match_labels_to_predictions(
             cluster_labels=labeled_clusters,
-            predictions=all_predictions,
-            matchers=matchers)
-
-        def sum_column_if_exists(frame, column_name):
-            return frame[column_name].sum() if column_name in frame.columns else 0
-        self.stats[NUM_COVERED_VALID_TARGET_GROUPS] = sum_column_if_exists(self.matched_labels, 'is_covered_label')
-        self.stats[PERCENTAGE_COVERED_VALID_TARGET_GROUPS] = self.stats[NUM_COVERED_VALID_TARGET_GROUPS] / \
-                                                             num_labeled_clusters if num_labeled_clusters > 0 else 0
-
-        self.stats[self.NUM_NONE_PREDICTIONS_OF_VALID_TARGETS] = sum_column_if_exists(self.matched_labels, 'is_covered_label')
-
-        self.match_to_non_targets(non_targets)
+            predictions=all_predictions_matches.predictions,
+            matchers=matchers,
+            candidate_matches=all_predictions_matches)
+        # the same matches, as tables of ids, without objects, built on first use (see get_match_table)
+        self.__candidate_matches = candidate_matches
+        self.__matchers = matchers
+        self.__match_tables = [None, None]
+        self.__cluster_tables = None
+
+        self.match_to_non_targets(label_index.non_targets_index)
         self.match_to_ignore_labels(ignore_labels)
         self.calculate_correct_predictions()
         self.calculate_sentiment_correct_per_class()
 
-        num_unlabeled = sum(self.matched_predictions['is_unlabeled'])
-        self.stats['num_unlabeled'] = num_unlabeled
-        num_predictions = len(self.matched_predictions)
-        if ignore_unlabeled:
-            num_predictions -= num_unlabeled
-        num_ignore_labels = sum(self.matched_predictions[IS_IGNORE_LABEL]) \
-            if 'is_ignore_label' in self.matched_predictions.columns else 0
-        self.stats['num_ignore_labels'] = num_ignore_labels
-        num_predictions -= num_ignore_labels
-        target_extraction_correct = sum(self.matched_predictions[self.TARGET_EXTRACTION_CORRECT])
-        self.calculate_precision_recall_f1(
-            num_correctly_predicted=target_extraction_correct,
-            num_predictions=num_predictions,
-            num_valid_targets=len(labeled_clusters),
-            task_name=TARGET_EXTRACTION)
-
-        self.calculate_accuracy(
-            num_correctly_predicted=sum(self.matched_predictions[self.SENTIMENT_PREDICTION_CORRECT].fillna(False)),
-            num_predictions=target_extraction_correct,
-            task_name=SENTIMENT_CLASSIFICATION)
-
-        self.calculate_sentiment_marco_f1()
-
-        self.calculate_precision_recall_f1(
-            num_correctly_predicted=sum(self.matched_predictions[self.FULL_PIPELINE_CORRECT]),
-            num_predictions=num_predictions,
-            num_valid_targets=len(labeled_clusters),
-            task_name=TARGETED_SENTIMENT_ANALYSIS)
+        self.sentence_counts = self.calculate_sentence_counts(
+            input_sentences=input_sentences,
+            labeled_data=labeled_data,
+            predictions=predictions,
+            labeled_clusters=labeled_clusters)
+        self.ignore_unlabeled = ignore_unlabeled
+        self.stats = AnalyzedPredictions.compute_stats(
+            self.sentence_counts.sum(), ignore_unlabeled=ignore_unlabeled)
+        self.sentences_frames = [tsa_data.get_sentences_frame(), labeled_data.sentences]
+        self.grouped_stats = self.get_grouped_stats(group_by) if group_by else None
 
         labeled_predictions = predictions.get_frame().merge(
             right=labeled_data.get_frame(),
@@ -178,60 +193,144 @@ class AnalyzedPredictions:
         is_labeled = ~self.predictions_with_labels_frame['sentiment_label'].isna()
         self.labeled = self.predictions_with_labels_frame[is_labeled]
 
+    @property
+    def predictions_match_table(self) -> MatchTable:
+        return self.get_match_table(0)
+
+    @property
+    def labels_match_table(self) -> MatchTable:
+        return self.get_match_table(1)
+
+    def get_match_table(self, matches_i) -> MatchTable:
+        '''
+        :param matches_i: 0 for the matches of the evaluated predictions, 1 for the matches of all the predictions.
+        :return: The matches as a MatchTable, which is built on first use. Both tables share the tables of the
+        clusters.
+        '''
+        if self.__match_tables[matches_i] is None:
+            candidate_matches = self.__candidate_matches[matches_i]
+            if self.__cluster_tables is None:
+                self.__cluster_tables = MatchTable.get_cluster_tables(candidate_matches.cluster_labels)
+            self.__match_tables[matches_i] = MatchTable.from_candidate_matches(
+                candidate_matches, self.__matchers, cluster_tables=self.__cluster_tables)
+        return self.__match_tables[matches_i]
+
     @staticmethod
-    def get_exact_matches(match, non_targets):
-        prediction = match[PREDICTION]
-        return [] if match['# labels'] > 0 else \
-            [non_target for non_target in non_targets if non_target.is_same_span(prediction)]
+    def find_candidate_matches(tsa_data: TsaData, label_index: LabelIndex) -> Tuple[CandidateMatches, CandidateMatches]:
+        '''
+        :return: The candidate matches of the evaluated predictions (with a sentiment, in labeled input sentences),
+        and of all the predictions, to the clusters of the labels of the input sentences.
+        '''
+        input_sentences = tsa_data.get_sentences()
+        labeled_clusters = label_index.get_clusters(sentences=input_sentences)
+        labeled_sentences = label_index.select_sentences(sentences=input_sentences).get_sentences()
+        all_predictions = tsa_data.get_sentiment_targets()
+        predictions = all_predictions.select_targets(required_sentiment=['positive', 'negative', 'mixed'])
+        # restrict the evaluated predictions to labeled sentences
+        predictions = predictions.select_sentences(labeled_sentences)
+        return CandidateMatches(labeled_clusters, predictions), CandidateMatches(labeled_clusters, all_predictions)
 
-    def match_to_non_targets(self, non_targets):
-        matched_predictions = self.matched_predictions
+    @staticmethod
+    def analyze_matchers(
+        tsa_data: TsaData,
+        labeled_data: TsaLabels = None,
+        matchers=[EXACT_MATCHER, OVERLAP_MATCHER],
+        label_index: LabelIndex = None,
+        **kwargs
+    ) -> Dict[str, 'AnalyzedPredictions']:
+        '''
+        Evaluate the predictions with each of several matchers, preparing the labels and finding the candidate
+        matches once for all of them.
+        :param matchers: The matchers to evaluate, each on its own. A matcher may also be a list of matchers,
+        that are evaluated together, as in the matchers parameter of the constructor, and named by their names
+        joined with '+'.
+        :param kwargs: Other parameters of the constructor, e.g. ignore_unlabeled.
+        :return: A dictionary from the name of each matcher to its analysis.
+        '''
+        if label_index is None:
+            label_index = LabelIndex(labeled_data.select_sentences(sentences=tsa_data.get_sentences()))
+        candidate_matches = AnalyzedPredictions.find_candidate_matches(tsa_data, label_index)
+        result = {}
+        for matcher in matchers:
+            policy = matcher if isinstance(matcher, list) else [matcher]
+            name = '+'.join(policy_matcher[0] for policy_matcher in policy)
+            result[name] = AnalyzedPredictions(
+                tsa_data=tsa_data,
+                matchers=policy,
+                label_index=label_index,
+                candidate_matches=candidate_matches,
+                name=name,
+                **kwargs)
+        return result
 
-        non_targets = non_targets.as_labeled_spans()
+    @staticmethod
+    def get_stats_by_matcher(analyses: Dict[str, 'AnalyzedPredictions']):
+        '''
+        :param analyses: The result of analyze_matchers.
+        :return: A frame with the stats of each matcher in a column, named by the matcher.
+        '''
+        return pandas.DataFrame({name: analysis.get_stats() for name, analysis in analyses.items()})
 
-        matched_predictions['non targets'] = matched_predictions.apply(
-            lambda match: AnalyzedPredictions.get_exact_matches(match, non_targets), axis=1)
+    @staticmethod
+    def match_exact_spans(matched_predictions, labels_index: KeyIndex):
+        '''
+        Find the predictions whose span is exactly the span of one of the indexed labels.
+        :return: A boolean array, aligned with the rows of matched_predictions.
+        '''
+        if matched_predictions.empty:
+            return numpy.zeros(0, dtype=bool)
+        return labels_index.contains(matched_predictions, key_columns=PREDICTION_SPAN_COLUMNS)
 
-        matched_predictions['is_labeled_non_target'] = matched_predictions.apply(
-            lambda match: None if match['# labels'] > 0 else len(match['non targets']) > 0, axis=1)
-        matched_predictions['is_unlabeled'] = matched_predictions.apply(
-            lambda match: False if match['# labels'] > 0 else len(match['non targets']) == 0, axis=1)
+    def match_to_non_targets(self, non_targets_index: KeyIndex):
+        matched_predictions = self.matched_predictions
+        is_non_target = AnalyzedPredictions.match_exact_spans(matched_predictions, non_targets_index)
+        is_labeled = AnalyzedPredictions.get_num_labels_column(matched_predictions) > 0
+        matched_predictions['is_labeled_non_target'] = numpy.where(is_labeled, None, is_non_target)
+        matched_predictions['is_unlabeled'] = ~is_labeled & ~is_non_target
 
     def match_to_ignore_labels(self, ignore_labels: TsaLabels):
         matched_predictions = self.matched_predictions
         if ignore_labels.get_num_labels() > 0:
-            ignore_labels_spans = ignore_labels.as_labeled_spans()
-
-            matched_predictions['ignore labels'] = matched_predictions.apply(
-                lambda match: AnalyzedPredictions.get_exact_matches(match, ignore_labels_spans), axis=1)
-            matched_predictions[IS_IGNORE_LABEL] = matched_predictions.apply(
-                lambda match: False if match['# labels'] > 0 else len(match['ignore labels']) > 0, axis=1)
+            is_ignore_label = AnalyzedPredictions.match_exact_spans(
+                matched_predictions, KeyIndex.for_spans(ignore_labels.get_frame()))
+            is_labeled = AnalyzedPredictions.get_num_labels_column(matched_predictions) > 0
+            matched_predictions[IS_IGNORE_LABEL] = ~is_labeled & is_ignore_label
         else:
-            matched_predictions['ignore labels'] = False
             matched_predictions[IS_IGNORE_LABEL] = False
 
+    @staticmethod
+    def get_num_labels_column(matched_predictions):
+        if '# labels' not in matched_predictions.columns:
+            return numpy.zeros(len(matched_predictions), dtype=int)
+        return matched_predictions['# labels'].values
+
     @staticmethod
     def correct_sentiment_column(label):
         return f'{AnalyzedPredictions.SENTIMENT_PREDICTION_CORRECT}: {label}'
 
+    @staticmethod
+    def confusion_column(labeled, predicted):
+        return f'{SENTIMENT_CLASSIFICATION}: labeled {labeled}, predicted {predicted}'
+
+    @staticmethod
+    def labeled_sentiment_column(label):
+        return f'{SENTIMENT_CLASSIFICATION}: labeled: {label}'
+
     @staticmethod
     def get_available_labels(matched_predictions):
         return pandas.unique(matched_predictions[MAJORITY_LABEL].dropna())
 
     def calculate_sentiment_correct_per_class(self):
         matched_predictions = self.matched_predictions
-        available_labels = AnalyzedPredictions.get_available_labels(matched_predictions)
-        for available_label in available_labels:
+        if matched_predictions.empty:
+            return
+        is_sentiment_correct = matched_predictions[AnalyzedPredictions.SENTIMENT_PREDICTION_CORRECT]
+        for available_label in AnalyzedPredictions.get_available_labels(matched_predictions):
             matched_predictions[AnalyzedPredictions.correct_sentiment_column(available_label)] = \
-                matched_predictions.apply(
-                    lambda match:
-                        match[AnalyzedPredictions.SENTIMENT_PREDICTION_CORRECT] and
-                        match[PREDICTION].label.most_common_label == available_label,
-                    axis=1
-                )
+                is_sentiment_correct & (matched_predictions[PREDICTED_LABEL] == available_label)
 
     @staticmethod
-    def is_sentiment_correct(match):
+    def get_reference_label(match):
         prediction: LabeledSpan = match[PREDICTION]
         label_clusters: List[LabeledCluster] = match['labels']
         label = None
@@ -244,7 +343,18 @@ class AnalyzedPredictions:
                         raise ValueError(f"Already found a label for prediction {prediction}: {label}. New label: {labeled_span}")
         if not label:
             label = match[MAJORITY_LABEL]
-        return prediction.label.most_common_label == label
+        return label
+
+    @staticmethod
+    def is_sentiment_correct(match):
+        return match[PREDICTION].label.most_common_label == AnalyzedPredictions.get_reference_label(match)
+
+    @staticmethod
+    def get_label_codes(labels, categories):
+        '''
+        :return: The integer code of each label in the categories, or -1 for missing labels.
+        '''
+        return pandas.Categorical(labels, categories=categories).codes
 
     @staticmethod
     def get_majority_label(labels):
@@ -255,48 +365,233 @@ class AnalyzedPredictions:
         majority_label = value
         return majority_label
 
-    def calculate_precision_recall_f1(self, *, num_correctly_predicted, num_predictions, num_valid_targets, task_name):
+    def calculate_sentence_counts(self, *, input_sentences, labeled_data, predictions, labeled_clusters):
+        '''
+        Count, for each input sentence, the labels, predictions and correct predictions that the stats
+        are computed from. Summing the counts of any subset of the sentences gives the counts of
+        evaluating just that subset.
+        :return: A frame indexed by the unique input sentences, with a column per count.
+        '''
+        sentences_index = pandas.Index(pandas.unique(pandas.Series(input_sentences, dtype=object)), name=SENTENCE_TEXT)
+
+        def count(sentences, weights=None):
+            if weights is None:
+                weights = numpy.ones(len(sentences), dtype=int)
+            weights = pandas.Series(numpy.asarray(weights, dtype=int), index=numpy.asarray(sentences, dtype=object))
+            return weights.groupby(level=0).sum().reindex(sentences_index, fill_value=0)
+
+        label_sentences = labeled_data.get_column(SENTENCE_TEXT)
+        is_valid_target = labeled_data.is_valid_target()
+        matched_predictions = self.matched_predictions
+        prediction_sentences = matched_predictions['prediction.sentence_text'] \
+            if 'prediction.sentence_text' in matched_predictions.columns else []
+
+        def count_predictions(column_name):
+            if column_name not in matched_predictions.columns:
+                return count([])
+            return count(prediction_sentences, matched_predictions[column_name].fillna(False).astype(bool))
+
+        counts = pandas.DataFrame(index=sentences_index)
+        counts[NUM_INPUT_SENTENCES] = count(input_sentences)
+        counts[NUM_LABELED_INPUT_SENTENCES] = count(labeled_data.get_sentences())
+        counts[NUM_TARGET_PREDICTIONS] = count(predictions.get_column(SENTENCE_TEXT))
+        counts[NUM_LABELED_INPUT_SENTENCES_WITH_PREDICTIONS] = (counts[NUM_TARGET_PREDICTIONS] > 0).astype(int)
+        counts[NUM_LABELS] = count(label_sentences)
+        counts[NUM_VALID_LABELS] = count(label_sentences, is_valid_target)
+        counts[NUM_NON_VALID_LABELS] = count(label_sentences, ~is_valid_target)
+        cluster_sentences = [cluster.text for cluster in labeled_clusters]
+        counts[NUM_LABELED_CLUSTERS] = count(cluster_sentences)
+        counts[NUM_COVERED_VALID_TARGET_GROUPS] = count(
+            cluster_sentences, self.matched_labels['is_covered_label']) \
+            if 'is_covered_label' in self.matched_labels.columns else 0
+        counts[NUM_UNLABELED] = count_predictions('is_unlabeled')
+        counts[NUM_IGNORE_LABELS] = count_predictions(IS_IGNORE_LABEL)
+        for correct_column in [self.TARGET_EXTRACTION_CORRECT, self.SENTIMENT_PREDICTION_CORRECT,
+                               self.FULL_PIPELINE_CORRECT]:
+            counts[correct_column] = count_predictions(correct_column)
+
+        if MAJORITY_LABEL in matched_predictions.columns:
+            # count the cells of the confusion matrix, between the label that each prediction was compared to
+            # and the predicted label, and the majority labels of the matched predictions
+            categories = AnalyzedPredictions.get_label_categories(
+                matched_predictions[[REFERENCE_LABEL, PREDICTED_LABEL, MAJORITY_LABEL]])
+            num_categories = len(categories)
+            reference_codes = AnalyzedPredictions.get_label_codes(matched_predictions[REFERENCE_LABEL], categories)
+            predicted_codes = AnalyzedPredictions.get_label_codes(matched_predictions[PREDICTED_LABEL], categories)
+            majority_codes = AnalyzedPredictions.get_label_codes(matched_predictions[MAJORITY_LABEL], categories)
+            is_compared = (reference_codes >= 0) & (predicted_codes >= 0)
+            cells = reference_codes * num_categories + predicted_codes
+            cell_counts = AnalyzedPredictions.count_codes(
+                numpy.asarray(prediction_sentences, dtype=object)[is_compared], cells[is_compared],
+                names=[self.confusion_column(labeled, predicted)
+                       for labeled in categories for predicted in categories])
+            majority_counts = AnalyzedPredictions.count_codes(
+                numpy.asarray(prediction_sentences, dtype=object)[majority_codes >= 0], majority_codes[majority_codes >= 0],
+                names=[self.labeled_sentiment_column(label) for label in categories])
+            counts = counts.join([cell_counts, majority_counts]).fillna(0).astype(int)
+        return counts
+
+    @staticmethod
+    def get_label_categories(labels_frame):
+        seen_labels = set(pandas.unique(labels_frame.values.ravel()))
+        return SENTIMENT_LABELS + sorted(label for label in seen_labels
+                                         if label is not None and not pandas.isna(label)
+                                         and label not in SENTIMENT_LABELS)
+
+    @staticmethod
+    def count_codes(sentences, codes, names):
+        '''
+        Count the occurrences of each code in each sentence.
+        :return: A frame indexed by sentence, with a column (named by the names of the codes) for each code that occurs.
+        '''
+        codes_frame = pandas.DataFrame({SENTENCE_TEXT: sentences, 'code': codes})
+        result = codes_frame.groupby([SENTENCE_TEXT, 'code']).size().unstack(fill_value=0)
+        return result.rename(columns=lambda code: names[code])
+
+    @staticmethod
+    def get_confusion_matrix_from_counts(counts):
+        '''
+        :return: A frame whose rows are the labels the sentiment of the correctly extracted targets was compared to,
+        whose columns are the predicted labels, and whose values are the number of predictions.
+        '''
+        prefix = f'{SENTIMENT_CLASSIFICATION}: labeled '
+        cells = {}
+        for name in counts.index:
+            if name.startswith(prefix) and ', predicted ' in name:
+                labeled, predicted = name[len(prefix):].split(', predicted ', 1)
+                cells[(labeled, predicted)] = counts[name]
+        seen_labels = {label for cell in cells for label in cell}
+        labels = [label for label in SENTIMENT_LABELS if label in seen_labels] + \
+            sorted(seen_labels.difference(SENTIMENT_LABELS))
+        matrix = pandas.DataFrame(0, index=pandas.Index(labels, name='labeled'),
+                                  columns=pandas.Index(labels, name='predicted'))
+        for (labeled, predicted), count in cells.items():
+            matrix.loc[labeled, predicted] = count
+        return matrix
+
+    def get_confusion_matrix(self):
+        return AnalyzedPredictions.get_confusion_matrix_from_counts(self.sentence_counts.sum())
+
+    @staticmethod
+    def get_counted_labels(counts):
+        '''
+        :return: The labels that are the majority label of at least one matched prediction.
+        '''
+        prefix = AnalyzedPredictions.labeled_sentiment_column('')
+        labels = [name[len(prefix):] for name in counts.index
+                  if name.startswith(prefix) and counts[name] > 0]
+        return [label for label in SENTIMENT_LABELS if label in labels] + \
+            sorted(set(labels).difference(SENTIMENT_LABELS))
+
+    @staticmethod
+    def compute_stats(counts, ignore_unlabeled=False):
+        '''
+        Compute the evaluation stats from sentence counts.
+        :param counts: A series of counts, as in the columns of the sentence counts frame, summed over the
+        evaluated sentences.
+        :param ignore_unlabeled: Whether to exclude the predictions of unlabeled targets from the precision.
+        :return: A dictionary of stats.
+        '''
+        stats = {name: counts[name] for name in [
+            NUM_INPUT_SENTENCES, NUM_LABELED_INPUT_SENTENCES, NUM_LABELED_INPUT_SENTENCES_WITH_PREDICTIONS,
+            NUM_TARGET_PREDICTIONS, NUM_LABELS, NUM_VALID_LABELS, NUM_LABELED_CLUSTERS, NUM_NON_VALID_LABELS,
+            NUM_COVERED_VALID_TARGET_GROUPS]}
+        num_labeled_clusters = counts[NUM_LABELED_CLUSTERS]
+        stats[PERCENTAGE_COVERED_VALID_TARGET_GROUPS] = counts[NUM_COVERED_VALID_TARGET_GROUPS] / \
+            num_labeled_clusters if num_labeled_clusters > 0 else 0
+        stats[AnalyzedPredictions.NUM_NONE_PREDICTIONS_OF_VALID_TARGETS] = counts[NUM_COVERED_VALID_TARGET_GROUPS]
+
+        num_unlabeled = counts[NUM_UNLABELED]
+        stats[NUM_UNLABELED] = num_unlabeled
+        num_predictions = counts[NUM_TARGET_PREDICTIONS]
+        if ignore_unlabeled:
+            num_predictions -= num_unlabeled
+        num_ignore_labels = counts[NUM_IGNORE_LABELS]
+        stats[NUM_IGNORE_LABELS] = num_ignore_labels
+        num_predictions -= num_ignore_labels
+        target_extraction_correct = counts[AnalyzedPredictions.TARGET_EXTRACTION_CORRECT]
+        AnalyzedPredictions.calculate_precision_recall_f1(
+            stats,
+            num_correctly_predicted=target_extraction_correct,
+            num_predictions=num_predictions,
+            num_valid_targets=num_labeled_clusters,
+            task_name=TARGET_EXTRACTION)
+
+        AnalyzedPredictions.calculate_accuracy(
+            stats,
+            num_correctly_predicted=counts[AnalyzedPredictions.SENTIMENT_PREDICTION_CORRECT],
+            num_predictions=target_extraction_correct,
+            task_name=SENTIMENT_CLASSIFICATION)
+
+        AnalyzedPredictions.calculate_sentiment_marco_f1(stats, counts)
+
+        AnalyzedPredictions.calculate_precision_recall_f1(
+            stats,
+            num_correctly_predicted=counts[AnalyzedPredictions.FULL_PIPELINE_CORRECT],
+            num_predictions=num_predictions,
+            num_valid_targets=num_labeled_clusters,
+            task_name=TARGETED_SENTIMENT_ANALYSIS)
+        return stats
+
+    @staticmethod
+    def calculate_precision_recall_f1(stats, *, num_correctly_predicted, num_predictions, num_valid_targets, task_name):
         precision = (num_correctly_predicted / num_predictions) if num_predictions else 0
         recall = (num_correctly_predicted / num_valid_targets) if num_valid_targets else 0
-        self.stats[get_measure_name(task_name, metric=NUM_CORRECT)] = num_correctly_predicted
-        self.stats[get_measure_name(task_name, metric=NUM_PREDICTIONS)] = num_predictions
-        self.stats[get_measure_name(task_name, metric=NUM_LABELS)] = num_valid_targets
-        self.stats[get_measure_name(task_name, metric=PRECISION)] = precision
-        self.stats[get_measure_name(task_name, metric=RECALL)] = recall
+        stats[get_measure_name(task_name, metric=NUM_CORRECT)] = num_correctly_predicted
+        stats[get_measure_name(task_name, metric=NUM_PREDICTIONS)] = num_predictions
+        stats[get_measure_name(task_name, metric=NUM_LABELS)] = num_valid_targets
+        stats[get_measure_name(task_name, metric=PRECISION)] = precision
+        stats[get_measure_name(task_name, metric=RECALL)] = recall
         f1 = statistics.harmonic_mean([precision, recall])
-        self.stats[get_measure_name(task_name, metric=F1)] = f1
+        stats[get_measure_name(task_name, metric=F1)] = f1
         f05 = compute_f05(precision, recall)
 
-        self.stats[get_measure_name(task_name, metric=F05)] = f05
+        stats[get_measure_name(task_name, metric=F05)] = f05
         return precision, recall, f1
 
-    def calculate_accuracy(self, *, num_correctly_predicted, num_predictions, task_name):
+    @staticmethod
+    def calculate_accuracy(stats, *, num_correctly_predicted, num_predictions, task_name):
         if num_predictions:
             accuracy = num_correctly_predicted / num_predictions
         else:
             accuracy = None
-        self.stats[get_measure_name(task_name, metric=NUM_CORRECT)] = num_correctly_predicted
-        self.stats[get_measure_name(task_name, metric=NUM_PREDICTIONS)] = num_predictions
-        self.stats[get_measure_name(task_name, metric='accuracy')] = accuracy
+        stats[get_measure_name(task_name, metric=NUM_CORRECT)] = num_correctly_predicted
+        stats[get_measure_name(task_name, metric=NUM_PREDICTIONS)] = num_predictions
+        stats[get_measure_name(task_name, metric='accuracy')] = accuracy
 
-    def calculate_sentiment_marco_f1(self):
-        matched_predictions = self.matched_predictions
-        available_labels = AnalyzedPredictions.get_available_labels(matched_predictions)
-        available_labels = available_labels[available_labels != 'mixed']
+    @staticmethod
+    def calculate_sentiment_marco_f1(stats, counts):
+        '''
+        Compute the per-class precision, recall and F1 of the sentiment of correctly extracted targets, and their
+        macro, micro and weighted averages, from the confusion matrix. The mixed class is not included in the averages.
+        '''
+        confusion_matrix = AnalyzedPredictions.get_confusion_matrix_from_counts(counts)
+        available_labels = [label for label in AnalyzedPredictions.get_counted_labels(counts) if label != 'mixed']
+        num_correct = pandas.Series(numpy.diag(confusion_matrix), index=confusion_matrix.index)
+        num_predicted = confusion_matrix.sum(axis=0)
+        task_name = SENTIMENT_CLASSIFICATION
         f1s = []
-        task_name = 'sentiment prediction'
+        supports = []
         for label in available_labels:
-            _, _, f1 = self.calculate_precision_recall_f1(
-                num_correctly_predicted=sum(matched_predictions[AnalyzedPredictions.correct_sentiment_column(label)]),
-                num_predictions=sum(
-                    matched_predictions[self.TARGET_EXTRACTION_CORRECT] &
-                    (matched_predictions['prediction.sentiment'].apply(lambda x: x.most_common_label) == label)),
-                num_valid_targets=sum(matched_predictions[self.TARGET_EXTRACTION_CORRECT] &
-                                      (matched_predictions['label.majority_label'] == label)),
+            _, _, f1 = AnalyzedPredictions.calculate_precision_recall_f1(
+                stats,
+                num_correctly_predicted=num_correct.get(label, 0),
+                num_predictions=num_predicted.get(label, 0),
+                num_valid_targets=counts[AnalyzedPredictions.labeled_sentiment_column(label)],
                 task_name=get_measure_name(task_name, label=label))
             f1s.append(f1)
-        average_f1 = numpy.mean(f1s)
-        self.stats[f'{task_name}: Macro-F1'] = average_f1
+            supports.append(counts[AnalyzedPredictions.labeled_sentiment_column(label)])
+        stats[AnalyzedPredictions.SENTIMENT_PREDICTION_MACRO_F1] = numpy.mean(f1s) if f1s else numpy.nan
+
+        total_correct = sum(num_correct.get(label, 0) for label in available_labels)
+        total_predicted = sum(num_predicted.get(label, 0) for label in available_labels)
+        total_support = sum(supports)
+        micro_precision = total_correct / total_predicted if total_predicted else 0
+        micro_recall = total_correct / total_support if total_support else 0
+        stats[AnalyzedPredictions.SENTIMENT_PREDICTION_MICRO_F1] = statistics.harmonic_mean(
+            [micro_precision, micro_recall])
+        stats[AnalyzedPredictions.SENTIMENT_PREDICTION_WEIGHTED_F1] = \
+            numpy.dot(f1s, supports) / total_support if total_support else 0
 
     def calculate_correct_predictions(self):
         '''
@@ -306,35 +601,36 @@ class AnalyzedPredictions:
         full pipeline: target extraction and sentiment prediction are correct
         '''
         matched_predictions = self.matched_predictions
-        matched_predictions[AnalyzedPredictions.TARGET_EXTRACTION_CORRECT] = \
-            matched_predictions.apply(lambda match: len(match['labels']) > 0, axis=1)
-        matched_predictions[AnalyzedPredictions.SENTIMENT_PREDICTION_CORRECT] = \
-            matched_predictions.apply(AnalyzedPredictions.is_sentiment_correct, axis=1)
+        if matched_predictions.empty:
+            for column_name in [REFERENCE_LABEL, PREDICTED_LABEL, AnalyzedPredictions.TARGET_EXTRACTION_CORRECT,
+                                AnalyzedPredictions.SENTIMENT_PREDICTION_CORRECT,
+                                AnalyzedPredictions.FULL_PIPELINE_CORRECT]:
+                matched_predictions[column_name] = []
+            return
+        is_target_extraction_correct = matched_predictions['# labels'] > 0
+        matched_predictions[REFERENCE_LABEL] = matched_predictions.apply(
+            AnalyzedPredictions.get_reference_label, axis=1)
+        matched_predictions[PREDICTED_LABEL] = matched_predictions['prediction.sentiment'].apply(
+            lambda x: x.most_common_label)
+        is_sentiment_correct = matched_predictions[PREDICTED_LABEL] == matched_predictions[REFERENCE_LABEL]
+        matched_predictions[AnalyzedPredictions.TARGET_EXTRACTION_CORRECT] = is_target_extraction_correct
+        matched_predictions[AnalyzedPredictions.SENTIMENT_PREDICTION_CORRECT] = is_sentiment_correct
         matched_predictions[AnalyzedPredictions.FULL_PIPELINE_CORRECT] = \
-            matched_predictions.apply(
-                lambda match: match[AnalyzedPredictions.TARGET_EXTRACTION_CORRECT] and
-                              match[AnalyzedPredictions.SENTIMENT_PREDICTION_CORRECT],
-                axis=1)
+            is_target_extraction_correct & is_sentiment_correct
 
     @staticmethod
     def match_predictions_to_labels(
             cluster_labels: List[LabeledCluster],
             predictions: SentimentTargets,
-            matchers: List[Tuple[str, Callable[[LabeledCluster, LabeledSpan], bool]]]):
-        predictions_as_labeled_spans = predictions.as_labeled_targets()
+            matchers: List[Tuple[str, Callable[[LabeledCluster, LabeledSpan], bool]]],
+            candidate_matches: CandidateMatches = None):
+        if candidate_matches is None:
+            candidate_matches = CandidateMatches(cluster_labels, predictions)
         scores = predictions.get_column_if_exists(column_name=TARGET_SCORE, default_value=1)
 
         matched_predictions = []
-        for prediction, score in zip(predictions_as_labeled_spans, scores):
-            matched_labels_list = []
-            match_types = []
-            for cluster_label in cluster_labels:
-                for matcher in matchers:
-                    if matcher[1](cluster_label, prediction):
-                        matched_labels_list.append(cluster_label)
-                        match_type = matcher[0]
-                        match_types.append(match_type)
-                        break
+        for prediction, score, (matched_labels_list, match_types) in zip(
+                candidate_matches.labeled_spans, scores, candidate_matches.get_clusters_of_predictions(matchers)):
             matched_predictions.append({
                 PREDICTION: prediction,
                 LABELS: matched_labels_list,
@@ -356,20 +652,14 @@ class AnalyzedPredictions:
     def match_labels_to_predictions(
             cluster_labels: List[LabeledCluster],
             predictions: SentimentTargets,
-            matchers: List[Tuple[str, Callable[[LabeledCluster, LabeledSpan], bool]]]):
-        predictions = predictions.as_labeled_targets()
+            matchers: List[Tuple[str, Callable[[LabeledCluster, LabeledSpan], bool]]],
+            candidate_matches: CandidateMatches = None):
+        if candidate_matches is None:
+            candidate_matches = CandidateMatches(cluster_labels, predictions)
 
         matched_labels = []
-        for cluster_label in cluster_labels:
-            matched_predictions_list = []
-            match_types = []
-            for prediction in predictions:
-                for matcher in matchers:
-                    if matcher[1](cluster_label, prediction):
-                        matched_predictions_list.append(prediction)
-                        match_type = matcher[0]
-                        match_types.append(match_type)
-                        break
+        for cluster_label, (matched_predictions_list, match_types) in zip(
+                cluster_labels, candidate_matches.get_predictions_of_clusters(matchers)):
             matched_labels.append({
                 LABELS: [cluster_label],
                 PREDICTIONS: matched_predictions_list,
@@ -442,6 +732,35 @@ class AnalyzedPredictions:
         result = pandas.DataFrame(result)
         return result
 
+    def get_sentence_groups(self, group_by):
+        '''
+        :param group_by: A sentence field, of the sentences of the predictions, or else of the labeled sentences
+        (e.g. the domain of the YASO sentences, read with TsaLabels.read_json(path, meta_fields=['domain'])).
+        :return: The value of the field for each evaluated sentence, aligned with the sentence counts. A sentence
+        that appears with several values of the field is grouped by its first value.
+        '''
+        for sentences_frame in self.sentences_frames:
+            if group_by in sentences_frame.columns:
+                values = sentences_frame.drop_duplicates(subset=SENTENCE_TEXT).set_index(SENTENCE_TEXT)[group_by]
+                return values.reindex(self.sentence_counts.index)
+        raise ValueError(f'Missing sentence field "{group_by}" in the sentences of the predictions and the labels')
+
+    def get_grouped_stats(self, group_by):
+        '''
+        Compute the stats of each group of sentences, by summing the sentence counts of the group, without
+        evaluating each group on its own.
+        :param group_by: A sentence field, see get_sentence_groups.
+        :return: A frame with a row per stat and a column per value of the field.
+        '''
+        groups = self.get_sentence_groups(group_by)
+        group_counts = self.sentence_counts.groupby(groups.values, dropna=False).sum()
+        result = pandas.DataFrame({
+            group: AnalyzedPredictions.compute_stats(counts, ignore_unlabeled=self.ignore_unlabeled)
+            for group, counts in group_counts.iterrows()
+        })
+        result.columns.name = group_by
+        return result
+
     def get_stats(self):
         result = pandas.Series(self.stats, name=self.name)
         return result
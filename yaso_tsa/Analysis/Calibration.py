@@ -0,0 +1,276 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import numpy
+import pandas
+
+from yaso_tsa.Analysis.AnalzyedPredictions import AnalyzedPredictions, TARGET_EXTRACTION, SENTIMENT_CLASSIFICATION, \
+    TARGETED_SENTIMENT_ANALYSIS, IS_IGNORE_LABEL, IS_CORRECT, NUM_CORRECT, NUM_PREDICTIONS, PRECISION, \
+    get_measure_name
+from yaso_tsa.infra.SentimentTargets import SentimentTargets, TARGET_SCORE
+from yaso_tsa.infra.TsaData import TsaData
+
+# Equal-width confidence bins, closed on the left as in TsaLabels.add_confidence_bin, so a confidence of 1 is in
+# the last bin.
+DEFAULT_CALIBRATION_BINS = [0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.1]
+
+# Columns of the reliability diagram:
+MEAN_CONFIDENCE = 'mean confidence'
+CALIBRATION_GAP = 'calibration gap'
+
+# Calibration metrics:
+EXPECTED_CALIBRATION_ERROR = 'ECE'
+MAXIMUM_CALIBRATION_ERROR = 'MCE'
+BRIER_SCORE = 'Brier score'
+
+# Recalibration methods:
+TEMPERATURE = 'temperature'
+ISOTONIC = 'isotonic'
+RECALIBRATION_METHODS = [TEMPERATURE, ISOTONIC]
+
+TASKS = [TARGET_EXTRACTION, SENTIMENT_CLASSIFICATION, TARGETED_SENTIMENT_ANALYSIS]
+
+# Confidences are clipped away from 0 and 1 before taking their logit
+EPSILON = 1e-6
+
+
+class Calibration:
+
+    '''
+    How well the confidence of the predictions of an AnalyzedPredictions estimates their correctness, for each task.
+    The evaluated predictions of a task are those counted in the precision of the task (or, for the sentiment
+    prediction, in its accuracy): the predictions that are not ignore labels, nor unlabeled when the analysis
+    ignores unlabeled predictions, and, for the sentiment prediction, whose target is correctly extracted. The
+    predictions are binned by confidence with the bins of TsaLabels.add_confidence_bin, and each bin is counted in
+    one pass over the confidence and correctness arrays.
+    '''
+
+    def __init__(self, analysis: AnalyzedPredictions, bins=DEFAULT_CALIBRATION_BINS):
+        self.analysis = analysis
+        self.bins = numpy.asarray(bins, dtype=float)
+
+    def __repr__(self):
+        return f"<Calibration {self.analysis.name}, bins: {len(self.bins) - 1}>"
+
+    def get_task_arrays(self, task_name=TARGETED_SENTIMENT_ANALYSIS):
+        '''
+        :return: The confidence and the correctness of each evaluated prediction of the task, as arrays.
+        '''
+        if task_name not in TASKS:
+            raise ValueError(f'Unknown task "{task_name}", available tasks are {TASKS}')
+        matched_predictions = self.analysis.matched_predictions
+        if matched_predictions.empty:
+            return numpy.empty(0), numpy.empty(0, dtype=bool)
+        is_evaluated = ~matched_predictions[IS_IGNORE_LABEL].to_numpy(dtype=bool)
+        if self.analysis.ignore_unlabeled:
+            is_evaluated &= ~matched_predictions['is_unlabeled'].to_numpy(dtype=bool)
+        if task_name == SENTIMENT_CLASSIFICATION:
+            is_evaluated &= matched_predictions[AnalyzedPredictions.TARGET_EXTRACTION_CORRECT].to_numpy(dtype=bool)
+        scores = matched_predictions[TARGET_SCORE].to_numpy(dtype=float)
+        is_correct = matched_predictions[get_measure_name(task_name, metric=IS_CORRECT)].to_numpy(dtype=bool)
+        return scores[is_evaluated], is_correct[is_evaluated]
+
+    @staticmethod
+    def get_reliability_frame(scores, is_correct, bins=DEFAULT_CALIBRATION_BINS):
+        '''
+        :return: A frame with a row per confidence bin, indexed as the bins of TsaLabels.get_confidence_counts, with
+        the number of predictions in the bin, how many of them are correct, their mean confidence, their precision,
+        and the gap between the two. The mean confidence and the precision of an empty bin are NaN. Confidences
+        outside the bins are not counted.
+        '''
+        bins = numpy.asarray(bins, dtype=float)
+        num_bins = len(bins) - 1
+        scores = numpy.asarray(scores, dtype=float)
+        is_correct = numpy.asarray(is_correct, dtype=float)
+        codes = numpy.digitize(scores, bins) - 1
+        is_binned = (codes >= 0) & (codes < num_bins)
+        codes = codes[is_binned]
+        num_predictions = numpy.bincount(codes, minlength=num_bins)
+        num_correct = numpy.bincount(codes, weights=is_correct[is_binned], minlength=num_bins)
+        sum_scores = numpy.bincount(codes, weights=scores[is_binned], minlength=num_bins)
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            mean_confidence = sum_scores / num_predictions
+            precision = num_correct / num_predictions
+        return pandas.DataFrame({
+            NUM_PREDICTIONS: num_predictions,
+            NUM_CORRECT: num_correct.astype(int),
+            MEAN_CONFIDENCE: mean_confidence,
+            PRECISION: precision,
+            CALIBRATION_GAP: mean_confidence - precision
+        }, index=pandas.IntervalIndex.from_breaks(bins, closed='left'))
+
+    @staticmethod
+    def get_calibration_errors(reliability_frame):
+        '''
+        :return: The expected calibration error (the gaps of the bins, weighted by their number of predictions) and
+        the maximum calibration error (the largest gap of a non-empty bin) of a reliability frame.
+        '''
+        num_predictions = reliability_frame[NUM_PREDICTIONS].to_numpy()
+        gaps = numpy.abs(reliability_frame[CALIBRATION_GAP].to_numpy())
+        total = num_predictions.sum()
+        if total == 0:
+            return numpy.nan, numpy.nan
+        is_binned = num_predictions > 0
+        return numpy.dot(gaps[is_binned], num_predictions[is_binned]) / total, gaps[is_binned].max()
+
+    def get_reliability_diagram(self, task_name=TARGETED_SENTIMENT_ANALYSIS):
+        '''
+        :return: The reliability frame of the task (see get_reliability_frame), to plot precision against mean
+        confidence.
+        '''
+        scores, is_correct = self.get_task_arrays(task_name)
+        return Calibration.get_reliability_frame(scores, is_correct, self.bins)
+
+    def get_reliability_diagrams(self):
+        '''
+        :return: The reliability frames of all the tasks, concatenated, with the task as the outer index level.
+        '''
+        return pandas.concat({task_name: self.get_reliability_diagram(task_name) for task_name in TASKS})
+
+    def get_calibration_stats(self):
+        '''
+        :return: The expected and maximum calibration errors and the Brier score of each task, named as the stats of
+        AnalyzedPredictions (e.g. 'full pipeline: ECE').
+        '''
+        result = {}
+        for task_name in TASKS:
+            scores, is_correct = self.get_task_arrays(task_name)
+            expected_error, maximum_error = Calibration.get_calibration_errors(
+                Calibration.get_reliability_frame(scores, is_correct, self.bins))
+            result[get_measure_name(task_name, metric=EXPECTED_CALIBRATION_ERROR)] = expected_error
+            result[get_measure_name(task_name, metric=MAXIMUM_CALIBRATION_ERROR)] = maximum_error
+            result[get_measure_name(task_name, metric=BRIER_SCORE)] = \
+                numpy.mean((scores - is_correct) ** 2) if len(scores) > 0 else numpy.nan
+        return pandas.Series(result, name=self.analysis.name)
+
+    def fit_recalibration(self, task_name=TARGETED_SENTIMENT_ANALYSIS, method=TEMPERATURE):
+        '''
+        :return: A Recalibration of the confidences, fitted to the correctness of the evaluated predictions of the
+        task.
+        '''
+        scores, is_correct = self.get_task_arrays(task_name)
+        return Recalibration.fit(scores, is_correct, method=method)
+
+
+class Recalibration:
+
+    '''
+    A monotone mapping of prediction confidences to calibrated ones: either temperature scaling of the logit of
+    the confidence, or an isotonic (non-decreasing, piecewise linear) fit of the correctness.
+    '''
+
+    def __init__(self, method, temperature=1., thresholds=(), values=()):
+        '''
+        :param temperature: The temperature of the TEMPERATURE method.
+        :param thresholds: The confidences of the ISOTONIC method, in increasing order.
+        :param values: The calibrated confidence of each threshold.
+        '''
+        if method not in RECALIBRATION_METHODS:
+            raise ValueError(f'Unknown recalibration method "{method}", available methods are '
+                             f'{RECALIBRATION_METHODS}')
+        self.method = method
+        self.temperature = temperature
+        self.thresholds = numpy.asarray(thresholds, dtype=float)
+        self.values = numpy.asarray(values, dtype=float)
+
+    def __repr__(self):
+        if self.method == TEMPERATURE:
+            return f"<Recalibration {self.method}: {self.temperature:.3f}>"
+        return f"<Recalibration {self.method}, thresholds: {len(self.thresholds)}>"
+
+    @staticmethod
+    def fit(scores, is_correct, method=TEMPERATURE):
+        if method == TEMPERATURE:
+            return Recalibration.fit_temperature(scores, is_correct)
+        if method == ISOTONIC:
+            return Recalibration.fit_isotonic(scores, is_correct)
+        raise ValueError(f'Unknown recalibration method "{method}", available methods are {RECALIBRATION_METHODS}')
+
+    @staticmethod
+    def get_logits(scores):
+        scores = numpy.clip(numpy.asarray(scores, dtype=float), EPSILON, 1 - EPSILON)
+        return numpy.log(scores) - numpy.log1p(-scores)
+
+    @staticmethod
+    def get_negative_log_likelihood(logits, is_correct, temperature):
+        scaled = logits / temperature
+        # log(1 + exp(-x)) for correct predictions and log(1 + exp(x)) for incorrect ones
+        return numpy.logaddexp(0, numpy.where(is_correct, -scaled, scaled)).sum()
+
+    @staticmethod
+    def fit_temperature(scores, is_correct, min_temperature=0.01, max_temperature=100., num_iterations=60):
+        '''
+        Find the temperature that minimizes the negative log likelihood of the correctness, by a golden section
+        search over the log of the temperature (the likelihood is unimodal in it).
+        '''
+        logits = Recalibration.get_logits(scores)
+        is_correct = numpy.asarray(is_correct, dtype=bool)
+        if len(logits) == 0:
+            return Recalibration(TEMPERATURE)
+
+        def loss(log_temperature):
+            return Recalibration.get_negative_log_likelihood(logits, is_correct, numpy.exp(log_temperature))
+
+        ratio = (numpy.sqrt(5) - 1) / 2
+        low, high = numpy.log(min_temperature), numpy.log(max_temperature)
+        left, right = high - ratio * (high - low), low + ratio * (high - low)
+        left_loss, right_loss = loss(left), loss(right)
+        for _ in range(num_iterations):
+            if left_loss < right_loss:
+                high, right, right_loss = right, left, left_loss
+                left = high - ratio * (high - low)
+                left_loss = loss(left)
+            else:
+                low, left, left_loss = left, right, right_loss
+                right = low + ratio * (high - low)
+                right_loss = loss(right)
+        return Recalibration(TEMPERATURE, temperature=float(numpy.exp((low + high) / 2)))
+
+    @staticmethod
+    def fit_isotonic(scores, is_correct):
+        '''
+        Fit a non-decreasing function of the confidence to the correctness, with the pool adjacent violators
+        algorithm, over the distinct confidences.
+        '''
+        scores = numpy.asarray(scores, dtype=float)
+        if len(scores) == 0:
+            return Recalibration(ISOTONIC)
+        thresholds, codes = numpy.unique(scores, return_inverse=True)
+        weights = numpy.bincount(codes).astype(float)
+        sums = numpy.bincount(codes, weights=numpy.asarray(is_correct, dtype=float))
+        # each block is [sum of the correctness, sum of the weights, number of distinct confidences]
+        blocks = []
+        for block_sum, block_weight in zip(sums, weights):
+            blocks.append([block_sum, block_weight, 1])
+            while len(blocks) > 1 and blocks[-2][0] * blocks[-1][1] > blocks[-1][0] * blocks[-2][1]:
+                last = blocks.pop()
+                blocks[-1] = [blocks[-1][0] + last[0], blocks[-1][1] + last[1], blocks[-1][2] + last[2]]
+        values = numpy.repeat([block_sum / block_weight for block_sum, block_weight, _ in blocks],
+                              [num_thresholds for _, _, num_thresholds in blocks])
+        return Recalibration(ISOTONIC, thresholds=thresholds, values=values)
+
+    def transform(self, scores):
+        '''
+        :return: The calibrated confidences of the given confidences.
+        '''
+        scores = numpy.asarray(scores, dtype=float)
+        if self.method == TEMPERATURE:
+            return 1 / (1 + numpy.exp(-Recalibration.get_logits(scores) / self.temperature))
+        if len(self.thresholds) == 0:
+            return scores
+        # confidences beyond the fitted ones get the value of the nearest fitted one
+        return numpy.interp(scores, self.thresholds, self.values)
+
+    def apply(self, tsa_data: TsaData) -> TsaData:
+        '''
+        :return: A copy of the predictions, with calibrated confidences. Predictions without a confidence are
+        treated as having a confidence of 1, as in the evaluation.
+        '''
+        sentiment_targets = tsa_data.get_sentiment_targets()
+        scores = sentiment_targets.get_column_if_exists(column_name=TARGET_SCORE, default_value=1)
+        calibrated_targets = SentimentTargets(frame=sentiment_targets.get_frame())
+        calibrated_targets.add_property(TARGET_SCORE, self.transform(scores.to_numpy(dtype=float)))
+        return TsaData(sentiment_targets=calibrated_targets, sentences=tsa_data.get_sentences_frame(),
+                       name=tsa_data.get_name())
@@ -0,0 +1,103 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+from collections import defaultdict
+from typing import List, Tuple, Callable
+
+from yaso_tsa.infra.LabeledCluster import LabeledCluster
+from yaso_tsa.infra.LabeledSpan import LabeledSpan
+from yaso_tsa.infra.SentimentTargets import SentimentTargets
+
+
+class CandidateMatches:
+
+    '''
+    The pairs of a prediction and a labeled cluster that may match: the prediction is in the sentence of the
+    cluster, and overlaps its span. The exact and the overlap matchers accept only such pairs, so the pairs
+    are found once, by sentence, and then any number of these matchers is evaluated on them, instead of on every
+    pair of a prediction and a cluster. Policies with other matchers, that may accept other pairs, are evaluated
+    on every pair.
+    '''
+
+    # the match functions that accept only pairs in the same sentence with overlapping spans
+    OVERLAPPING_MATCH_FUNCTIONS = [LabeledCluster.contains_exact, LabeledCluster.overlaps]
+
+    def __init__(self, cluster_labels: List[LabeledCluster], predictions: SentimentTargets):
+        self.cluster_labels = cluster_labels
+        self.predictions = predictions
+        self.labeled_spans: List[LabeledSpan] = predictions.as_labeled_targets()
+        self.pairs = CandidateMatches.find_pairs(cluster_labels, self.labeled_spans)
+        self.__accepted = {}
+
+    def __repr__(self):
+        return f"<CandidateMatches clusters: {len(self.cluster_labels)}, predictions: {len(self.labeled_spans)}, " \
+               f"pairs: {len(self.pairs)}>"
+
+    @staticmethod
+    def find_pairs(cluster_labels: List[LabeledCluster], labeled_spans: List[LabeledSpan]) -> List[Tuple[int, int]]:
+        '''
+        :return: The (prediction index, cluster index) of each candidate pair, ordered by prediction and then by
+        cluster.
+        '''
+        clusters_by_sentence = defaultdict(list)
+        for cluster_i, cluster in enumerate(cluster_labels):
+            clusters_by_sentence[cluster.text].append((cluster_i, cluster.span.left, cluster.span.right))
+        pairs = []
+        for prediction_i, prediction in enumerate(labeled_spans):
+            # the spans are closed intervals, as in LabeledCluster.overlaps
+            pairs += [(prediction_i, cluster_i)
+                      for cluster_i, left, right in clusters_by_sentence.get(prediction.text, [])
+                      if left <= prediction.end and prediction.begin <= right]
+        return pairs
+
+    def accept(self, matchers: List[Tuple[str, Callable[[LabeledCluster, LabeledSpan], bool]]]):
+        '''
+        :param matchers: The matchers of a matching policy. A pair matches if any of the matchers accepts it.
+        :return: The (prediction index, cluster index, match type) of each matched pair, where the match type
+        is the name of the first matcher that accepted the pair.
+        '''
+        # the matches of each policy are kept, since the same policy is used for several views of the matches
+        key = tuple((matcher[0], matcher[1]) for matcher in matchers)
+        if key not in self.__accepted:
+            result = []
+            for prediction_i, cluster_i in self.get_pairs(matchers):
+                for matcher in matchers:
+                    if matcher[1](self.cluster_labels[cluster_i], self.labeled_spans[prediction_i]):
+                        result.append((prediction_i, cluster_i, matcher[0]))
+                        break
+            self.__accepted[key] = result
+        return self.__accepted[key]
+
+    def get_pairs(self, matchers):
+        '''
+        :return: The candidate pairs, if all the matchers accept only candidate pairs, or else every pair, ordered by
+        prediction and then by cluster.
+        '''
+        if all(matcher[1] in CandidateMatches.OVERLAPPING_MATCH_FUNCTIONS for matcher in matchers):
+            return self.pairs
+        return [(prediction_i, cluster_i) for prediction_i in range(len(self.labeled_spans))
+                for cluster_i in range(len(self.cluster_labels))]
+
+    def get_clusters_of_predictions(self, matchers):
+        '''
+        :return: For each prediction, the list of its matched clusters and the list of their match types.
+        '''
+        result = [([], []) for _ in self.labeled_spans]
+        for prediction_i, cluster_i, match_type in self.accept(matchers):
+            clusters, match_types = result[prediction_i]
+            clusters.append(self.cluster_labels[cluster_i])
+            match_types.append(match_type)
+        return result
+
+    def get_predictions_of_clusters(self, matchers):
+        '''
+        :return: For each cluster, the list of its matched predictions and the list of their match types.
+        '''
+        result = [([], []) for _ in self.cluster_labels]
+        for prediction_i, cluster_i, match_type in self.accept(matchers):
+            predictions, match_types = result[cluster_i]
+            predictions.append(self.labeled_spans[prediction_i])
+            match_types.append(match_type)
+        return result
@@ -0,0 +1,266 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import math
+
+import numpy
+import pandas
+
+from yaso_tsa.Analysis.Agreement import Agreement, get_interval_names
+from yaso_tsa.Analysis.AnalzyedPredictions import AnalyzedPredictions, TARGETED_SENTIMENT_ANALYSIS, \
+    TARGET_EXTRACTION, SENTIMENT_CLASSIFICATION, IS_CORRECT, NUM_CORRECT, NUM_PREDICTIONS, PRECISION, RECALL, F1, \
+    NUM_TARGET_PREDICTIONS, NUM_UNLABELED, NUM_IGNORE_LABELS, NUM_LABELED_CLUSTERS, get_measure_name
+from yaso_tsa.Analysis.LabelIndex import LabelIndex
+from yaso_tsa.infra.SentimentTargets import SENTENCE_TEXT, TARGET_TEXT, TARGET_BEGIN, TARGET_END, TARGET_SENTIMENT
+from yaso_tsa.infra.TsaData import TsaData
+from yaso_tsa.infra.TsaLabels import TsaLabels
+
+SENTENCE_ID = 'sentence_id'
+ALIGNED_KEY_COLUMNS = [SENTENCE_ID, TARGET_BEGIN, TARGET_END]
+IS_PREDICTED = 'is predicted'
+FLIP = 'flip'
+CORRECT_TO_INCORRECT = 'correct to incorrect'
+INCORRECT_TO_CORRECT = 'incorrect to correct'
+DELTA = 'delta'
+
+# Names of the results of the significance tests
+NUM_ONLY_FIRST_CORRECT = 'num only first correct'
+NUM_ONLY_SECOND_CORRECT = 'num only second correct'
+MCNEMAR_STATISTIC = 'mcnemar statistic'
+P_VALUE = 'p-value'
+
+COMPARED_TASKS = [TARGET_EXTRACTION, SENTIMENT_CLASSIFICATION, TARGETED_SENTIMENT_ANALYSIS]
+
+
+class ComparedPredictions:
+
+    '''
+    Compare two prediction sets that are evaluated on the same labels, e.g., of a model and of its candidate
+    replacement. The labels are prepared once, in a shared LabelIndex, and the evaluated predictions of both sets
+    are aligned by their (sentence id, begin, end) keys, to find the predictions and sentences whose correctness
+    flipped, the differences of the stats, and whether the differences are significant.
+    '''
+
+    def __init__(
+        self,
+        tsa_data: TsaData,
+        other_tsa_data: TsaData,
+        labeled_data: TsaLabels = None,
+        label_index: LabelIndex = None,
+        names=('first', 'second'),
+        **kwargs
+    ):
+        '''
+        :param label_index: Optional labels that were already prepared, see AnalyzedPredictions.
+        :param names: The names of the two prediction sets, used in the names of the columns of the results.
+        :param kwargs: Other parameters of AnalyzedPredictions, e.g. matchers or ignore_unlabeled.
+        '''
+        if label_index is None:
+            label_index = LabelIndex(labeled_data)
+        self.label_index = label_index
+        self.names = list(names)
+        self.ignore_unlabeled = kwargs.get('ignore_unlabeled', False)
+        self.analyses = [
+            AnalyzedPredictions(tsa_data=data, label_index=label_index, name=name, **kwargs)
+            for data, name in zip([tsa_data, other_tsa_data], self.names)
+        ]
+        # the sentences of both evaluations, whose positions are the sentence ids
+        self.sentences = pandas.Index(pandas.unique(numpy.concatenate([
+            numpy.asarray(analysis.sentence_counts.index, dtype=object) for analysis in self.analyses])),
+            name=SENTENCE_TEXT)
+        self.__aligned_predictions = None
+
+    def __repr__(self):
+        return f"<ComparedPredictions {self.names[0]} and {self.names[1]}, sentences: {len(self.sentences)}>"
+
+    @staticmethod
+    def get_column_name(name, column_name):
+        return f'{name}: {column_name}'
+
+    def get_sentence_ids(self, sentences):
+        return self.sentences.get_indexer(numpy.asarray(sentences, dtype=object))
+
+    def get_evaluated_predictions(self, analysis: AnalyzedPredictions):
+        '''
+        :return: The evaluated predictions of an analysis, with their sentence id and whether they are correct in
+        each task. A span that is predicted more than once is kept once.
+        '''
+        predictions = analysis.predictions_match_table.predictions
+        result = pandas.DataFrame({
+            SENTENCE_ID: self.get_sentence_ids(predictions[SENTENCE_TEXT]),
+            TARGET_BEGIN: predictions[TARGET_BEGIN].astype(int).to_numpy(),
+            TARGET_END: predictions[TARGET_END].astype(int).to_numpy(),
+            TARGET_TEXT: predictions[TARGET_TEXT].to_numpy(),
+            TARGET_SENTIMENT: predictions[TARGET_SENTIMENT].to_numpy(),
+            IS_PREDICTED: True
+        })
+        matched_predictions = analysis.matched_predictions
+        for task_name in COMPARED_TASKS:
+            correct_column = get_measure_name(task_name, metric=IS_CORRECT)
+            result[correct_column] = matched_predictions[correct_column].fillna(False).astype(bool).to_numpy() \
+                if correct_column in matched_predictions.columns and len(matched_predictions) else False
+        return result.drop_duplicates(subset=ALIGNED_KEY_COLUMNS)
+
+    def get_aligned_predictions(self):
+        '''
+        :return: A frame with a row per (sentence id, begin, end) that is predicted by any of the sets, and the
+        sentiment and correctness of each task of each set, as '<name>: <column>' columns. A span that is not
+        predicted by a set is not correct in it.
+        '''
+        if self.__aligned_predictions is None:
+            first, second = [self.get_evaluated_predictions(analysis).set_index(ALIGNED_KEY_COLUMNS)
+                             for analysis in self.analyses]
+            target_texts = first[TARGET_TEXT].combine_first(second[TARGET_TEXT])
+            aligned = pandas.concat([
+                frame.drop(columns=[TARGET_TEXT]).rename(
+                    columns=lambda column_name: self.get_column_name(name, column_name))
+                for frame, name in zip([first, second], self.names)
+            ], axis=1)
+            for name in self.names:
+                for column_name in [IS_PREDICTED] + [get_measure_name(task_name, metric=IS_CORRECT)
+                                                     for task_name in COMPARED_TASKS]:
+                    aligned[self.get_column_name(name, column_name)] = \
+                        aligned[self.get_column_name(name, column_name)].fillna(False).astype(bool)
+            aligned.insert(0, TARGET_TEXT, target_texts)
+            aligned = aligned.sort_index().reset_index()
+            aligned.insert(1, SENTENCE_TEXT, self.sentences[aligned[SENTENCE_ID].to_numpy()])
+            self.__aligned_predictions = aligned
+        return self.__aligned_predictions
+
+    def get_paired_correct(self, task_name=TARGETED_SENTIMENT_ANALYSIS):
+        '''
+        :return: Whether each aligned prediction is correct in the first and in the second set.
+        '''
+        aligned = self.get_aligned_predictions()
+        correct_column = get_measure_name(task_name, metric=IS_CORRECT)
+        return [aligned[self.get_column_name(name, correct_column)].to_numpy() for name in self.names]
+
+    def get_flips(self, task_name=TARGETED_SENTIMENT_ANALYSIS):
+        '''
+        :return: The aligned predictions whose correctness in the task differs between the sets, with the FLIP
+        from the first set to the second.
+        '''
+        is_first_correct, is_second_correct = self.get_paired_correct(task_name)
+        is_flipped = is_first_correct != is_second_correct
+        result = self.get_aligned_predictions()[is_flipped].copy()
+        result[FLIP] = numpy.where(is_first_correct[is_flipped], CORRECT_TO_INCORRECT, INCORRECT_TO_CORRECT)
+        return result
+
+    def get_sentence_flips(self, task_name=TARGETED_SENTIMENT_ANALYSIS):
+        '''
+        :return: The sentences whose number of correct predictions in the task differs between the sets, with the
+        number of predictions and of correct predictions of each set, and the DELTA of the correct predictions.
+        '''
+        correct_column = get_measure_name(task_name, metric=IS_CORRECT)
+        columns = {}
+        for analysis, name in zip(self.analyses, self.names):
+            counts = analysis.sentence_counts.reindex(self.sentences, fill_value=0)
+            columns[self.get_column_name(name, NUM_PREDICTIONS)] = counts[NUM_TARGET_PREDICTIONS].to_numpy()
+            columns[self.get_column_name(name, NUM_CORRECT)] = counts[correct_column].to_numpy()
+        result = pandas.DataFrame(columns, index=self.sentences)
+        result[DELTA] = result[self.get_column_name(self.names[1], NUM_CORRECT)] - \
+            result[self.get_column_name(self.names[0], NUM_CORRECT)]
+        result.insert(0, SENTENCE_ID, numpy.arange(len(self.sentences)))
+        return result[result[DELTA] != 0]
+
+    def get_stat_deltas(self):
+        '''
+        :return: A frame with a row per numeric stat, its value in each set, and the DELTA from the first set to the
+        second.
+        '''
+        stats = pandas.concat([analysis.get_stats() for analysis in self.analyses], axis=1)
+        stats = stats.apply(pandas.to_numeric, errors='coerce').dropna(how='all')
+        stats[DELTA] = stats[self.names[1]] - stats[self.names[0]]
+        return stats
+
+    def mcnemar_test(self, task_name=TARGETED_SENTIMENT_ANALYSIS):
+        '''
+        McNemar's test of the aligned predictions that are correct in exactly one of the sets, with an exact
+        (binomial) p-value.
+        :return: A series with the numbers of predictions that only each set got right, the (continuity corrected)
+        chi-square statistic, and the two-sided p-value.
+        '''
+        is_first_correct, is_second_correct = self.get_paired_correct(task_name)
+        only_first = int((is_first_correct & ~is_second_correct).sum())
+        only_second = int((~is_first_correct & is_second_correct).sum())
+        num_discordant = only_first + only_second
+        statistic = (abs(only_first - only_second) - 1) ** 2 / num_discordant if num_discordant else 0.
+        return pandas.Series({
+            NUM_ONLY_FIRST_CORRECT: only_first,
+            NUM_ONLY_SECOND_CORRECT: only_second,
+            MCNEMAR_STATISTIC: statistic,
+            P_VALUE: ComparedPredictions.binomial_test(min(only_first, only_second), num_discordant)
+        })
+
+    @staticmethod
+    def binomial_test(k, n):
+        '''
+        :return: The two-sided p-value of at most k successes out of n, with a success probability of 0.5.
+        '''
+        if n == 0:
+            return 1.
+        log_half = n * math.log(0.5)
+        log_tail = [math.lgamma(n + 1) - math.lgamma(i + 1) - math.lgamma(n - i + 1) + log_half
+                    for i in range(k + 1)]
+        max_log = max(log_tail)
+        tail = math.exp(max_log) * sum(math.exp(value - max_log) for value in log_tail)
+        return min(1., 2 * tail)
+
+    def get_sentence_terms(self, task_name):
+        '''
+        :return: For each sentence: [its correct, evaluated and labeled counts in the first set, and the same in the
+        second set], so the precision, recall and F1 of any subset of the sentences are computed from the sums.
+        '''
+        correct_column = get_measure_name(task_name, metric=IS_CORRECT)
+        terms = []
+        for analysis in self.analyses:
+            counts = analysis.sentence_counts.reindex(self.sentences, fill_value=0)
+            num_predictions = counts[NUM_TARGET_PREDICTIONS] - counts[NUM_IGNORE_LABELS]
+            if self.ignore_unlabeled:
+                num_predictions = num_predictions - counts[NUM_UNLABELED]
+            terms += [counts[correct_column], num_predictions, counts[NUM_LABELED_CLUSTERS]]
+        return numpy.column_stack([numpy.asarray(term, dtype=float) for term in terms])
+
+    @staticmethod
+    def get_metrics_from_sums(sums):
+        '''
+        :param sums: Sums of (correct, predictions, labels) counts, a row per sample.
+        :return: The (precision, recall, F1) of each sample, as in AnalyzedPredictions.calculate_precision_recall_f1.
+        '''
+        num_correct, num_predictions, num_labels = sums[:, 0], sums[:, 1], sums[:, 2]
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            precision = numpy.where(num_predictions > 0, num_correct / num_predictions, 0.)
+            recall = numpy.where(num_labels > 0, num_correct / num_labels, 0.)
+            f1 = numpy.where((precision > 0) & (recall > 0), 2 * precision * recall / (precision + recall), 0.)
+        return {PRECISION: precision, RECALL: recall, F1: f1}
+
+    def paired_bootstrap(self, task_name=TARGETED_SENTIMENT_ANALYSIS, metric=F1, num_samples=1000,
+                         confidence_level=0.95, random_state=None):
+        '''
+        A paired bootstrap test of the difference in a metric (precision, recall or F1) of a task with precision and
+        recall (target extraction or the full pipeline), resampling the sentences, with the predictions of both sets
+        in each sampled sentence.
+        :return: A series with the DELTA of the metric from the first set to the second, its confidence interval,
+        and the two-sided p-value of no difference.
+        '''
+        if task_name not in [TARGET_EXTRACTION, TARGETED_SENTIMENT_ANALYSIS]:
+            raise ValueError(f'The paired bootstrap is not supported for task "{task_name}"')
+        terms = self.get_sentence_terms(task_name)
+        metrics = [ComparedPredictions.get_metrics_from_sums(terms[:, i:i + 3].sum(axis=0, keepdims=True))[metric][0]
+                   for i in [0, 3]]
+        sample_sums = Agreement.bootstrap_sums(
+            terms, numpy.arange(len(self.sentences)), num_samples=num_samples, random_state=random_state)
+        deltas = ComparedPredictions.get_metrics_from_sums(sample_sums[:, 3:])[metric] - \
+            ComparedPredictions.get_metrics_from_sums(sample_sums[:, :3])[metric]
+        low_name, high_name = get_interval_names(DELTA)
+        low, high = Agreement.get_confidence_interval(deltas, confidence_level)
+        return pandas.Series({
+            self.names[0]: metrics[0],
+            self.names[1]: metrics[1],
+            DELTA: metrics[1] - metrics[0],
+            low_name: low,
+            high_name: high,
+            P_VALUE: min(1., 2 * min((deltas <= 0).mean(), (deltas >= 0).mean())) if len(deltas) else numpy.nan
+        })
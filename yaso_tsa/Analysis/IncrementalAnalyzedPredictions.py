@@ -0,0 +1,105 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import pandas
+
+from yaso_tsa.Analysis.AnalzyedPredictions import AnalyzedPredictions, EXACT_MATCHER
+from yaso_tsa.Analysis.LabelIndex import LabelIndex
+from yaso_tsa.infra.SentimentTargets import SentimentTargets, SENTENCE_TEXT, TARGET_SENTIMENT
+from yaso_tsa.infra.TsaData import TsaData
+from yaso_tsa.infra.TsaLabels import TsaLabels
+
+
+class IncrementalAnalyzedPredictions:
+
+    '''
+    Evaluate a sequence of prediction sets on the same labels, for example the predictions of consecutive
+    model checkpoints. Each update re-matches only the sentences whose predictions changed since the previous
+    update, and updates the stats by the difference in the counts of these sentences.
+    '''
+
+    HASHED_COLUMNS = SentimentTargets.KEY_COLUMNS + [TARGET_SENTIMENT]
+
+    def __init__(
+        self,
+        label_index: LabelIndex,
+        ignore_unlabeled=False,
+        name=None,
+        matchers=[EXACT_MATCHER],
+        ignore_labels=TsaLabels()
+    ):
+        self.label_index = label_index
+        self.ignore_unlabeled = ignore_unlabeled
+        self.name = name
+        self.matchers = matchers
+        self.ignore_labels = ignore_labels
+        self.sentence_hashes = pandas.Series(dtype=object)
+        self.sentence_counts = pandas.DataFrame()
+        self.counts = pandas.Series(0, index=AnalyzedPredictions.SENTENCE_COUNTS)
+        self.num_rematched_sentences = 0
+
+    def __repr__(self):
+        return f"<IncrementalAnalyzedPredictions {self.name if self.name else 'unnamed'}, " \
+               f"sentences: {len(self.sentence_hashes)}>"
+
+    @staticmethod
+    def hash_sentences(tsa_data: TsaData):
+        '''
+        :return: A series from each input sentence to a hash of its predictions. The hash does not depend
+        on the order of the predictions within the sentence.
+        '''
+        sentences = pandas.Series(tsa_data.get_sentences(), dtype=object)
+        # a sentence that appears several times in the input is counted several times
+        occurrences = sentences.value_counts()
+        targets_frame = tsa_data.get_sentiment_targets().get_frame()
+        if targets_frame.empty:
+            target_hashes = pandas.Series(dtype='uint64')
+        else:
+            row_hashes = pandas.util.hash_pandas_object(
+                targets_frame[IncrementalAnalyzedPredictions.HASHED_COLUMNS].astype(str), index=False)
+            target_hashes = pandas.Series(row_hashes.values, index=targets_frame[SENTENCE_TEXT].values)\
+                .groupby(level=0).sum()
+        target_hashes = target_hashes.reindex(occurrences.index, fill_value=0)
+        return pandas.Series(
+            list(zip(target_hashes.values, occurrences.values)),
+            index=occurrences.index,
+            dtype=object)
+
+    def update(self, tsa_data: TsaData):
+        '''
+        Evaluate a new set of predictions.
+        :param tsa_data: The predictions. Sentences that are not in it are removed from the evaluation.
+        :return: The stats of evaluating tsa_data.
+        '''
+        new_hashes = IncrementalAnalyzedPredictions.hash_sentences(tsa_data)
+        old_hashes = self.sentence_hashes.reindex(new_hashes.index)
+        is_changed = [old_hash != new_hash for old_hash, new_hash in zip(old_hashes.values, new_hashes.values)]
+        changed_sentences = list(new_hashes.index[is_changed])
+        removed_sentences = list(self.sentence_hashes.index.difference(new_hashes.index))
+
+        if changed_sentences:
+            changed_counts = AnalyzedPredictions(
+                tsa_data=tsa_data.select_sentences(changed_sentences),
+                label_index=self.label_index,
+                matchers=self.matchers,
+                ignore_labels=self.ignore_labels
+            ).sentence_counts
+        else:
+            changed_counts = pandas.DataFrame()
+
+        old_counts = self.sentence_counts[self.sentence_counts.index.isin(changed_sentences + removed_sentences)]
+        self.counts = self.counts\
+            .sub(old_counts.sum(), fill_value=0)\
+            .add(changed_counts.sum(), fill_value=0)\
+            .astype(int)
+        self.sentence_counts = pandas.concat(
+            [self.sentence_counts.drop(index=old_counts.index), changed_counts]).fillna(0).astype(int)
+        self.sentence_hashes = new_hashes
+        self.num_rematched_sentences = len(changed_sentences)
+        return self.get_stats()
+
+    def get_stats(self):
+        stats = AnalyzedPredictions.compute_stats(self.counts, ignore_unlabeled=self.ignore_unlabeled)
+        return pandas.Series(stats, name=self.name)
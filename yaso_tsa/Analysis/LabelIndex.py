@@ -0,0 +1,68 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+from typing import List
+
+from yaso_tsa.infra.KeyIndex import KeyIndex
+from yaso_tsa.infra.LabeledCluster import LabeledCluster
+from yaso_tsa.infra.LabeledTarget import LabeledTarget
+from yaso_tsa.infra.SentimentTargets import SENTENCE_TEXT
+from yaso_tsa.infra.TsaLabels import TsaLabels
+
+
+class LabelIndex:
+
+    '''
+    Labels that are prepared once, and then used for evaluating any number of prediction sets:
+    the labels are split into valid targets and non-targets, the valid targets are clustered
+    per sentence, and the non-target spans are indexed.
+    '''
+
+    def __init__(self, labeled_data: TsaLabels, name=None):
+        self.labeled_data = labeled_data
+        self.name = name
+        self.valid_targets = labeled_data.get_valid_targets()
+        self.non_targets = labeled_data.get_non_targets()
+        self.non_targets_index = KeyIndex.for_spans(self.non_targets.get_frame())
+        self.__clusters_by_sentence = LabelIndex.cluster_by_sentence(self.valid_targets)
+
+    def __repr__(self):
+        return f"<LabelIndex {self.name if self.name else 'unnamed'}, labels: {self.labeled_data}, " \
+               f"clusters: {self.get_num_clusters()}>"
+
+    @staticmethod
+    def cluster_by_sentence(valid_targets: TsaLabels):
+        '''
+        :return: A dictionary from each sentence with valid targets to the clusters of its targets,
+        ordered as in TsaLabels.as_labeled_clusters().
+        '''
+        frame = valid_targets.get_frame()
+        if frame.empty:
+            return {}
+        return {
+            sentence: LabeledCluster.create_clusters(LabeledTarget.create(frame=sentence_frame))
+            for sentence, sentence_frame in frame.groupby(SENTENCE_TEXT)
+        }
+
+    def get_num_clusters(self):
+        return sum(len(clusters) for clusters in self.__clusters_by_sentence.values())
+
+    def get_sentence_clusters(self, sentence) -> List[LabeledCluster]:
+        return self.__clusters_by_sentence.get(sentence, [])
+
+    def get_clusters(self, sentences=None) -> List[LabeledCluster]:
+        '''
+        :param sentences: The sentences to get the clusters for, or None for all sentences.
+        :return: The clusters of the valid targets in the given sentences.
+        '''
+        if sentences is not None:
+            sentences = set(sentences)
+        return [cluster
+                for sentence, clusters in self.__clusters_by_sentence.items()
+                if sentences is None or sentence in sentences
+                for cluster in clusters]
+
+    def select_sentences(self, sentences) -> TsaLabels:
+        return self.labeled_data.select_sentences(sentences)
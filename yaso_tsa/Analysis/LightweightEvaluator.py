@@ -0,0 +1,227 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+from collections import Counter
+from typing import Sequence, Tuple
+
+import pandas
+
+from yaso_tsa.Analysis.AnalzyedPredictions import AnalyzedPredictions, EXACT_MATCHER, OVERLAP_MATCHER, \
+    TARGET_EXTRACTION, SENTIMENT_CLASSIFICATION, TARGETED_SENTIMENT_ANALYSIS, \
+    NUM_INPUT_SENTENCES, NUM_LABELED_INPUT_SENTENCES, NUM_TARGET_PREDICTIONS, \
+    NUM_LABELED_INPUT_SENTENCES_WITH_PREDICTIONS, NUM_LABELS, NUM_VALID_LABELS, NUM_NON_VALID_LABELS, \
+    NUM_LABELED_CLUSTERS, NUM_COVERED_VALID_TARGET_GROUPS, NUM_UNLABELED, NUM_IGNORE_LABELS, \
+    PERCENTAGE_COVERED_VALID_TARGET_GROUPS
+from yaso_tsa.Analysis.LabelIndex import LabelIndex
+from yaso_tsa.infra.SentimentTargets import SENTENCE_TEXT, TARGET_BEGIN, TARGET_END, TARGETS, TARGET_SENTIMENT
+from yaso_tsa.infra.TsaLabels import TsaLabels
+
+EVALUATED_SENTIMENTS = {'positive', 'negative', 'mixed'}
+
+
+class SentenceLabels:
+
+    '''
+    The labels of a single sentence, in plain Python structures.
+    '''
+
+    def __init__(self, num_sentences=0, num_labels=0, num_valid_labels=0, clusters=(), non_target_spans=()):
+        self.num_sentences = num_sentences
+        self.num_labels = num_labels
+        self.num_valid_labels = num_valid_labels
+        # for each cluster: (left, right, the label of each member span, the majority label)
+        self.clusters = list(clusters)
+        self.non_target_spans = set(non_target_spans)
+
+
+class LightweightEvaluator:
+
+    '''
+    Evaluate small batches of predictions against preloaded labels, with plain Python structures instead of frames,
+    for low latency (e.g., for online monitoring). The labels are converted once from a LabelIndex into a dictionary
+    from each sentence to its labels, and each evaluation counts, in a loop over the given predictions, the same
+    counts as AnalyzedPredictions.calculate_sentence_counts, so the stats are the same as those of AnalyzedPredictions
+    with the same labels and matchers. Only the built-in exact and overlap matchers are supported.
+    '''
+
+    MATCHERS = {matcher[0]: matcher for matcher in [EXACT_MATCHER, OVERLAP_MATCHER]}
+
+    def __init__(self, label_index: LabelIndex, matchers=[EXACT_MATCHER], ignore_unlabeled=False,
+                 ignore_labels=TsaLabels()):
+        '''
+        :param matchers: Built-in matchers, or their names ('exact', 'overlap').
+        '''
+        matcher_names = [matcher if isinstance(matcher, str) else matcher[0] for matcher in matchers]
+        for matcher, name in zip(matchers, matcher_names):
+            if name not in LightweightEvaluator.MATCHERS or \
+                    not (isinstance(matcher, str) or matcher == LightweightEvaluator.MATCHERS[name]):
+                raise ValueError(f'Unsupported matcher {matcher}, supported matchers are '
+                                 f'{list(LightweightEvaluator.MATCHERS)}')
+        self.is_exact = EXACT_MATCHER[0] in matcher_names
+        self.is_overlap = OVERLAP_MATCHER[0] in matcher_names
+        self.ignore_unlabeled = ignore_unlabeled
+        self.sentence_labels = LightweightEvaluator.get_sentence_labels(label_index)
+        ignore_frame = ignore_labels.get_frame()
+        self.ignore_spans = set(zip(
+            ignore_frame[SENTENCE_TEXT], ignore_frame[TARGET_BEGIN].astype(int), ignore_frame[TARGET_END].astype(int)))
+
+    def __repr__(self):
+        return f"<LightweightEvaluator sentences: {len(self.sentence_labels)}>"
+
+    @staticmethod
+    def get_sentence_labels(label_index: LabelIndex):
+        '''
+        :return: A dictionary from each labeled sentence to its SentenceLabels.
+        '''
+        labeled_data = label_index.labeled_data
+        labels_frame = labeled_data.get_frame()
+        num_sentences = Counter(labeled_data.get_sentences())
+        num_labels = Counter(labels_frame[SENTENCE_TEXT])
+        num_valid_labels = Counter(labels_frame[SENTENCE_TEXT][labeled_data.is_valid_target().values])
+        non_targets_frame = label_index.non_targets.get_frame()
+        non_target_spans = {}
+        for text, begin, end in zip(non_targets_frame[SENTENCE_TEXT], non_targets_frame[TARGET_BEGIN],
+                                    non_targets_frame[TARGET_END]):
+            non_target_spans.setdefault(text, set()).add((int(begin), int(end)))
+        result = {}
+        for text in set(num_sentences).union(num_labels):
+            clusters = []
+            for cluster in label_index.get_sentence_clusters(text):
+                member_labels = {}
+                for labeled_span in cluster.labeled_spans:
+                    member_labels.setdefault((labeled_span.begin, labeled_span.end),
+                                             labeled_span.label.most_common_label)
+                clusters.append((cluster.span.left, cluster.span.right, member_labels, cluster.majority_label()))
+            result[text] = SentenceLabels(
+                num_sentences=num_sentences[text],
+                num_labels=num_labels[text],
+                num_valid_labels=num_valid_labels[text],
+                clusters=clusters,
+                non_target_spans=non_target_spans.get(text, ()))
+        return result
+
+    @staticmethod
+    def from_json_records(json_contents):
+        '''
+        :param json_contents: Sentences in the json format of the predictions file.
+        :return: The predictions as a list of (text, [(begin, end, sentiment), ...]).
+        '''
+        return [(record[SENTENCE_TEXT],
+                 [(target['location']['begin'], target['location']['end'], target[TARGET_SENTIMENT])
+                  for target in record.get(TARGETS, [])])
+                for record in json_contents]
+
+    def is_match(self, cluster, begin, end):
+        left, right, member_labels, _ = cluster
+        return (self.is_exact and (begin, end) in member_labels) or \
+            (self.is_overlap and left <= end and begin <= right)
+
+    def count(self, predictions: Sequence[Tuple[str, Sequence[Tuple[int, int, str]]]]):
+        '''
+        :param predictions: A (text, targets) pair for each input sentence, where targets is a sequence of
+        (begin, end, sentiment) of the predicted targets of the text.
+        :return: A dictionary of the counts of AnalyzedPredictions.SENTENCE_COUNTS, and of the cells of the confusion
+        matrix, summed over the sentences.
+        '''
+        counts = dict.fromkeys(AnalyzedPredictions.SENTENCE_COUNTS, 0)
+        counts[NUM_INPUT_SENTENCES] = len(predictions)
+        confusion_counts = Counter()
+        majority_counts = Counter()
+        targets_by_sentence = {}
+        for text, targets in predictions:
+            targets_by_sentence.setdefault(text, []).extend(targets)
+        for text, targets in targets_by_sentence.items():
+            labels = self.sentence_labels.get(text)
+            if labels is None:
+                continue
+            counts[NUM_LABELED_INPUT_SENTENCES] += labels.num_sentences
+            counts[NUM_LABELS] += labels.num_labels
+            counts[NUM_VALID_LABELS] += labels.num_valid_labels
+            counts[NUM_NON_VALID_LABELS] += labels.num_labels - labels.num_valid_labels
+            counts[NUM_LABELED_CLUSTERS] += len(labels.clusters)
+            is_covered = [False] * len(labels.clusters)
+            num_predictions = 0
+            for begin, end, sentiment in targets:
+                matched = [cluster_i for cluster_i, cluster in enumerate(labels.clusters)
+                           if self.is_match(cluster, begin, end)]
+                for cluster_i in matched:
+                    is_covered[cluster_i] = True
+                if sentiment not in EVALUATED_SENTIMENTS:
+                    continue
+                num_predictions += 1
+                if not matched:
+                    if (begin, end) not in labels.non_target_spans:
+                        counts[NUM_UNLABELED] += 1
+                    if (text, begin, end) in self.ignore_spans:
+                        counts[NUM_IGNORE_LABELS] += 1
+                    continue
+                counts[AnalyzedPredictions.TARGET_EXTRACTION_CORRECT] += 1
+                # as in AnalyzedPredictions.get_reference_label and get_majority_label
+                majority_label = Counter(labels.clusters[cluster_i][3] for cluster_i in matched).most_common(1)[0][0]
+                reference_label = majority_label
+                for cluster_i in matched:
+                    if (begin, end) in labels.clusters[cluster_i][2]:
+                        reference_label = labels.clusters[cluster_i][2][(begin, end)]
+                        break
+                if sentiment == reference_label:
+                    counts[AnalyzedPredictions.SENTIMENT_PREDICTION_CORRECT] += 1
+                    counts[AnalyzedPredictions.FULL_PIPELINE_CORRECT] += 1
+                if reference_label is not None:
+                    confusion_counts[(reference_label, sentiment)] += 1
+                if majority_label is not None:
+                    majority_counts[majority_label] += 1
+            counts[NUM_TARGET_PREDICTIONS] += num_predictions
+            counts[NUM_LABELED_INPUT_SENTENCES_WITH_PREDICTIONS] += num_predictions > 0
+            counts[NUM_COVERED_VALID_TARGET_GROUPS] += sum(is_covered)
+        for (labeled, predicted), count in confusion_counts.items():
+            counts[AnalyzedPredictions.confusion_column(labeled, predicted)] = count
+        for label, count in majority_counts.items():
+            counts[AnalyzedPredictions.labeled_sentiment_column(label)] = count
+        return counts
+
+    def evaluate(self, predictions: Sequence[Tuple[str, Sequence[Tuple[int, int, str]]]]):
+        '''
+        :param predictions: See count.
+        :return: The main stats: the counts, and the precision, recall and F1 of target extraction and of the full
+        pipeline, and the accuracy of the sentiment prediction, as in AnalyzedPredictions.compute_stats.
+        '''
+        counts = self.count(predictions)
+        stats = {name: counts[name] for name in [
+            NUM_INPUT_SENTENCES, NUM_LABELED_INPUT_SENTENCES, NUM_LABELED_INPUT_SENTENCES_WITH_PREDICTIONS,
+            NUM_TARGET_PREDICTIONS, NUM_LABELS, NUM_VALID_LABELS, NUM_LABELED_CLUSTERS, NUM_NON_VALID_LABELS,
+            NUM_COVERED_VALID_TARGET_GROUPS, NUM_UNLABELED, NUM_IGNORE_LABELS]}
+        num_labeled_clusters = counts[NUM_LABELED_CLUSTERS]
+        stats[PERCENTAGE_COVERED_VALID_TARGET_GROUPS] = counts[NUM_COVERED_VALID_TARGET_GROUPS] / \
+            num_labeled_clusters if num_labeled_clusters > 0 else 0
+        num_predictions = counts[NUM_TARGET_PREDICTIONS] - counts[NUM_IGNORE_LABELS]
+        if self.ignore_unlabeled:
+            num_predictions -= counts[NUM_UNLABELED]
+        target_extraction_correct = counts[AnalyzedPredictions.TARGET_EXTRACTION_CORRECT]
+        AnalyzedPredictions.calculate_precision_recall_f1(
+            stats,
+            num_correctly_predicted=target_extraction_correct,
+            num_predictions=num_predictions,
+            num_valid_targets=num_labeled_clusters,
+            task_name=TARGET_EXTRACTION)
+        AnalyzedPredictions.calculate_accuracy(
+            stats,
+            num_correctly_predicted=counts[AnalyzedPredictions.SENTIMENT_PREDICTION_CORRECT],
+            num_predictions=target_extraction_correct,
+            task_name=SENTIMENT_CLASSIFICATION)
+        AnalyzedPredictions.calculate_precision_recall_f1(
+            stats,
+            num_correctly_predicted=counts[AnalyzedPredictions.FULL_PIPELINE_CORRECT],
+            num_predictions=num_predictions,
+            num_valid_targets=num_labeled_clusters,
+            task_name=TARGETED_SENTIMENT_ANALYSIS)
+        return stats
+
+    def evaluate_all_stats(self, predictions):
+        '''
+        :return: All the stats of AnalyzedPredictions.compute_stats, including the per-label sentiment stats, whose
+        computation uses pandas.
+        '''
+        return AnalyzedPredictions.compute_stats(pandas.Series(self.count(predictions)),
+                                                 ignore_unlabeled=self.ignore_unlabeled)
@@ -0,0 +1,144 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+from collections import Counter
+from typing import List
+
+import numpy
+import pandas
+
+from yaso_tsa.Analysis.CandidateMatches import CandidateMatches
+from yaso_tsa.infra.CategoricalLabel import CategoricalLabel
+from yaso_tsa.infra.LabeledCluster import LabeledCluster, CLUSTER_ID, NUM_MEMBERS
+from yaso_tsa.infra.LabeledSpan import LabeledSpan
+from yaso_tsa.infra.LabeledTarget import LabeledTarget, SENTIMENT_LABEL_TYPE
+from yaso_tsa.infra.SentimentTargets import SentimentTargets, SENTENCE_TEXT, TARGET_TEXT, TARGET_BEGIN, TARGET_END, \
+    TARGET_SENTIMENT, TARGET_SCORE
+
+PREDICTION_ID = 'prediction_id'
+MATCH_TYPE = 'match_type'
+
+
+class MatchTable:
+
+    '''
+    The matches of predictions to labeled clusters, without Python objects: the predictions and the clusters are
+    rows of frames, identified by their positions, and the matches are an edge table of (prediction id,
+    cluster id, match type code) integer columns. It is small, and cheap to pickle (e.g., to send to another
+    process), and the LabeledSpan and LabeledCluster objects are recreated from it only when asked for.
+    '''
+
+    def __init__(self, predictions, clusters, members, edges, match_types: List[str], labels: List[str]):
+        '''
+        :param predictions: The predictions frame, a row per prediction id.
+        :param clusters: The clusters frame, a row per cluster id.
+        :param members: The labeled spans of the clusters, a row per span, with its CLUSTER_ID and its label counts
+        in a {SENTIMENT_LABEL_TYPE}_{label} column per label.
+        :param edges: The matches, a row per matched (PREDICTION_ID, CLUSTER_ID) pair, with the MATCH_TYPE code.
+        :param match_types: The name of each match type code.
+        :param labels: The labels of the count columns of the members.
+        '''
+        self.predictions = predictions
+        self.clusters = clusters
+        self.members = members
+        self.edges = edges
+        self.match_types = list(match_types)
+        self.labels = list(labels)
+
+    def __repr__(self):
+        return f"<MatchTable predictions: {len(self.predictions)}, clusters: {len(self.clusters)}, " \
+               f"matches: {len(self.edges)}>"
+
+    @staticmethod
+    def get_count_column(label):
+        return f'{SENTIMENT_LABEL_TYPE}_{label}'
+
+    @staticmethod
+    def from_candidate_matches(candidate_matches: CandidateMatches, matchers, cluster_tables=None) -> 'MatchTable':
+        '''
+        :param matchers: The matchers of a matching policy, see CandidateMatches.accept.
+        :param cluster_tables: Optional tables of the clusters of the candidate matches, as returned by
+        get_cluster_tables, when they were already built for another table of the same clusters.
+        '''
+        match_types = [matcher[0] for matcher in matchers]
+        accepted = candidate_matches.accept(matchers)
+        edges = pandas.DataFrame({
+            PREDICTION_ID: numpy.array([match[0] for match in accepted], dtype=numpy.int32),
+            CLUSTER_ID: numpy.array([match[1] for match in accepted], dtype=numpy.int32),
+            MATCH_TYPE: numpy.array([match_types.index(match[2]) for match in accepted], dtype=numpy.int8)
+        })
+        predictions_frame = candidate_matches.predictions.get_frame()
+        prediction_columns = SentimentTargets.KEY_COLUMNS + [TARGET_SENTIMENT] + \
+            [column_name for column_name in [TARGET_SCORE] + list(
+                LabeledTarget.get_labels_to_columns(SENTIMENT_LABEL_TYPE).values())
+             if column_name in predictions_frame.columns]
+        predictions = predictions_frame[prediction_columns].reset_index(drop=True)
+        if cluster_tables is None:
+            cluster_tables = MatchTable.get_cluster_tables(candidate_matches.cluster_labels)
+        clusters, members, labels = cluster_tables
+        return MatchTable(predictions, clusters, members, edges, match_types, labels)
+
+    @staticmethod
+    def get_cluster_tables(cluster_labels: List[LabeledCluster]):
+        '''
+        :return: The clusters frame, the members frame and the labels of its count columns.
+        '''
+        members = [(cluster_id, labeled_span)
+                   for cluster_id, cluster in enumerate(cluster_labels)
+                   for labeled_span in cluster.labeled_spans]
+        # the labels are ordered as in the counters of LabeledTarget.create, so that the recreated counters break
+        # ties of the most common label as the original counters do
+        labels = list(dict.fromkeys(
+            list(LabeledTarget.get_labels_to_columns(SENTIMENT_LABEL_TYPE)) +
+            [label for _, labeled_span in members for label in labeled_span.label.counter]))
+        members_frame = pandas.DataFrame({
+            CLUSTER_ID: numpy.array([cluster_id for cluster_id, _ in members], dtype=numpy.int32),
+            TARGET_BEGIN: [labeled_span.begin for _, labeled_span in members],
+            TARGET_END: [labeled_span.end for _, labeled_span in members],
+            **{MatchTable.get_count_column(label): [labeled_span.label.counter.get(label, 0)
+                                                    for _, labeled_span in members]
+               for label in labels}
+        })
+        clusters_frame = pandas.DataFrame({
+            SENTENCE_TEXT: [cluster.text for cluster in cluster_labels],
+            TARGET_TEXT: [cluster.get_labeled_text() for cluster in cluster_labels],
+            TARGET_BEGIN: [cluster.span.left for cluster in cluster_labels],
+            TARGET_END: [cluster.span.right for cluster in cluster_labels],
+            NUM_MEMBERS: numpy.bincount(members_frame[CLUSTER_ID], minlength=len(cluster_labels)),
+            TARGET_SENTIMENT: [cluster.majority_label() for cluster in cluster_labels]
+        })
+        return clusters_frame, members_frame, labels
+
+    def get_match_types(self):
+        '''
+        :return: The match type name of each edge.
+        '''
+        return pandas.Categorical.from_codes(self.edges[MATCH_TYPE], categories=self.match_types)
+
+    def get_num_matches_per_prediction(self):
+        return numpy.bincount(self.edges[PREDICTION_ID], minlength=len(self.predictions))
+
+    def get_num_matches_per_cluster(self):
+        return numpy.bincount(self.edges[CLUSTER_ID], minlength=len(self.clusters))
+
+    def get_matched_cluster_ids(self, prediction_id):
+        return self.edges[CLUSTER_ID].to_numpy()[self.edges[PREDICTION_ID].to_numpy() == prediction_id]
+
+    def get_matched_prediction_ids(self, cluster_id):
+        return self.edges[PREDICTION_ID].to_numpy()[self.edges[CLUSTER_ID].to_numpy() == cluster_id]
+
+    def get_prediction(self, prediction_id) -> LabeledSpan:
+        return LabeledTarget.create(frame=self.predictions.iloc[[prediction_id]])[0]
+
+    def get_cluster(self, cluster_id) -> LabeledCluster:
+        text = self.clusters[SENTENCE_TEXT].iat[cluster_id]
+        members = self.members[self.members[CLUSTER_ID] == cluster_id]
+        counts = members[[MatchTable.get_count_column(label) for label in self.labels]].to_numpy()
+        labeled_spans = []
+        for begin, end, row_counts in zip(members[TARGET_BEGIN], members[TARGET_END], counts):
+            counter = Counter({label: count.item() for label, count in zip(self.labels, row_counts) if count > 0})
+            labeled_spans.append(
+                LabeledSpan(text=text, begin=int(begin), end=int(end), label=CategoricalLabel(counter)))
+        return LabeledCluster(labeled_spans=labeled_spans)
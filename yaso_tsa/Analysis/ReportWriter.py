@@ -0,0 +1,133 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas
+
+from yaso_tsa.Analysis.AnalzyedPredictions import AnalyzedPredictions, PREDICTION, LABELS, MATCH_TYPES, PREDICTIONS
+from yaso_tsa.Analysis.MatchTable import MatchTable, PREDICTION_ID, MATCH_TYPE
+from yaso_tsa.infra.LabeledCluster import CLUSTER_ID
+
+# Report formats:
+CSV = 'csv'
+CSV_GZ = 'csv.gz'
+PARQUET = 'parquet'
+REPORT_FORMATS = [CSV, CSV_GZ, PARQUET]
+
+# The reports of AnalyzedPredictions.to_csv
+CSV_REPORT_NAMES = ['all', 'labeled', 'matched_predictions', 'unlabeled_predictions', 'matched_labels',
+                    'unmatched_labels']
+
+# Columns of the matched frames that hold objects, or that are already in the match tables
+MATCHED_OBJECT_COLUMNS = [PREDICTION, LABELS, MATCH_TYPES, PREDICTIONS]
+EXPANDED_COLUMN_PREFIXES = ['prediction.', 'prediction_', 'label_group_']
+
+
+class ReportWriter:
+
+    '''
+    Write the reports of an AnalyzedPredictions. The CSV format writes the wide reports of AnalyzedPredictions.to_csv.
+    The other formats write long-format reports, built from the match tables of the analysis: a row per prediction,
+    per cluster and per match, instead of a column per matched label or prediction, and without object columns to
+    stringify. The unlabeled predictions and unmatched labels of the CSV reports are the rows of the predictions and
+    clusters reports that are is_unlabeled and not is_covered_label. The reports are compressed (CSV_GZ) or columnar
+    (PARQUET, which requires pyarrow), and written concurrently.
+    '''
+
+    def __init__(self, report_format=CSV_GZ, max_workers=None):
+        if report_format not in REPORT_FORMATS:
+            raise ValueError(f'Unknown report format "{report_format}", available formats are {REPORT_FORMATS}')
+        if report_format == PARQUET:
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ImportError('Writing parquet reports requires pyarrow, install it with: pip install pyarrow, '
+                                  'or pip install yaso-tsa[parquet]')
+        self.report_format = report_format
+        self.max_workers = max_workers
+
+    def __repr__(self):
+        return f"<ReportWriter {self.report_format}>"
+
+    @staticmethod
+    def get_scalar_columns(matched_frame):
+        return [column_name for column_name in matched_frame.columns
+                if column_name not in MATCHED_OBJECT_COLUMNS and
+                not any(column_name.startswith(prefix) for prefix in EXPANDED_COLUMN_PREFIXES)]
+
+    @staticmethod
+    def with_scalar_columns(table, matched_frame):
+        '''
+        :return: The table, with the scalar columns of the matched frame, whose rows are aligned with the table rows.
+        '''
+        scalar_columns = [column_name for column_name in ReportWriter.get_scalar_columns(matched_frame)
+                          if column_name not in table.columns]
+        if matched_frame.empty or not scalar_columns:
+            return table
+        return pandas.concat([table, matched_frame[scalar_columns].reset_index(drop=True)], axis=1)
+
+    @staticmethod
+    def get_match_edges(match_table: MatchTable):
+        edges = match_table.edges.copy()
+        edges[MATCH_TYPE] = match_table.get_match_types()
+        return edges
+
+    @staticmethod
+    def get_long_reports(analysis: AnalyzedPredictions):
+        '''
+        :return: A dictionary from the name of each long-format report to its frame.
+        '''
+        predictions_table = analysis.predictions_match_table
+        labels_table = analysis.labels_match_table
+        predictions = ReportWriter.with_scalar_columns(predictions_table.predictions, analysis.matched_predictions)
+        predictions.insert(0, PREDICTION_ID, range(len(predictions)))
+        clusters = ReportWriter.with_scalar_columns(labels_table.clusters, analysis.matched_labels)
+        clusters.insert(0, CLUSTER_ID, range(len(clusters)))
+        # each matched cluster with the prediction it is matched to, out of all the predictions
+        cluster_matches = ReportWriter.get_match_edges(labels_table).join(
+            labels_table.predictions, on=PREDICTION_ID)
+        return {
+            'all': analysis.predictions_with_labels_frame,
+            'labeled': analysis.labeled,
+            'predictions': predictions,
+            'prediction_matches': ReportWriter.get_match_edges(predictions_table),
+            'clusters': clusters,
+            'cluster_members': labels_table.members,
+            'cluster_matches': cluster_matches
+        }
+
+    def get_report_path(self, directory, report_name):
+        return os.path.join(directory, f'{report_name}.{self.report_format}')
+
+    def write_report(self, frame, path):
+        if self.report_format == PARQUET:
+            frame.to_parquet(path, index=False)
+        else:
+            frame.to_csv(path, index=False, compression='gzip')
+        return path
+
+    def write(self, analysis: AnalyzedPredictions, directory):
+        '''
+        :return: A dictionary from the name of each written report to its path.
+        '''
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        if self.report_format == CSV:
+            analysis.to_csv(directory)
+            report_paths = {report_name: AnalyzedPredictions.get_report_path(directory, report_name)
+                            for report_name in CSV_REPORT_NAMES}
+            # unmatched_labels is not written when there are no matched labels
+            return {report_name: path for report_name, path in report_paths.items() if os.path.exists(path)}
+        reports = ReportWriter.get_long_reports(analysis)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {report_name: executor.submit(self.write_report, frame,
+                                                    self.get_report_path(directory, report_name))
+                       for report_name, frame in reports.items()}
+            result = {report_name: future.result() for report_name, future in futures.items()}
+        logging.info(f'Wrote {len(result)} {self.report_format} reports to {directory}')
+        return result
@@ -0,0 +1,140 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+from typing import List
+
+import numpy
+import pandas
+
+from yaso_tsa.Analysis.AnalzyedPredictions import AnalyzedPredictions, TARGET_EXTRACTION, SENTIMENT_CLASSIFICATION, \
+    TARGETED_SENTIMENT_ANALYSIS, IS_IGNORE_LABEL, NUM_PREDICTIONS, PRECISION, RECALL, F1, \
+    NUM_LABELED_CLUSTERS, NUM_COVERED_VALID_TARGET_GROUPS, get_measure_name
+from yaso_tsa.infra.SentimentTargets import TARGET_TEXT
+from yaso_tsa.infra.TsaLabels import TsaLabels
+
+TERM = 'term'
+ACCURACY = 'accuracy'
+
+# The counts of each term, that the term stats are computed from
+TERM_COUNTS = [
+    NUM_LABELED_CLUSTERS, NUM_COVERED_VALID_TARGET_GROUPS, NUM_PREDICTIONS,
+    AnalyzedPredictions.TARGET_EXTRACTION_CORRECT, AnalyzedPredictions.SENTIMENT_PREDICTION_CORRECT,
+    AnalyzedPredictions.FULL_PIPELINE_CORRECT
+]
+
+
+class TermBreakdown:
+
+    '''
+    The stats of each target term of an evaluation, where the term of a prediction or of a labeled target group is
+    its normalized text (see TsaLabels.normalize_target_texts). The evaluated predictions of each term, their
+    correct predictions and the labeled target groups of the term are counted once, with groupbys over the matched
+    frames of the evaluation, and the precision, recall, F1 and sentiment accuracy of each term are computed from
+    them as in AnalyzedPredictions.compute_stats, so that the counts of all the terms sum to the counts of the
+    evaluation, except that with ignore_unlabeled, a prediction that is both unlabeled and an ignore label is not
+    evaluated, and is not subtracted twice as in compute_stats. The terms frame is then queried, e.g. for the
+    hardest targets, without evaluating again.
+    '''
+
+    def __init__(self, analysis: AnalyzedPredictions):
+        self.name = analysis.name
+        self.term_counts = TermBreakdown.get_term_counts(analysis)
+        self.terms = TermBreakdown.compute_term_stats(self.term_counts)
+
+    def __repr__(self):
+        return f"<TermBreakdown {self.name}, terms: {len(self.terms)}>"
+
+    @staticmethod
+    def get_term_counts(analysis: AnalyzedPredictions):
+        '''
+        :return: A frame indexed by term, with a column per count of TERM_COUNTS.
+        '''
+        matched_predictions = analysis.matched_predictions
+        matched_labels = analysis.matched_labels
+        counts = []
+        if not matched_predictions.empty:
+            is_evaluated = ~matched_predictions[IS_IGNORE_LABEL].to_numpy(dtype=bool)
+            if analysis.ignore_unlabeled:
+                is_evaluated &= ~matched_predictions['is_unlabeled'].to_numpy(dtype=bool)
+            prediction_counts = pandas.DataFrame({
+                NUM_PREDICTIONS: is_evaluated.astype(int),
+                **{column_name: matched_predictions[column_name].to_numpy(dtype=bool).astype(int)
+                   for column_name in TERM_COUNTS[3:]}
+            })
+            prediction_counts[TERM] = TsaLabels.normalize_target_texts(
+                matched_predictions['prediction.target_text']).to_numpy()
+            counts.append(prediction_counts)
+        clusters = analysis.labels_match_table.clusters
+        if not clusters.empty:
+            label_counts = pandas.DataFrame({
+                NUM_LABELED_CLUSTERS: numpy.ones(len(clusters), dtype=int),
+                NUM_COVERED_VALID_TARGET_GROUPS: matched_labels['is_covered_label'].to_numpy(dtype=bool).astype(int),
+                TERM: TsaLabels.normalize_target_texts(clusters[TARGET_TEXT]).to_numpy()
+            })
+            counts.append(label_counts)
+        if not counts:
+            return pandas.DataFrame(columns=TERM_COUNTS, index=pandas.Index([], name=TERM), dtype=int)
+        result = pandas.concat(counts, ignore_index=True).groupby(TERM).sum()
+        return result.reindex(columns=TERM_COUNTS, fill_value=0).fillna(0).astype(int)
+
+    @staticmethod
+    def compute_term_stats(term_counts):
+        '''
+        :return: The term counts, with the precision, recall and F1 of the target extraction and of the full pipeline,
+        and the accuracy of the sentiment prediction, of each term. The sentiment accuracy of a term without correctly
+        extracted targets is NaN.
+        '''
+        result = term_counts.copy()
+        num_predictions = term_counts[NUM_PREDICTIONS].to_numpy(dtype=float)
+        num_labels = term_counts[NUM_LABELED_CLUSTERS].to_numpy(dtype=float)
+        num_extracted = term_counts[AnalyzedPredictions.TARGET_EXTRACTION_CORRECT].to_numpy(dtype=float)
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            for task_name, correct_column in [(TARGET_EXTRACTION, AnalyzedPredictions.TARGET_EXTRACTION_CORRECT),
+                                              (TARGETED_SENTIMENT_ANALYSIS, AnalyzedPredictions.FULL_PIPELINE_CORRECT)]:
+                num_correct = term_counts[correct_column].to_numpy(dtype=float)
+                precision = numpy.where(num_predictions > 0, num_correct / num_predictions, 0)
+                recall = numpy.where(num_labels > 0, num_correct / num_labels, 0)
+                result[get_measure_name(task_name, metric=PRECISION)] = precision
+                result[get_measure_name(task_name, metric=RECALL)] = recall
+                result[get_measure_name(task_name, metric=F1)] = numpy.where(
+                    precision + recall > 0, 2 * precision * recall / (precision + recall), 0)
+            num_sentiment_correct = term_counts[AnalyzedPredictions.SENTIMENT_PREDICTION_CORRECT].to_numpy(dtype=float)
+            result[get_measure_name(SENTIMENT_CLASSIFICATION, metric=ACCURACY)] = numpy.where(
+                num_extracted > 0, num_sentiment_correct / num_extracted, numpy.nan)
+        return result
+
+    @staticmethod
+    def combine(breakdowns: List['TermBreakdown']):
+        '''
+        :return: The stats of each term over all the breakdowns (e.g. of the files of a corpus), from their summed
+        counts.
+        '''
+        term_counts = pandas.concat([breakdown.term_counts for breakdown in breakdowns])
+        return TermBreakdown.compute_term_stats(term_counts.groupby(level=0).sum())
+
+    def get_term(self, target_text):
+        '''
+        :return: The stats of the term of the given target text, which is normalized as the terms are.
+        '''
+        term = TsaLabels.normalize_target_texts([target_text]).iloc[0]
+        if term not in self.terms.index:
+            raise KeyError(f'Unknown term "{term}"')
+        return self.terms.loc[term]
+
+    def get_hardest_terms(self, task_name=TARGETED_SENTIMENT_ANALYSIS, metric=F1, min_support=1, num_terms=None):
+        '''
+        :param metric: A metric of the task that is higher for better terms (precision, recall or F1, or accuracy
+        for the sentiment prediction).
+        :param min_support: The minimal number of labeled target groups of a ranked term.
+        :return: The terms frame, ordered from the term with the lowest metric, and among terms with the same metric,
+        from the term with the most labeled target groups.
+        '''
+        measure_name = get_measure_name(task_name, metric=metric)
+        if measure_name not in self.terms.columns:
+            raise ValueError(f'Unknown measure "{measure_name}" of the terms')
+        result = self.terms[self.terms[NUM_LABELED_CLUSTERS] >= min_support]
+        result = result.sort_values(by=[measure_name, NUM_LABELED_CLUSTERS], ascending=[True, False],
+                                    kind='mergesort', na_position='last')
+        return result if num_terms is None else result.head(num_terms)
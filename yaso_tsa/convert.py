@@ -0,0 +1,331 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+'''
+Convert labeled (or predicted) sentences between the supported formats, without loading the files into frames:
+    json: a list of sentences, with their targets (the format of YASO, TSA-MD and the predictions files)
+    jsonl: a sentence per line, in the json format
+    xml: SemEval sentences, with their aspect terms (see TsaData.read_xml)
+    csv: a target per row, with the columns of SentimentTargets.to_csv
+The sentences are read in one thread, and written in another, through a bounded queue of batches of sentences,
+so the sentences are not all kept in memory. The csv reader keeps the texts of the sentences that were read, to
+detect rows that are not grouped by sentence (see read_csv_records). Each sentence is a record in the json format, and the
+sentiment "neutral" is read as "none", as in SentimentTargets.from_json_records.
+'''
+
+import argparse
+import csv
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape, quoteattr
+
+from yaso_tsa.infra.JsonRecordReader import JsonRecordReader, write_json_records
+
+logging.basicConfig(format='[%(threadName)s] %(asctime)s,%(msecs)d %(levelname)-8s [%(filename)s:%(lineno)d] %(message)s',
+                    datefmt='%Y-%m-%d:%H:%M:%S',
+                    level=logging.INFO)
+
+JSON = 'json'
+JSONL = 'jsonl'
+XML = 'xml'
+CSV = 'csv'
+
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_QUEUE_SIZE = 16
+
+# the columns of SentimentTargets.to_csv (its KEY_COLUMNS and the sentiment)
+CSV_TARGET_TEXT = 'target_text'
+CSV_SENTENCE_TEXT = 'text'
+CSV_BEGIN = 'location_begin'
+CSV_END = 'location_end'
+CSV_SENTIMENT = 'sentiment'
+CSV_COLUMNS = [CSV_TARGET_TEXT, CSV_SENTENCE_TEXT, CSV_BEGIN, CSV_END, CSV_SENTIMENT]
+
+SENTIMENT_MAPPING = {'neutral': 'none'}
+# SemEval names the sentiment "none" neutral
+XML_SENTIMENT_MAPPING = {'none': 'neutral'}
+
+# the csv values that are read as numbers, so that e.g. "nan" or "inf" are kept as strings, and are not written
+# as invalid json
+INT_PATTERN = re.compile(r'[+-]?\d+')
+FLOAT_PATTERN = re.compile(r'[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?')
+
+
+def normalize_record(record):
+    for target in record.get('targets', []):
+        sentiment = target.get('sentiment')
+        if sentiment in SENTIMENT_MAPPING:
+            target['sentiment'] = SENTIMENT_MAPPING[sentiment]
+    return record
+
+
+def read_json_records(path, meta_fields=[], group_rows=False):
+    '''
+    :return: A generator of the sentences of a json or jsonl file, with all their fields.
+    '''
+    for record in JsonRecordReader(path):
+        yield normalize_record(record)
+
+
+def read_xml_records(path, meta_fields=[], group_rows=False):
+    '''
+    :return: A generator of the sentences of a SemEval xml file, each parsed when its end tag is read.
+    '''
+    for _, element in ET.iterparse(path, events=('end',)):
+        if element.tag != 'sentence':
+            continue
+        text_elements = element.findall('text')
+        if len(text_elements) != 1:
+            raise RuntimeError(f'Unexpected {len(text_elements)} sentence text elements')
+        targets = [{
+            'text': aspect_term.get('term'),
+            'location': {
+                'begin': int(aspect_term.get('from')),
+                'end': int(aspect_term.get('to'))
+            },
+            'sentiment': aspect_term.get('polarity')
+        } for aspect_term in element.iter('aspectTerm')]
+        record = {'text': text_elements[0].text or '', 'targets': targets}
+        record.update({field: element.get(field) for field in meta_fields})
+        # the parsed sentences are not needed anymore
+        element.clear()
+        yield normalize_record(record)
+
+
+def parse_csv_value(value):
+    if value == '':
+        return None
+    if INT_PATTERN.fullmatch(value):
+        return int(value)
+    if FLOAT_PATTERN.fullmatch(value):
+        return float(value)
+    return value
+
+
+def read_csv_records(path, meta_fields=[], group_rows=False):
+    '''
+    :param meta_fields: The columns that are fields of the sentence. The other columns are fields of the targets.
+    :param group_rows: Whether the rows of each sentence text are grouped over the whole file, e.g. for the shuffled
+    output of SentimentTargets.to_csv. The sentences are then kept in memory until the file is read. Otherwise, the
+    rows of each sentence must be consecutive, and a sentence text that appears again after another sentence raises
+    a ValueError. To detect this, the texts of the sentences that were read are kept, so the memory grows with the
+    number of sentences in the file, though not with their targets.
+    :return: A generator of the sentences of a csv file, each with the targets of its rows, in the order of the first
+    row of each sentence.
+    '''
+    with open(path, newline='', encoding='utf-8') as f:
+        record = None
+        # the sentences read so far, by their text
+        records = {}
+        for row in csv.DictReader(f):
+            text = row[CSV_SENTENCE_TEXT]
+            if record is None or text != record['text']:
+                if text in records:
+                    if not group_rows:
+                        raise ValueError(f'The rows of sentence "{text}" are not consecutive in "{path}", sort the '
+                                         f'rows by sentence, or group the rows of the whole file')
+                    record = records[text]
+                else:
+                    if record is not None and not group_rows:
+                        yield normalize_record(record)
+                    record = {'text': text, 'targets': []}
+                    record.update({field: parse_csv_value(row[field]) for field in meta_fields})
+                    # when the rows are consecutive, only the texts are kept, to detect unsorted rows
+                    records[text] = record if group_rows else None
+            target = {
+                'text': row[CSV_TARGET_TEXT],
+                'location': {
+                    'begin': int(float(row[CSV_BEGIN])),
+                    'end': int(float(row[CSV_END]))
+                }
+            }
+            target.update({column_name: parse_csv_value(value) for column_name, value in row.items()
+                           if column_name not in CSV_COLUMNS[:4] and column_name not in meta_fields})
+            record['targets'].append(target)
+        if group_rows:
+            for record in records.values():
+                yield normalize_record(record)
+        elif record is not None:
+            yield normalize_record(record)
+
+
+def write_json_list(records, path, extra_columns=[]):
+    return write_json_records(records, path)
+
+
+def write_jsonl_records(records, path, extra_columns=[]):
+    num_records = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False))
+            f.write('\n')
+            num_records += 1
+    return num_records
+
+
+def write_xml_records(records, path, extra_columns=[]):
+    num_records = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="utf-8"?>\n<sentences>\n')
+        for record in records:
+            attributes = ''.join(f' {field}={quoteattr(str(record[field]))}'
+                                 for field in extra_columns if record.get(field) is not None)
+            f.write(f'\t<sentence{attributes}>\n\t\t<text>{escape(record["text"])}</text>\n')
+            targets = record.get('targets', [])
+            if targets:
+                f.write('\t\t<aspectTerms>\n')
+                for target in targets:
+                    sentiment = target.get('sentiment')
+                    f.write(f'\t\t\t<aspectTerm from="{int(target["location"]["begin"])}" '
+                            f'polarity={quoteattr(str(XML_SENTIMENT_MAPPING.get(sentiment, sentiment)))} '
+                            f'term={quoteattr(target["text"])} to="{int(target["location"]["end"])}"/>\n')
+                f.write('\t\t</aspectTerms>\n')
+            else:
+                f.write('\t\t<aspectTerms/>\n')
+            f.write('\t</sentence>\n')
+            num_records += 1
+        f.write('</sentences>\n')
+    return num_records
+
+
+def write_csv_records(records, path, extra_columns=[]):
+    '''
+    Write a row per target, with the columns of SentimentTargets.to_csv(with_sentiment=True), and the extra columns,
+    that are taken from the target, or else from its sentence. Sentences without targets are not written.
+    '''
+    num_records = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(CSV_COLUMNS + extra_columns)
+        for record in records:
+            for target in record.get('targets', []):
+                writer.writerow([
+                    target['text'], record['text'], int(target['location']['begin']),
+                    int(target['location']['end']), target.get('sentiment')
+                ] + [target[column_name] if column_name in target else record.get(column_name)
+                     for column_name in extra_columns])
+            num_records += 1
+    return num_records
+
+
+READERS = {
+    JSON: read_json_records,
+    JSONL: read_json_records,
+    XML: read_xml_records,
+    CSV: read_csv_records,
+}
+
+WRITERS = {
+    JSON: write_json_list,
+    JSONL: write_jsonl_records,
+    XML: write_xml_records,
+    CSV: write_csv_records,
+}
+
+
+def get_format(path, file_format=None):
+    '''
+    :return: The given format, or else the format of the extension of the path.
+    '''
+    if file_format is None:
+        file_format = os.path.splitext(path)[1].lstrip('.').lower()
+    if file_format not in READERS:
+        raise ValueError(f'Unknown format "{file_format}" of "{path}", supported formats are {list(READERS)}')
+    return file_format
+
+
+def read_batches(records, batches, batch_size, stop):
+    '''
+    Put batches of the records in the queue, followed by None, or by the exception raised while reading them.
+    :param stop: An event that is set when the batches are no longer read, e.g. when the writer failed.
+    '''
+    try:
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) == batch_size:
+                if stop.is_set():
+                    return
+                batches.put(batch)
+                batch = []
+        if batch:
+            batches.put(batch)
+        batches.put(None)
+    except BaseException as e:
+        batches.put(e)
+
+
+def iterate_batches(batches):
+    while True:
+        batch = batches.get()
+        if batch is None:
+            return
+        if isinstance(batch, BaseException):
+            raise batch
+        yield from batch
+
+
+def convert(input_path, output_path, input_format=None, output_format=None, meta_fields=[], extra_columns=[],
+            group_rows=False, batch_size=DEFAULT_BATCH_SIZE, queue_size=DEFAULT_QUEUE_SIZE):
+    '''
+    :param meta_fields: The sentence fields that are read from xml attributes or csv columns (json fields are all read).
+    :param group_rows: Whether the rows of the csv input are grouped by sentence over the whole file (see
+    read_csv_records).
+    :param extra_columns: The fields that are written to csv columns or xml attributes (json fields are all written).
+    :param queue_size: The number of batches of sentences that are read ahead of the writer.
+    :return: The number of converted sentences.
+    '''
+    read_fun = READERS[get_format(input_path, input_format)]
+    write_fun = WRITERS[get_format(output_path, output_format)]
+    batches = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    reader = threading.Thread(target=read_batches,
+                              args=(read_fun(input_path, meta_fields, group_rows=group_rows), batches, batch_size, stop),
+                              name='reader', daemon=True)
+    reader.start()
+    try:
+        num_records = write_fun(iterate_batches(batches), output_path, extra_columns=extra_columns)
+    finally:
+        # when the writer fails, stop the reader, and unblock it if it waits for a place in the queue
+        stop.set()
+        while reader.is_alive():
+            try:
+                batches.get(timeout=0.1)
+            except queue.Empty:
+                pass
+    return num_records
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Convert sentences with targets between json, jsonl, SemEval xml and csv files, as a stream.')
+    parser.add_argument('--input_path', required=True, help='path of the input file')
+    parser.add_argument('--output_path', required=True, help='path of the output file')
+    parser.add_argument('--input_format', choices=list(READERS), default=None,
+                        help='format of the input file (default: by its extension)')
+    parser.add_argument('--output_format', choices=list(WRITERS), default=None,
+                        help='format of the output file (default: by its extension)')
+    parser.add_argument('--meta_field', action='append', default=[],
+                        help='a sentence field of the csv or xml input (json fields are all kept), may be repeated')
+    parser.add_argument('--extra_column', action='append', default=[],
+                        help='a target or sentence field to write to the csv or xml output, may be repeated')
+    parser.add_argument('--group_rows', action='store_true',
+                        help='group the csv input rows of each sentence over the whole file, when they are not '
+                             'consecutive (e.g. shuffled), keeping the sentences in memory')
+    args = parser.parse_args()
+
+    num_records = convert(args.input_path, args.output_path, input_format=args.input_format,
+                          output_format=args.output_format, meta_fields=args.meta_field,
+                          extra_columns=args.extra_column, group_rows=args.group_rows)
+    logging.info(f'Converted {num_records} sentences from "{args.input_path}" to "{args.output_path}"')
+
+
+if __name__ == '__main__':
+    main()
@@ -5,26 +5,22 @@
 
 
 import argparse
-import glob
-import hashlib
 import json
 import os
 from pathlib import Path
 
-import nltk
-import pandas as pd
 import xml.etree.ElementTree as ET
 
+from yaso_tsa.data.source_files import source_exists, open_source, list_source_files
+from yaso_tsa.data.source_index import txt_sha1, load_or_build_index, restore_from_index, get_text_hash
+from yaso_tsa.infra.JsonRecordReader import JsonRecordReader, write_json_records
 
-def txt_sha1(txt):
-    sha1 = hashlib.sha1()
-    sha1.update(txt.encode())
-    return sha1.hexdigest()
+SST_CHUNK_SIZE = 10000
 
 
 def resolve_path(path):
     path = os.path.expanduser(path)
-    if not os.path.exists(path):
+    if not source_exists(path):
         raise ValueError(f'Path does not exist: {os.path.abspath(path)}.'
                          f' Please refer to README file for instructions.')
     return path
@@ -54,26 +50,32 @@ def param_semeval_14(args):
     laptops = None if test_dir is None else os.path.join(test_dir, 'Laptops_Test_Gold.xml')
     restaurants = None if test_dir is None else os.path.join(test_dir, 'Restaurants_Test_Gold.xml')
     if test_dir is not None:
-        if not os.path.exists(laptops):
+        if not source_exists(laptops):
             raise ValueError(f'SemEval14 laptops file does not exist: {os.path.abspath(laptops)}')
-        if not os.path.exists(restaurants):
+        if not source_exists(restaurants):
             raise ValueError(f'SemEval14 restaurants file does not exist: {os.path.abspath(restaurants)}')
     return {'xml_files': [laptops, restaurants]}
 
 
 def restore_amazon(hashes, reviews_file):
+    # only the Amazon reviews need sentence splitting, so nltk is loaded just for them
+    import nltk
+    # the hashes are (review id, text hash) pairs, that are matched by their text hash, as in restore_from_index
+    hash_keys_by_text_hash = {}
+    for hash_key in hashes:
+        hash_keys_by_text_hash.setdefault(get_text_hash(hash_key), []).append(hash_key)
     hash_to_restored_sentence = {}
-    with open(reviews_file, encoding='utf-8') as f:
+    with open_source(reviews_file, encoding='utf-8') as f:
         for line in f:
             file_record = json.loads(line)
             sentences = nltk.sent_tokenize(file_record['review_body'])
             for sentence in sentences:
                 sentence = sentence.strip()
                 hash_str = txt_sha1(sentence)
-                if hash_str in hashes:
+                for hash_key in hash_keys_by_text_hash.get(hash_str, []):
                     restored_sentence = file_record.copy()
                     restored_sentence['text'] = sentence
-                    hash_to_restored_sentence[hash_str] = restored_sentence
+                    hash_to_restored_sentence[hash_key] = restored_sentence
                 if len(hash_to_restored_sentence) == len(hashes):
                     return hash_to_restored_sentence
 
@@ -81,15 +83,19 @@ def restore_amazon(hashes, reviews_file):
 
 
 def restore_sst(hashes, sst_dir):
-    def read_as_dict(file, delim, key_col, val_col, **read_kwargs):
-        df = pd.read_csv(file, delimiter=delim, **read_kwargs)
-        return {key: val for key, val in zip(df[key_col], df[val_col])}
+    import pandas as pd
+
+    def read_chunks(file, delim, key_col, val_col, **read_kwargs):
+        # the files are read in chunks of rows, so they are not loaded into memory
+        with open_source(file) as f:
+            for df in pd.read_csv(f, delimiter=delim, chunksize=SST_CHUNK_SIZE, **read_kwargs):
+                yield from zip(df[key_col], df[val_col])
 
-    sent_split = read_as_dict(os.path.join(sst_dir, 'datasetSplit.txt'), ',', 'sentence_index', 'splitset_label')
-    sentences = read_as_dict(os.path.join(sst_dir, 'datasetSentences.txt'), '\t', 'sentence_index', 'sentence')
+    sent_split = dict(read_chunks(os.path.join(sst_dir, 'datasetSplit.txt'), ',', 'sentence_index', 'splitset_label'))
+    sentences = read_chunks(os.path.join(sst_dir, 'datasetSentences.txt'), '\t', 'sentence_index', 'sentence')
 
     hash_to_restored_sentence = {}
-    for sent_id, sentence in sentences.items():
+    for sent_id, sentence in sentences:
         if sent_split[sent_id] == 2:
             sentence = sentence.strip().replace('-LRB- ', '(').replace(' -RRB-', ')')
             hash_str = txt_sha1(sentence)
@@ -104,9 +110,9 @@ def restore_sst(hashes, sst_dir):
 
 def restore_opinosis(hashes, topics_dir):
     hash_to_restored_sentence = {}
-    topic_files = glob.glob(os.path.join(topics_dir, '*.txt.data'))
+    topic_files = list_source_files(topics_dir, '*.txt.data')
     for topic_file in topic_files:
-        with open(topic_file, errors='ignore') as f:
+        with open_source(topic_file, errors='ignore') as f:
             for line in f:
                 sentence = line.strip()
                 hash_str = txt_sha1(sentence)
@@ -124,20 +130,45 @@ def restore_opinosis(hashes, topics_dir):
 def restore_semeval_14(hashes, xml_files):
     hash_to_restored_sentence = {}
     for xml_file in xml_files:
-        root = ET.parse(xml_file).getroot()
-        for sentence_tag in root.findall('sentence'):
-            sentence = sentence_tag.find('text').text.strip()
-            hash_str = txt_sha1(sentence)
-            if hash_str in hashes:
-                hash_to_restored_sentence[hash_str] = {
-                    'text': sentence
-                }
-            if len(hash_to_restored_sentence) == len(hashes):
-                return hash_to_restored_sentence
+        with open_source(xml_file) as f:
+            # parse one sentence at a time, instead of the whole tree
+            for _, sentence_tag in ET.iterparse(f):
+                if sentence_tag.tag != 'sentence':
+                    continue
+                sentence = sentence_tag.find('text').text.strip()
+                sentence_tag.clear()
+                hash_str = txt_sha1(sentence)
+                if hash_str in hashes:
+                    hash_to_restored_sentence[hash_str] = {
+                        'text': sentence
+                    }
+                if len(hash_to_restored_sentence) == len(hashes):
+                    return hash_to_restored_sentence
     return hash_to_restored_sentence
 
 
-def restore_text(data, out_json, src_param):
+def restore_source(src, hashes, kwargs, index_dir=None):
+    '''
+    Restore the texts of a source, by scanning the source, or through the index of the source (see source_index.py)
+    when an index directory is given. The few hashes that are not found in the index, if any, are restored by a scan.
+    '''
+    restore_fun = RESTORE_FUNCTIONS[src]['restore_fun']
+    if index_dir is None:
+        return restore_fun(hashes, **kwargs)
+    index = load_or_build_index(src, kwargs, index_dir)
+    hash2txt = restore_from_index(index, hashes)
+    missing = [h for h in hashes if h not in hash2txt]
+    if len(missing) > 0:
+        print(f'{len(missing)} sentences of {src} are not in its index, scanning the source for them')
+        hash2txt.update(restore_fun(missing, **kwargs))
+    return hash2txt
+
+
+def restore_text(data, out_json, src_param, index_dir=None):
+    '''
+    :param data: The records of yaso_hidden.json, as a list or as a JsonRecordReader, that is read twice, so that the
+    records are not kept in memory.
+    '''
     def _get_hash(r):
         if 'review_id' in r:
             return r['review_id'], r['text_hash']
@@ -155,7 +186,7 @@ def restore_text(data, out_json, src_param):
     for output_record in data:
         if output_record['text'] is None:
             src = output_record['source']
-            src_hashes[src] = src_hashes.get(src, []) + [_get_hash(output_record)]
+            src_hashes.setdefault(src, []).append(_get_hash(output_record))
 
     # Restore the texts, by calling the appropriate restore function, for
     # each source. The restore function restores all the texts for
@@ -169,35 +200,29 @@ def restore_text(data, out_json, src_param):
             print(f'No input argument provided for source {src}. Its {len(hashes)} sentences will not be restored.')
         else:
             print(f'Restoring {len(hashes)} sentences from {src}')
-            hash2txt = RESTORE_FUNCTIONS[src]['restore_fun'](hashes, **kwargs)
+            hash2txt = restore_source(src, hashes, kwargs, index_dir=index_dir)
             # replace the list of per-source hash values, with a mapping of
             # hash values to their original texts
             src_hashes[src] = hash2txt
             src_missing_hashes[src] = [h for h in hashes if h not in hash2txt]
 
-    out_data = []
-    for output_record in data:
-        restored = False
-        if output_record['text'] is None:
-            hash_to_restored_sentences = src_hashes[output_record['source']]
-            if hash_to_restored_sentences is not None:
-                # restored texts exists for this source
-                text_hash = _get_hash(output_record)
-                if text_hash in hash_to_restored_sentences:
-                    # restored text found for this text
-                    restored_sentence = hash_to_restored_sentences[text_hash]
-                    output_record.update(restored_sentence)
-                    _remove_hash(output_record)
-                    out_data.append(output_record)
-                    restored = True
-
-        if not restored:
-            out_data.append(output_record)
-
-    with open(out_json, 'w', encoding='utf-8') as f:
-        json.dump(out_data, f, ensure_ascii=False, indent=2)
-
-    print(f'{len(out_data)} sentences with restored text saved to {os.path.abspath(out_json)}')
+    def restore_records():
+        for output_record in data:
+            if output_record['text'] is None:
+                hash_to_restored_sentences = src_hashes[output_record['source']]
+                if hash_to_restored_sentences is not None:
+                    # restored texts exists for this source
+                    text_hash = _get_hash(output_record)
+                    if text_hash in hash_to_restored_sentences:
+                        # restored text found for this text
+                        restored_sentence = hash_to_restored_sentences[text_hash]
+                        output_record.update(restored_sentence)
+                        _remove_hash(output_record)
+            yield output_record
+
+    num_records = write_json_records(restore_records(), out_json)
+
+    print(f'{num_records} sentences with restored text saved to {os.path.abspath(out_json)}')
     for src, missing in src_missing_hashes.items():
         if len(missing) > 0:
             print(f'{len(missing)} sentence hash codes not resolved for source {src}:\n\t{missing}')
@@ -209,8 +234,7 @@ def prepare_src_param(in_json, args):
     for the source. That function will extract the relevant params for
     the source (if they were provided in the input).
     '''
-    with open(in_json, encoding='utf-8') as f:
-        data = json.load(f)
+    data = JsonRecordReader(in_json)
     src_param = {rec['source']: None for rec in data}
     for src in src_param:
         if src in RESTORE_FUNCTIONS:
@@ -245,6 +269,9 @@ def main():
     parser.add_argument('--sst', help='path to directory stanfordSentimentTreebank')
     parser.add_argument('--opinosis', help='path to directory topics')
     parser.add_argument('--semeval', help='path to directory ABSA_Gold_TestData')
+    parser.add_argument('--index_dir', help='directory of the indexes of the sources, that are built on the first '
+                                            'run, and rebuilt when the source files change, to restore the sentences '
+                                            'without scanning the sources')
 
     args = parser.parse_args()
 
@@ -252,7 +279,7 @@ def main():
     out_file = 'yaso.json'
 
     in_data, source_param = prepare_src_param(in_file, args)
-    restore_text(in_data, out_file, source_param)
+    restore_text(in_data, out_file, source_param, index_dir=args.index_dir)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,139 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+'''
+Read the source files of restore_texts.py as streams, also when they are compressed (gzip, bz2 or xz) or inside a zip
+archive, as they are downloaded from the upstream datasets, without extracting them to disk.
+A file inside a zip archive is given by the path of the archive followed by the path of the file, e.g.
+stanfordSentimentTreebank.zip/datasetSentences.txt, where the path of the file may omit the top directories of the
+archive (the archive stanfordSentimentTreebank.zip has the file stanfordSentimentTreebank/datasetSentences.txt).
+'''
+
+import bz2
+import fnmatch
+import glob
+import gzip
+import io
+import lzma
+import os
+import zipfile
+
+COMPRESSED_OPENERS = {
+    '.gz': gzip.open,
+    '.bz2': bz2.open,
+    '.xz': lzma.open
+}
+ZIP_EXTENSION = '.zip'
+
+
+def split_archive_path(path):
+    '''
+    :return: The path of the zip archive and the path of the file inside it, or the path and None if the path is not
+    inside a zip archive. The path of a zip archive itself is returned with an empty file path.
+    '''
+    normalized_path = path.replace(os.sep, '/')
+    marker = ZIP_EXTENSION + '/'
+    position = normalized_path.lower().find(marker)
+    if position >= 0:
+        archive_end = position + len(ZIP_EXTENSION)
+        return path[:archive_end], normalized_path[archive_end + 1:].strip('/')
+    if normalized_path.lower().endswith(ZIP_EXTENSION):
+        return path, ''
+    return path, None
+
+
+def is_plain_file(path):
+    '''
+    :return: True if the path is of an uncompressed file on disk, whose byte offsets are those of its content.
+    '''
+    _, member = split_archive_path(path)
+    return member is None and os.path.splitext(path)[1].lower() not in COMPRESSED_OPENERS
+
+
+def find_member(archive, member):
+    '''
+    :return: The name of the file of the archive, whose path is the given path or ends with it. An empty path finds
+    the only file of an archive with a single file.
+    '''
+    names = [name for name in archive.namelist() if not name.endswith('/')]
+    if not member:
+        if len(names) != 1:
+            raise ValueError(f'Expected a single file in {archive.filename}, found {len(names)} files')
+        return names[0]
+    if member in names:
+        return member
+    matches = [name for name in names if name.endswith('/' + member)]
+    if len(matches) != 1:
+        raise ValueError(f'Expected a single file {member} in {archive.filename}, found {matches}')
+    return matches[0]
+
+
+def source_exists(path):
+    archive_path, member = split_archive_path(path)
+    if member is None or not os.path.isfile(archive_path):
+        return os.path.exists(path)
+    if not member:
+        return True
+    with zipfile.ZipFile(archive_path) as archive:
+        try:
+            find_member(archive, member)
+        except ValueError:
+            return False
+    return True
+
+
+def open_source(path, encoding=None, errors=None):
+    '''
+    :param encoding: The encoding of a text stream, or None for a binary stream. If errors is given, a text stream
+    of the default encoding is returned.
+    :return: A stream of the content of the file, that is decompressed while it is read.
+    '''
+    archive_path, member = split_archive_path(path)
+    if member is not None:
+        with zipfile.ZipFile(archive_path) as archive:
+            # the opened file keeps the archive file open until it is closed
+            binary_file = archive.open(find_member(archive, member))
+    else:
+        opener = COMPRESSED_OPENERS.get(os.path.splitext(path)[1].lower(), open)
+        binary_file = opener(path, 'rb')
+    if encoding is None and errors is None:
+        return binary_file
+    return io.TextIOWrapper(binary_file, encoding=encoding, errors=errors)
+
+
+def list_source_files(directory, pattern):
+    '''
+    :return: The sorted paths of the files of the directory (or of a directory inside a zip archive, or of any of the
+    directories of the archive) whose names match the pattern, e.g. '*.txt.data'.
+    '''
+    archive_path, member = split_archive_path(directory)
+    if member is None:
+        return sorted(glob.glob(os.path.join(directory, pattern)))
+    with zipfile.ZipFile(archive_path) as archive:
+        names = [name for name in archive.namelist() if not name.endswith('/')]
+    prefix = member + '/' if member else ''
+    result = []
+    for name in names:
+        if not prefix:
+            # the files of the archive itself, in any of its directories
+            relative_name = name.rsplit('/', 1)[-1]
+        else:
+            # the directory may omit the top directories of the archive
+            position = name.find(prefix)
+            if position < 0 or (position > 0 and name[position - 1] != '/'):
+                continue
+            relative_name = name[position + len(prefix):]
+        if '/' not in relative_name and fnmatch.fnmatch(relative_name, pattern):
+            result.append(f'{archive_path}/{name}')
+    return sorted(result)
+
+
+def get_source_path_on_disk(path):
+    '''
+    :return: The path of the file on disk that holds the content of the given path (the archive of a file in a zip).
+    '''
+    archive_path, member = split_archive_path(path)
+    return path if member is None else archive_path
+
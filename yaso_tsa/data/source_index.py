@@ -0,0 +1,290 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+'''
+A persistent index of the sentences of the source corpora of restore_texts.py: for each source, the SHA-1 of each
+sentence that may be restored, and the location of its record in the source files (the file, the byte offset and
+length of the record, and the span of the sentence in the text of the record). The index is built once per source,
+and saved, so that later restores (also of updated versions of yaso_hidden.json) read only the records they need,
+through mmap, instead of scanning and hashing the whole corpus. An index is rebuilt when the size or the modification
+time of one of its files changes. Compressed sources (see source_files.py) are indexed by the offsets in their
+decompressed content, and their records are read by decompressing up to them, without hashing the other records.
+'''
+
+import hashlib
+import html
+import json
+import mmap
+import os
+import re
+from pathlib import Path
+
+from yaso_tsa.data.source_files import open_source, list_source_files, is_plain_file, get_source_path_on_disk
+
+INDEX_VERSION = 1
+
+
+def txt_sha1(txt):
+    sha1 = hashlib.sha1()
+    sha1.update(txt.encode())
+    return sha1.hexdigest()
+
+
+def iterate_lines(path):
+    '''
+    :return: A generator of the byte offset and the bytes of each line of the file.
+    '''
+    with open_source(path) as f:
+        offset = 0
+        for line in f:
+            yield offset, line
+            offset += len(line)
+
+
+def get_stripped_span(text, begin, end):
+    '''
+    :return: The span of text[begin:end] without its leading and trailing whitespace.
+    '''
+    sentence = text[begin:end]
+    stripped_begin = begin + len(sentence) - len(sentence.lstrip())
+    return stripped_begin, max(stripped_begin, begin + len(sentence.rstrip()))
+
+
+# Amazon: a json record per line, whose review is split into sentences
+
+def amazon_files(reviews_file):
+    return [reviews_file]
+
+
+def amazon_sentences(reviews_file):
+    import nltk
+    for offset, line in iterate_lines(reviews_file):
+        review = json.loads(line)['review_body']
+        position = 0
+        for sentence in nltk.sent_tokenize(review):
+            begin = review.find(sentence, position)
+            if begin < 0:
+                # the tokenizer changed the sentence, it is restored by a scan of the file
+                continue
+            position = begin + len(sentence)
+            begin, end = get_stripped_span(review, begin, position)
+            yield 0, offset, len(line), begin, end, review[begin:end]
+
+
+def amazon_restore(path, record, begin, end):
+    restored_sentence = json.loads(record)
+    restored_sentence['text'] = restored_sentence['review_body'][begin:end]
+    return restored_sentence
+
+
+# SST: a line per sentence, of which only the sentences of the test split are restored
+
+def sst_files(sst_dir):
+    return [os.path.join(sst_dir, 'datasetSentences.txt'), os.path.join(sst_dir, 'datasetSplit.txt')]
+
+
+def sst_text(sentence):
+    return sentence.strip().replace('-LRB- ', '(').replace(' -RRB-', ')')
+
+
+def sst_sentences(sst_dir):
+    sentences_file, split_file = sst_files(sst_dir)
+    with open_source(split_file, encoding='utf-8') as f:
+        next(f)
+        sent_split = dict(line.strip().split(',') for line in f if line.strip())
+    for line_i, (offset, line) in enumerate(iterate_lines(sentences_file)):
+        decoded = line.decode('utf-8').rstrip('\r\n')
+        if line_i == 0 or '\t' not in decoded:
+            continue
+        sent_id, sentence = decoded.split('\t', 1)
+        if sent_split.get(sent_id) == '2':
+            begin = len(sent_id) + 1
+            yield 0, offset, len(line), begin, len(decoded), sst_text(sentence)
+
+
+def sst_restore(path, record, begin, end):
+    return {'text': sst_text(record.decode('utf-8')[begin:end])}
+
+
+# Opinosis: a line per sentence, in a file per topic
+
+def opinosis_files(topics_dir):
+    return list_source_files(topics_dir, '*.txt.data')
+
+
+def opinosis_sentences(topics_dir):
+    for file_i, topic_file in enumerate(opinosis_files(topics_dir)):
+        for offset, line in iterate_lines(topic_file):
+            decoded = line.decode('utf-8', errors='ignore')
+            begin, end = get_stripped_span(decoded, 0, len(decoded))
+            yield file_i, offset, len(line), begin, end, decoded[begin:end]
+
+
+def opinosis_restore(path, record, begin, end):
+    return {
+        'text': record.decode('utf-8', errors='ignore')[begin:end],
+        'topic': Path(Path(path).stem).stem
+    }
+
+
+# SemEval14: the text element of each sentence, in xml files
+
+XML_TEXT = re.compile(rb'<text>(.*?)</text>', re.DOTALL)
+
+
+def semeval_14_files(xml_files):
+    return list(xml_files)
+
+
+def semeval_14_sentences(xml_files):
+    for file_i, xml_file in enumerate(xml_files):
+        with open_source(xml_file) as f:
+            content = f.read()
+        for match in XML_TEXT.finditer(content):
+            text = html.unescape(match.group(1).decode('utf-8'))
+            begin, end = get_stripped_span(text, 0, len(text))
+            yield file_i, match.start(1), len(match.group(1)), begin, end, text[begin:end]
+
+
+def semeval_14_restore(path, record, begin, end):
+    return {'text': html.unescape(record.decode('utf-8'))[begin:end]}
+
+
+INDEX_FUNCTIONS = {
+    'Amazon': {
+        'files_fun': amazon_files,
+        'sentences_fun': amazon_sentences,
+        'restore_fun': amazon_restore,
+    },
+    'SST2': {
+        'files_fun': sst_files,
+        'sentences_fun': sst_sentences,
+        'restore_fun': sst_restore,
+    },
+    'Opinosis': {
+        'files_fun': opinosis_files,
+        'sentences_fun': opinosis_sentences,
+        'restore_fun': opinosis_restore,
+    },
+    'SemEval14': {
+        'files_fun': semeval_14_files,
+        'sentences_fun': semeval_14_sentences,
+        'restore_fun': semeval_14_restore,
+    },
+}
+
+
+def get_file_stats(files):
+    result = []
+    for path in files:
+        stat = os.stat(get_source_path_on_disk(path))
+        result.append({'path': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns})
+    return result
+
+
+def get_index_path(index_dir, src):
+    return os.path.join(index_dir, f'{src}.index.json')
+
+
+def build_index(src, src_kwargs):
+    '''
+    :param src_kwargs: The arguments of the restore function of the source (see RESTORE_FUNCTIONS in restore_texts.py).
+    :return: The index of the source: the stats of its files, and for each sentence hash, the file index, the byte
+    offset and length of the record, and the begin and end of the sentence in the text of the record.
+    '''
+    functions = INDEX_FUNCTIONS[src]
+    files = functions['files_fun'](**src_kwargs)
+    entries = {}
+    for file_i, offset, length, begin, end, text in functions['sentences_fun'](**src_kwargs):
+        entries.setdefault(txt_sha1(text), [file_i, offset, length, begin, end])
+    return {
+        'version': INDEX_VERSION,
+        'source': src,
+        'files': get_file_stats(files),
+        'entries': entries
+    }
+
+
+def is_stale(index, src, src_kwargs):
+    '''
+    :return: True if the index is of another version, or if the files of the source changed since it was built.
+    '''
+    if index.get('version') != INDEX_VERSION or index.get('source') != src:
+        return True
+    files = INDEX_FUNCTIONS[src]['files_fun'](**src_kwargs)
+    try:
+        return index['files'] != get_file_stats(files)
+    except OSError:
+        return True
+
+
+def load_or_build_index(src, src_kwargs, index_dir):
+    '''
+    :return: The saved index of the source, or a new index, that is saved, when there is no saved index or it is stale.
+    '''
+    index_path = get_index_path(index_dir, src)
+    if os.path.exists(index_path):
+        with open(index_path, encoding='utf-8') as f:
+            index = json.load(f)
+        if not is_stale(index, src, src_kwargs):
+            return index
+        print(f'The index of source {src} is stale, rebuilding it')
+    print(f'Building the index of source {src} in {os.path.abspath(index_path)}')
+    index = build_index(src, src_kwargs)
+    Path(index_dir).mkdir(parents=True, exist_ok=True)
+    # write to a temporary file first, so that an interrupted build does not leave a partial index
+    temporary_path = f'{index_path}.tmp'
+    with open(temporary_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+    os.replace(temporary_path, index_path)
+    return index
+
+
+def get_text_hash(hash_key):
+    # the hashes of the Amazon sentences are (review id, text hash) pairs
+    return hash_key[1] if isinstance(hash_key, (tuple, list)) else hash_key
+
+
+def restore_from_index(index, hashes):
+    '''
+    :param hashes: The hashes to restore, as given to the restore function of the source.
+    :return: A dictionary from each restored hash to its restored sentence. Hashes that are not in the index, or whose
+    record no longer has the same sentence, are not restored.
+    '''
+    restore_fun = INDEX_FUNCTIONS[index['source']]['restore_fun']
+    entries = index['entries']
+    hashes_by_file = {}
+    for hash_key in hashes:
+        entry = entries.get(get_text_hash(hash_key))
+        if entry is not None:
+            hashes_by_file.setdefault(entry[0], []).append((entry, hash_key))
+    hash_to_restored_sentence = {}
+    for file_i, file_hashes in hashes_by_file.items():
+        path = index['files'][file_i]['path']
+        # read the records in the order of the file
+        file_hashes = sorted(file_hashes, key=lambda x: x[0][1])
+        records = read_records(path, [entry for entry, _ in file_hashes])
+        for ((_, _, _, begin, end), hash_key), record in zip(file_hashes, records):
+            restored_sentence = restore_fun(path, record, begin, end)
+            if txt_sha1(restored_sentence['text']) == get_text_hash(hash_key):
+                hash_to_restored_sentence[hash_key] = restored_sentence
+    return hash_to_restored_sentence
+
+
+def read_records(path, entries):
+    '''
+    :param entries: Index entries of the file, ordered by their offset.
+    :return: A generator of the bytes of the record of each entry.
+    '''
+    if is_plain_file(path):
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for _, offset, length, _, _ in entries:
+                yield mapped[offset:offset + length]
+    else:
+        # a compressed stream is decompressed up to each record
+        with open_source(path) as f:
+            for _, offset, length, _, _ in entries:
+                f.seek(offset)
+                yield f.read(length)
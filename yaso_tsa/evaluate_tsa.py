@@ -6,10 +6,6 @@
 import argparse
 import logging
 
-from yaso_tsa.Analysis.AnalzyedPredictions import AnalyzedPredictions, TARGETED_SENTIMENT_ANALYSIS, PRECISION, RECALL, F1
-from yaso_tsa.infra.TsaData import TsaData
-from yaso_tsa.infra.TsaLabels import TsaLabels
-
 logging.basicConfig(format='[%(threadName)s] %(asctime)s,%(msecs)d %(levelname)-8s [%(filename)s:%(lineno)d] %(message)s',
                     datefmt='%Y-%m-%d:%H:%M:%S',
                     level=logging.INFO)
@@ -26,18 +22,34 @@ def main():
                         help='extend the tsa labels via rules (default: false)',
                         action='store_true',
                         default=False)
+    parser.add_argument('--group_by',
+                        help='a sentence field of the labels file (e.g. domain), to also report the metrics of each '
+                             'of its values',
+                        default=None)
+    parser.add_argument('--report_directory', help='directory to write the evaluation reports to', default=None)
+    parser.add_argument('--report_format', choices=['csv', 'csv.gz', 'parquet'], default='csv.gz',
+                        help='format of the reports: wide csv files, or long-format compressed csv or parquet '
+                             '(requires pyarrow) files (default: csv.gz)')
 
     args = parser.parse_args()
 
+    # imported here, so that parsing the arguments (or failing to) does not wait for pandas to load
+    from yaso_tsa.Analysis.AnalzyedPredictions import AnalyzedPredictions, TARGETED_SENTIMENT_ANALYSIS, \
+        PRECISION, RECALL, F1, get_measure_name
+    from yaso_tsa.infra.TsaData import TsaData
+    from yaso_tsa.infra.TsaLabels import TsaLabels
+
     predictions = TsaData.read_json(path=args.predictions_path)
-    tsa_labels = TsaLabels.read_json(path=args.labels_path)
+    tsa_labels = TsaLabels.read_json(
+        path=args.labels_path, meta_fields=[args.group_by] if args.group_by else [])
     logging.info(f'Loaded labeled data: {tsa_labels}')
     if args.extend_labels:
         tsa_labels = tsa_labels.extend_labels()
         logging.info(f'Extended labeled data: {tsa_labels}')
     analysis = AnalyzedPredictions(
         tsa_data=predictions,
-        labeled_data=tsa_labels
+        labeled_data=tsa_labels,
+        group_by=args.group_by
     )
 
     def report_metric(metric):
@@ -47,6 +59,13 @@ def main():
     report_metric(PRECISION)
     report_metric(RECALL)
     report_metric(F1)
+    if args.group_by:
+        metric_names = [get_measure_name(TARGETED_SENTIMENT_ANALYSIS, metric=metric)
+                        for metric in [PRECISION, RECALL, F1]]
+        logging.info(f'Metrics by {args.group_by}:\n{analysis.grouped_stats.loc[metric_names].T}')
+    if args.report_directory:
+        from yaso_tsa.Analysis.ReportWriter import ReportWriter
+        ReportWriter(report_format=args.report_format).write(analysis, args.report_directory)
 
 
 if __name__ == '__main__':
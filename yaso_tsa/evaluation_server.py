@@ -0,0 +1,233 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+'''
+A long running evaluation server, that keeps the loaded and clustered labels in memory
+between evaluations. The server listens on a local HTTP port and handles requests concurrently.
+
+POST /evaluate with a json body of the form:
+    {
+        "labels_path": "<path to labels json file>",
+        "extend_labels": false,
+        "matchers": ["exact"],
+        "predictions": [<sentences with targets, in the format of the predictions json file>]
+    }
+returns the evaluation stats as a json dictionary.
+
+GET /labels returns the label sets that are currently loaded.
+'''
+
+import argparse
+import json
+import logging
+import math
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logging.basicConfig(format='[%(threadName)s] %(asctime)s,%(msecs)d %(levelname)-8s [%(filename)s:%(lineno)d] %(message)s',
+                    datefmt='%Y-%m-%d:%H:%M:%S',
+                    level=logging.INFO)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_MAX_LABEL_SETS = 4
+
+EVALUATE_PATH = '/evaluate'
+LABELS_PATH = '/labels'
+
+
+class LabelIndexCache:
+
+    '''
+    A thread safe, least recently used, cache of LabelIndex objects, keyed by the labels path
+    and whether the labels are extended.
+    '''
+
+    def __init__(self, max_size=DEFAULT_MAX_LABEL_SETS):
+        if max_size < 1:
+            raise ValueError(f'Cache size must be positive, got {max_size}')
+        self.max_size = max_size
+        self.__label_indexes = OrderedDict()
+        self.__lock = threading.Lock()
+        self.__loading_locks = {}
+
+    def get(self, labels_path, extend_labels=False):
+        key = (labels_path, extend_labels)
+        with self.__lock:
+            if key in self.__label_indexes:
+                self.__label_indexes.move_to_end(key)
+                return self.__label_indexes[key]
+            loading_lock = self.__loading_locks.setdefault(key, threading.Lock())
+        # load outside the cache lock, so evaluations with other cached labels are not blocked
+        with loading_lock:
+            with self.__lock:
+                if key in self.__label_indexes:
+                    return self.__label_indexes[key]
+            try:
+                label_index = LabelIndexCache.load(labels_path, extend_labels)
+                with self.__lock:
+                    self.__label_indexes[key] = label_index
+                    self.__label_indexes.move_to_end(key)
+                    while len(self.__label_indexes) > self.max_size:
+                        evicted, _ = self.__label_indexes.popitem(last=False)
+                        logging.info(f'Evicted labels {evicted}')
+            finally:
+                # also after a failed load, so that a later load of the key does not reuse a stale lock
+                with self.__lock:
+                    self.__loading_locks.pop(key, None)
+            return label_index
+
+    def keys(self):
+        with self.__lock:
+            return list(self.__label_indexes.keys())
+
+    @staticmethod
+    def load(labels_path, extend_labels):
+        from yaso_tsa.Analysis.LabelIndex import LabelIndex
+        from yaso_tsa.infra.TsaLabels import TsaLabels
+        tsa_labels = TsaLabels.read_json(path=labels_path)
+        if extend_labels:
+            tsa_labels = tsa_labels.extend_labels()
+        label_index = LabelIndex(tsa_labels, name=labels_path)
+        logging.info(f'Loaded {label_index}')
+        return label_index
+
+
+def get_matchers(matcher_names):
+    from yaso_tsa.Analysis.AnalzyedPredictions import EXACT_MATCHER, OVERLAP_MATCHER
+    available_matchers = {matcher[0]: matcher for matcher in [EXACT_MATCHER, OVERLAP_MATCHER]}
+    unknown = [name for name in matcher_names if name not in available_matchers]
+    if unknown:
+        raise ValueError(f'Unknown matchers {unknown}, available matchers are {list(available_matchers)}')
+    return [available_matchers[name] for name in matcher_names]
+
+
+def as_json_value(value):
+    # numpy scalars are not json serializable
+    value = value.item() if hasattr(value, 'item') else value
+    # NaN (e.g. a macro F1 without predictions) and infinity are not valid json
+    return None if isinstance(value, float) and not math.isfinite(value) else value
+
+
+def validate_request(request):
+    if not isinstance(request, dict) or 'labels_path' not in request or 'predictions' not in request:
+        raise ValueError('Missing "labels_path" or "predictions" in request')
+    predictions = request['predictions']
+    if not isinstance(predictions, list):
+        raise ValueError('"predictions" should be a list of sentences')
+    for sentence in predictions:
+        if not isinstance(sentence, dict) or not isinstance(sentence.get('text'), str) \
+                or not isinstance(sentence.get('targets', []), list) \
+                or not all(isinstance(target, dict) for target in sentence.get('targets', [])):
+            raise ValueError(f'Invalid sentence {sentence}, expected a dictionary with a "text" and a list of '
+                             f'"targets"')
+
+
+def evaluate(label_index_cache: LabelIndexCache, request):
+    from yaso_tsa.Analysis.AnalzyedPredictions import AnalyzedPredictions
+    from yaso_tsa.infra.TsaData import TsaData
+    validate_request(request)
+    label_index = label_index_cache.get(
+        request['labels_path'],
+        extend_labels=request.get('extend_labels', False))
+    predictions = TsaData.from_json_records(request['predictions'])
+    analysis = AnalyzedPredictions(
+        tsa_data=predictions,
+        label_index=label_index,
+        matchers=get_matchers(request.get('matchers', ['exact'])))
+    return {name: as_json_value(value) for name, value in analysis.get_stats().items()}
+
+
+class EvaluationRequestHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path != LABELS_PATH:
+            self.send_json(404, {'error': f'Unknown path {self.path}'})
+            return
+        loaded = [{'labels_path': path, 'extend_labels': extend} for path, extend in self.server.label_index_cache.keys()]
+        self.send_json(200, loaded)
+
+    def do_POST(self):
+        if self.path != EVALUATE_PATH:
+            self.send_json(404, {'error': f'Unknown path {self.path}'})
+            return
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(content_length))
+            stats = evaluate(self.server.label_index_cache, request)
+        except (ValueError, KeyError, TypeError, OSError, RuntimeError) as e:
+            logging.warning(f'Failed to evaluate: {e}')
+            self.send_json(400, {'error': str(e)})
+            return
+        except Exception as e:
+            # any other failure is also answered, so the client does not lose the connection
+            logging.exception('Failed to evaluate')
+            self.send_json(500, {'error': str(e)})
+            return
+        self.send_json(200, stats)
+
+    def send_json(self, status, contents):
+        body = json.dumps(contents, allow_nan=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug(format % args)
+
+
+class EvaluationServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, address=(DEFAULT_HOST, DEFAULT_PORT), labels_paths=[], extend_labels=False,
+                 max_label_sets=DEFAULT_MAX_LABEL_SETS):
+        '''
+        :param address: The (host, port) to listen on. Use port 0 for any free port.
+        :param labels_paths: Paths of label sets to load before serving.
+        '''
+        self.label_index_cache = LabelIndexCache(max_size=max_label_sets)
+        for labels_path in labels_paths:
+            self.label_index_cache.get(labels_path, extend_labels=extend_labels)
+        super().__init__(address, EvaluationRequestHandler)
+
+    def get_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve TSA evaluations, keeping the labels loaded between requests.')
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f'host to listen on (default: {DEFAULT_HOST})')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'port to listen on (default: {DEFAULT_PORT})')
+    parser.add_argument('--labels_path', action='append', default=[],
+                        help='path to a labels json file to load on startup, may be repeated')
+    parser.add_argument('--extend_labels',
+                        help='extend the preloaded tsa labels via rules (default: false)',
+                        action='store_true',
+                        default=False)
+    parser.add_argument('--max_label_sets', type=int, default=DEFAULT_MAX_LABEL_SETS,
+                        help=f'number of label sets to keep loaded (default: {DEFAULT_MAX_LABEL_SETS})')
+    args = parser.parse_args()
+
+    server = EvaluationServer(
+        address=(args.host, args.port),
+        labels_paths=args.labels_path,
+        extend_labels=args.extend_labels,
+        max_label_sets=args.max_label_sets)
+    logging.info(f'Serving evaluations on {server.get_url()}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -6,44 +6,46 @@
 from collections import Counter
 from typing import Dict
 
+import numpy
+import pandas as pd
+
 
 class CategoricalLabel:
 
-    def __init__(self, counter):
+    def __init__(self, counter, majority=None):
+        '''
+        :param counter: The count of each label.
+        :param majority: The (most common label, its count, whether it is inconclusive) of the counter,
+        when they are already computed, e.g., by CategoricalLabels.
+        '''
         self.counter = counter
-        top_two_common_answers = self.counter.most_common(2)
+        if majority is None:
+            majority = CategoricalLabel.get_majority(counter)
+        self.most_common_label, self.most_common_count, self.is_inconclusive = majority
+
+    def __repr__(self):
+        return str(self.__dict__)
+
+    @staticmethod
+    def get_majority(counter):
+        top_two_common_answers = counter.most_common(2)
         most_common = top_two_common_answers[0]
-        self.most_common_label, self.most_common_count = most_common[0], most_common[1]
+        most_common_label, most_common_count = most_common[0], most_common[1]
         if len(top_two_common_answers) == 2:
             second_most_common = top_two_common_answers[1]
             second_most_common_count = second_most_common[1]
-            self.is_inconclusive = self.most_common_count == second_most_common_count
+            is_inconclusive = most_common_count == second_most_common_count
         else:
-            self.is_inconclusive = False
-
-    def __repr__(self):
-        return str(self.__dict__)
+            is_inconclusive = False
+        return most_common_label, most_common_count, is_inconclusive
 
     def is_unanimous(self):
         return len(list(self.counter)) == 1
 
     @staticmethod
     def from_series(series, *, index_label=None, labels_to_columns: Dict[str, str] = None):
-        counter = Counter()
-        initialized = False
-        if labels_to_columns:
-            # try to load specific label counts from given column names
-            for label, column_name in labels_to_columns.items():
-                if column_name in series.index:
-                    label_value = series[column_name]
-                    if label_value > 0:
-                        initialized = True
-                        counter.update({label: label_value})
-        if not initialized and index_label and index_label in series.index:
-            # load from index_label
-            label = series[index_label]
-            counter.update({label: 1})
-        return CategoricalLabel(counter)
+        return CategoricalLabels.from_frame(
+            series.to_frame().T, index_label=index_label, labels_to_columns=labels_to_columns)[0]
 
     @staticmethod
     def add(categorical_labels):
@@ -51,3 +53,80 @@ class CategoricalLabel:
         return CategoricalLabel(counter)
 
 
+class CategoricalLabels:
+
+    '''
+    The categorical labels of many rows, computed together from a matrix of label counts (a row per item,
+    a column per label). CategoricalLabel objects of single rows are views over these results.
+    '''
+
+    def __init__(self, labels, counts):
+        '''
+        :param labels: The label of each column of counts.
+        :param counts: A matrix of the non-negative count of each label (column) for each item (row).
+        The order of the labels breaks ties of the most common label, as in Counter.most_common.
+        '''
+        self.labels = numpy.array(labels, dtype=object)
+        self.counts = numpy.asarray(counts).reshape(-1, len(self.labels))
+        num_rows = len(self.counts)
+        if len(self.labels) == 0:
+            self.most_common_codes = numpy.full(num_rows, -1)
+            self.most_common_counts = numpy.zeros(num_rows, dtype=self.counts.dtype)
+            self.is_unanimous = numpy.zeros(num_rows, dtype=bool)
+            self.is_inconclusive = numpy.zeros(num_rows, dtype=bool)
+            return
+        is_counted = self.counts > 0
+        num_counted_labels = is_counted.sum(axis=1)
+        # argmax returns the first of the maximal counts, like Counter.most_common on ties
+        self.most_common_codes = numpy.where(num_counted_labels > 0, self.counts.argmax(axis=1), -1)
+        self.most_common_counts = self.counts[numpy.arange(num_rows), numpy.maximum(self.most_common_codes, 0)]
+        self.is_unanimous = num_counted_labels == 1
+        self.is_inconclusive = (is_counted & (self.counts == self.most_common_counts[:, None])).sum(axis=1) >= 2
+
+    def __repr__(self):
+        return f"<CategoricalLabels rows: {len(self)}, labels: {list(self.labels)}>"
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __getitem__(self, i) -> CategoricalLabel:
+        row = self.counts[i]
+        counter = Counter({label: count.item() for label, count in zip(self.labels, row) if count > 0})
+        if self.most_common_codes[i] < 0:
+            # no counted labels, fail as an empty counter does
+            return CategoricalLabel(counter)
+        return CategoricalLabel(counter, majority=(
+            self.labels[self.most_common_codes[i]],
+            self.most_common_counts[i].item(),
+            bool(self.is_inconclusive[i])))
+
+    def get_most_common_labels(self):
+        '''
+        :return: The most common label of each row, or None for a row without counts.
+        '''
+        return numpy.append(self.labels, None)[self.most_common_codes]
+
+    @staticmethod
+    def from_frame(frame, *, index_label=None, labels_to_columns: Dict[str, str] = None):
+        '''
+        The labels of the rows of a frame, as in CategoricalLabel.from_series: the counts are loaded from the
+        columns of labels_to_columns, and a row without positive counts is labeled by its index_label column.
+        '''
+        labels = []
+        columns = []
+        for label, column_name in (labels_to_columns or {}).items():
+            if column_name in frame.columns:
+                values = pd.to_numeric(frame[column_name], errors='coerce').to_numpy()
+                labels.append(label)
+                columns.append(numpy.where(values > 0, values, 0))
+        counts = numpy.column_stack(columns) if columns else numpy.zeros((len(frame), 0), dtype=numpy.int64)
+        if index_label and index_label in frame.columns:
+            is_not_initialized = ~(counts > 0).any(axis=1)
+            if is_not_initialized.any():
+                index_labels = numpy.asarray(frame[index_label], dtype=object)[is_not_initialized]
+                codes, new_labels = pd.factorize(index_labels, use_na_sentinel=False)
+                index_counts = numpy.zeros((len(frame), len(new_labels)), dtype=counts.dtype)
+                index_counts[numpy.flatnonzero(is_not_initialized), codes] = 1
+                labels += list(new_labels)
+                counts = numpy.hstack([counts, index_counts])
+        return CategoricalLabels(labels, counts)
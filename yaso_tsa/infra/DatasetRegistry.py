@@ -0,0 +1,212 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import hashlib
+import logging
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import pandas as pd
+
+from yaso_tsa.infra.TsaLabels import TsaLabels
+
+# Increase when the parsed labels change (e.g. new columns), so that older disk cache files are not used
+CACHE_VERSION = 1
+CACHE_DIR_ENVIRONMENT_VARIABLE = 'YASO_TSA_CACHE_DIR'
+DEFAULT_CACHE_DIR = os.path.join(Path.home(), '.cache', 'yaso_tsa')
+DEFAULT_MAX_DATASETS = 8
+
+REPOSITORY_DIR = Path(__file__).resolve().parents[2]
+TSA_MD_DIR = REPOSITORY_DIR / 'TSA-MD'
+YASO_PATH = REPOSITORY_DIR / 'yaso_tsa' / 'data' / 'yaso.json'
+
+TSA_MD_TRAIN = 'tsa_md/train'
+TSA_MD_DEV = 'tsa_md/dev'
+YASO = 'yaso'
+SEMEVAL = 'semeval'
+
+# The built in datasets: the function that reads each dataset, and its default path (None if a path must be given)
+DATASET_LOADERS = {
+    TSA_MD_TRAIN: (TsaLabels.read_json, TSA_MD_DIR / 'TSA-MD.train.json'),
+    TSA_MD_DEV: (TsaLabels.read_json, TSA_MD_DIR / 'TSA-MD.dev.json'),
+    YASO: (TsaLabels.read_json, YASO_PATH),
+    SEMEVAL: (TsaLabels.read_xml, None),
+}
+
+
+def get_default_cache_dir():
+    return os.environ.get(CACHE_DIR_ENVIRONMENT_VARIABLE, DEFAULT_CACHE_DIR)
+
+
+class DatasetRegistry:
+
+    '''
+    Named loaders of labeled datasets, whose parsed TsaLabels are cached in memory, in a thread safe least recently
+    used cache, and on disk, as a pickle file per dataset file, so that scripts that load the same datasets start
+    without parsing them. A disk cache file is used only if it was written with the same CACHE_VERSION and pandas
+    version, from a file with the same size and modification time; otherwise the dataset is parsed and the cache file
+    is rewritten. Each load returns a new TsaLabels object, whose labels frame is a shallow copy of the cached frame:
+    columns that are added or replaced, and labels modified through TsaLabels (e.g. add_property), do not reach the
+    cache, but values written in place into the columns of the returned frame do, so modify the labels through
+    TsaLabels, or copy the frame first.
+    '''
+
+    def __init__(self, cache_dir=None, max_size=DEFAULT_MAX_DATASETS, use_disk_cache=True):
+        '''
+        :param cache_dir: The directory of the disk cache, by default the directory in the YASO_TSA_CACHE_DIR
+        environment variable, or ~/.cache/yaso_tsa.
+        :param max_size: The number of datasets kept in memory.
+        '''
+        if max_size < 1:
+            raise ValueError(f'Cache size must be positive, got {max_size}')
+        self.cache_dir = cache_dir if cache_dir is not None else get_default_cache_dir()
+        self.max_size = max_size
+        self.use_disk_cache = use_disk_cache
+        self.__loaders = dict(DATASET_LOADERS)
+        self.__datasets = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<DatasetRegistry datasets: {len(self.__loaders)}, loaded: {len(self.keys())}>"
+
+    def register(self, name, read_fun, default_path=None):
+        '''
+        :param read_fun: A function from the path of a dataset file to its TsaLabels.
+        :param default_path: The path that is loaded when no path is given, or None if a path must be given.
+        '''
+        self.__loaders[name] = (read_fun, default_path)
+
+    def get_names(self):
+        return list(self.__loaders)
+
+    def keys(self):
+        '''
+        :return: The (name, path) of the datasets that are currently in memory, from the least recently used.
+        '''
+        with self.__lock:
+            return list(self.__datasets.keys())
+
+    def clear(self):
+        with self.__lock:
+            self.__datasets.clear()
+
+    def get_path(self, name, path=None):
+        if name not in self.__loaders:
+            raise ValueError(f'Unknown dataset "{name}", available datasets are {self.get_names()}')
+        if path is None:
+            path = self.__loaders[name][1]
+            if path is None:
+                raise ValueError(f'Dataset "{name}" has no default path, a path must be given')
+        return os.path.abspath(path)
+
+    def load(self, name, path=None) -> TsaLabels:
+        '''
+        :param name: The name of a registered dataset, e.g. tsa_md/train.
+        :param path: The path of the dataset file, by default the registered path of the dataset.
+        :return: The labels of the dataset.
+        '''
+        path = self.get_path(name, path)
+        key = (name, path)
+        file_stats = DatasetRegistry.get_file_stats(path)
+        with self.__lock:
+            cached = self.__datasets.get(key)
+            if cached is not None and cached[0] == file_stats:
+                self.__datasets.move_to_end(key)
+                return DatasetRegistry.share(cached[1])
+        # parsing is done outside the lock, so loads of other datasets are not blocked
+        labels = self.read_disk_cache(name, path, file_stats) if self.use_disk_cache else None
+        if labels is None:
+            labels = self.__loaders[name][0](path)
+            logging.info(f'Loaded dataset {name}: {labels}')
+            if self.use_disk_cache:
+                self.write_disk_cache(name, path, file_stats, labels)
+        with self.__lock:
+            self.__datasets[key] = (file_stats, labels)
+            self.__datasets.move_to_end(key)
+            while len(self.__datasets) > self.max_size:
+                self.__datasets.popitem(last=False)
+        return DatasetRegistry.share(labels)
+
+    @staticmethod
+    def share(labels: TsaLabels):
+        return TsaLabels(frame=labels.frame.copy(deep=False), sentences=labels.sentences.copy())
+
+    @staticmethod
+    def get_file_stats(path):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f'Dataset file "{path}" not found')
+        stat = os.stat(path)
+        return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    def get_cache_path(self, name, path):
+        path_hash = hashlib.sha1(path.encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{name.replace('/', '.')}.{path_hash}.pkl")
+
+    def get_cache_header(self, name, path, file_stats):
+        return {
+            'version': CACHE_VERSION,
+            'pandas_version': pd.__version__,
+            'name': name,
+            'path': path,
+            'file_stats': file_stats
+        }
+
+    def read_disk_cache(self, name, path, file_stats):
+        '''
+        :return: The cached labels of the dataset file, or None if they are not cached, or the cache is stale.
+        '''
+        cache_path = self.get_cache_path(name, path)
+        if not os.path.exists(cache_path):
+            return None
+        try:
+            with open(cache_path, 'rb') as f:
+                # the header is read first, so that a stale cache is not unpickled
+                if pickle.load(f) != self.get_cache_header(name, path, file_stats):
+                    logging.info(f'The cache of dataset {name} is stale, reloading it')
+                    return None
+                labels = pickle.load(f)
+        except Exception as e:
+            logging.warning(f'Cannot read the cache of dataset {name} from "{cache_path}": {e}')
+            return None
+        logging.info(f'Loaded dataset {name} from cache: {labels}')
+        return labels
+
+    def write_disk_cache(self, name, path, file_stats, labels):
+        cache_path = self.get_cache_path(name, path)
+        try:
+            Path(self.cache_dir).mkdir(parents=True, exist_ok=True)
+            # write to a temporary file first, so that concurrent loads never read a partial cache
+            temporary_path = f'{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(temporary_path, 'wb') as f:
+                pickle.dump(self.get_cache_header(name, path, file_stats), f, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(labels, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary_path, cache_path)
+        except OSError as e:
+            logging.warning(f'Cannot write the cache of dataset {name} to "{cache_path}": {e}')
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> DatasetRegistry:
+    '''
+    :return: The registry of the process, created on first use.
+    '''
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = DatasetRegistry()
+        return _registry
+
+
+def load_dataset(name, path=None) -> TsaLabels:
+    '''
+    Load a dataset with the registry of the process, e.g. load_dataset('tsa_md/train').
+    '''
+    return get_registry().load(name, path)
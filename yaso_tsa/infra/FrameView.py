@@ -0,0 +1,93 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import numpy
+import pandas as pd
+
+
+class FrameView:
+
+    '''
+    Rows of a frame that may be shared with other objects, copied only when they are modified (copy on write).
+    A view created by select() holds the shared frame and the positions of its rows in it. Selecting from a
+    view composes the positions, so a chain of selections does not copy any data. The rows are taken from the
+    shared frame on the first call to get_frame(), and the shared frame itself is copied only before it is modified.
+    Frames returned by get_frame() are read only, and are shared with the caller from then on; modify the rows
+    through get_writable_frame(). Code that only reads the rows, and does not keep the frame, uses read_frame(),
+    so that the rows are not copied when they are modified later.
+    '''
+
+    def __init__(self, frame: pd.DataFrame, positions=None, is_shared=False):
+        '''
+        :param frame: The underlying frame.
+        :param positions: The positions of the rows of this view in the frame, or None for all the rows.
+        :param is_shared: Whether the frame may be referenced elsewhere, and should be copied before it is modified.
+        '''
+        self.__frame = frame
+        self.__positions = positions
+        self.__is_shared = is_shared
+
+    def __len__(self):
+        return len(self.__frame) if self.__positions is None else len(self.__positions)
+
+    def is_view(self):
+        return self.__positions is not None
+
+    def __getitem__(self, column_name):
+        return self.get_column(column_name)
+
+    @property
+    def columns(self):
+        return self.__frame.columns
+
+    def get_columns(self):
+        return self.__frame.columns
+
+    def get_column(self, column_name):
+        '''
+        :return: A column of the rows, without taking the other columns.
+        '''
+        column = self.__frame[column_name]
+        return column if self.__positions is None else column.take(self.__positions)
+
+    def get_frame(self):
+        frame = self.__take_rows()
+        # the returned frame may be kept by the caller, so it is copied before this view modifies it
+        self.__is_shared = True
+        return frame
+
+    def read_frame(self):
+        '''
+        :return: The rows, for reading them without keeping the returned frame, which is not marked as shared.
+        '''
+        return self.__take_rows()
+
+    def get_writable_frame(self):
+        frame = self.__take_rows()
+        if self.__is_shared:
+            self.__frame = frame.copy()
+            self.__is_shared = False
+        return self.__frame
+
+    def __take_rows(self):
+        if self.__positions is not None:
+            # the taken rows are a new frame, that is not shared
+            self.__frame = self.__frame.take(self.__positions)
+            self.__positions = None
+            self.__is_shared = False
+        return self.__frame
+
+    def select(self, mask):
+        '''
+        :param mask: A boolean mask over the rows, or an array of row positions (possibly reordered).
+        :return: A view of the selected rows, that shares the underlying frame.
+        '''
+        mask = numpy.asarray(mask)
+        selected = numpy.flatnonzero(mask) if mask.dtype == bool else mask.astype(numpy.int64)
+        if self.__positions is not None:
+            selected = self.__positions[selected]
+        # the underlying frame is referenced by the new view from now on
+        self.__is_shared = True
+        return FrameView(self.__frame, positions=selected, is_shared=True)
@@ -0,0 +1,101 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import json
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+
+class JsonRecordReader:
+
+    '''
+    Read the sentence records of a file one at a time, without loading the whole file.
+    The file is either a json list of records (the format of the predictions and labels files),
+    or a jsonl file with a record in each line. The format is detected from the first character of the file.
+    '''
+
+    def __init__(self, path, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.path = path
+        self.chunk_size = chunk_size
+
+    def __repr__(self):
+        return f"<JsonRecordReader {self.path}>"
+
+    def __iter__(self):
+        with open(self.path, 'rt', encoding='utf-8') as text_file:
+            first_chunk = text_file.read(self.chunk_size)
+            if first_chunk.lstrip().startswith('['):
+                yield from JsonRecordReader.read_list(text_file, first_chunk, self.chunk_size)
+            else:
+                yield from JsonRecordReader.read_lines(text_file, first_chunk)
+
+    @staticmethod
+    def read_lines(text_file, first_chunk):
+        lines = first_chunk.split('\n')
+        # the last line of the chunk may continue in the rest of the file
+        pending = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+        for line in text_file:
+            line = pending + line
+            pending = ''
+            if line.strip():
+                yield json.loads(line)
+        if pending.strip():
+            yield json.loads(pending)
+
+    @staticmethod
+    def read_list(text_file, first_chunk, chunk_size=DEFAULT_CHUNK_SIZE):
+        decoder = json.JSONDecoder()
+        buffer = first_chunk
+        position = buffer.index('[') + 1
+        is_eof = False
+
+        def read_more():
+            nonlocal buffer, position, is_eof
+            chunk = text_file.read(chunk_size)
+            is_eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+
+        while True:
+            # skip to the next record, or the end of the list
+            while True:
+                while position < len(buffer) and (buffer[position].isspace() or buffer[position] == ','):
+                    position += 1
+                if position < len(buffer):
+                    break
+                if is_eof:
+                    raise ValueError('Unexpected end of file, the records list is not closed')
+                read_more()
+            if buffer[position] == ']':
+                return
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # the record continues in the rest of the file
+                if is_eof:
+                    raise
+                read_more()
+                continue
+            position = end
+            yield record
+
+
+def write_json_records(records, out_json):
+    '''
+    Write the records to a json list, one record at a time, in the format of json.dump(records, indent=2).
+    :return: The number of written records.
+    '''
+    num_records = 0
+    with open(out_json, 'w', encoding='utf-8') as f:
+        f.write('[')
+        for record in records:
+            record_json = json.dumps(record, ensure_ascii=False, indent=2).replace('\n', '\n  ')
+            f.write(f'{"," if num_records > 0 else ""}\n  {record_json}')
+            num_records += 1
+        f.write('\n]' if num_records > 0 else ']')
+    return num_records
@@ -0,0 +1,83 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import numpy
+import pandas as pd
+
+from yaso_tsa.infra.SentimentTargets import SENTENCE_TEXT, TARGET_BEGIN, TARGET_END
+
+SPAN_KEY_COLUMNS = [SENTENCE_TEXT, TARGET_BEGIN, TARGET_END]
+# offsets may be loaded as strings (e.g., from xml), so they are always compared as integers
+OFFSET_COLUMNS = [TARGET_BEGIN, TARGET_END]
+
+
+class KeyIndex:
+
+    '''
+    A hashed set of row keys, built once from the key columns of a frame.
+    Used to look up many rows at once, instead of scanning the indexed rows for each looked up row.
+    '''
+
+    def __init__(self, frame=None, key_columns=SPAN_KEY_COLUMNS):
+        self.key_columns = list(key_columns)
+        if frame is None or frame.empty:
+            self.index = None
+        else:
+            self.index = KeyIndex.as_index(frame, self.key_columns).unique()
+
+    def __repr__(self):
+        return f"<KeyIndex keys: {len(self)}, columns: {self.key_columns}>"
+
+    def __len__(self):
+        return 0 if self.index is None else len(self.index)
+
+    def contains(self, frame, key_columns=None):
+        '''
+        :param frame: The rows to look up.
+        :param key_columns: The columns of the frame holding the keys, in the order of the indexed key
+        columns. Defaults to the indexed key columns.
+        :return: A boolean array, True for each row of the frame whose key is in the index.
+        '''
+        if self.index is None or len(frame) == 0:
+            return numpy.zeros(len(frame), dtype=bool)
+        key_columns = self.key_columns if key_columns is None else key_columns
+        return KeyIndex.as_index(frame, key_columns).isin(self.index)
+
+    @staticmethod
+    def as_index(frame, key_columns):
+        def key_values(column_name):
+            values = frame[column_name]
+            return values.astype(int) if column_name in OFFSET_COLUMNS else values
+        if len(key_columns) == 1:
+            return pd.Index(key_values(key_columns[0]))
+        return pd.MultiIndex.from_arrays([key_values(column_name) for column_name in key_columns])
+
+    @staticmethod
+    def for_spans(frame, key_columns=SPAN_KEY_COLUMNS):
+        '''
+        Index the (sentence text, begin, end) spans of a frame, with offsets compared as integers.
+        '''
+        if frame is None or frame.empty:
+            return KeyIndex(key_columns=SPAN_KEY_COLUMNS)
+        spans = pd.DataFrame({
+            SENTENCE_TEXT: frame[key_columns[0]].values,
+            TARGET_BEGIN: frame[key_columns[1]].astype(int).values,
+            TARGET_END: frame[key_columns[2]].astype(int).values
+        })
+        return KeyIndex(spans, key_columns=SPAN_KEY_COLUMNS)
+
+    @staticmethod
+    def semi_join(frame, other, key_columns):
+        '''
+        :return: The rows of frame whose key also appears in other. Runs in time linear in the sizes of both frames.
+        '''
+        return frame[KeyIndex(other, key_columns=key_columns).contains(frame)]
+
+    @staticmethod
+    def anti_join(frame, other, key_columns):
+        '''
+        :return: The rows of frame whose key does not appear in other. Runs in time linear in the sizes of both frames.
+        '''
+        return frame[~KeyIndex(other, key_columns=key_columns).contains(frame)]
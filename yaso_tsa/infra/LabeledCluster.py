@@ -4,11 +4,19 @@
 # http://www.apache.org/licenses/LICENSE-2.0
 
 import logging
+
+import numpy
 import pandas as pd
 
-from yaso_tsa.infra.CategoricalLabel import CategoricalLabel
+from yaso_tsa.infra.CategoricalLabel import CategoricalLabel, CategoricalLabels
 from yaso_tsa.infra.LabeledSpan import LabeledSpan
-from yaso_tsa.infra.SentimentTargets import SentimentTargets
+from yaso_tsa.infra.LabeledTarget import LabeledTarget, SENTIMENT_LABEL_TYPE
+from yaso_tsa.infra.SentimentTargets import SENTENCE_TEXT, TARGET_TEXT, TARGET_BEGIN, TARGET_END, TARGET_SENTIMENT
+
+CLUSTER_ID = 'cluster_id'
+NUM_MEMBERS = 'num_items'
+IS_CONSISTENT = 'is_consistent'
+AGGREGATED_LABELS = ['positive', 'negative', 'mixed']
 
 
 class LabeledCluster:
@@ -93,30 +101,95 @@ class LabeledCluster:
 
     @staticmethod
     def to_frame(target_groups, detail_members=True):
+        '''
+        :return: A frame with a row for each cluster, and its members in TARGET_TEXT_{i}, ... columns.
+        See get_cluster_frames for a long format export of clusters from a labels frame.
+        '''
         group_dictionaries = []
         for group in target_groups:
+            aggregated_label = group.get_aggregated_label()
             group_as_dictionary = {
-                SentimentTargets.SENTENCE_TEXT: group.text,
-                SentimentTargets.TARGET_TEXT: group.get_labeled_text(),
-                SentimentTargets.TARGET_BEGIN: group.span.left,
-                SentimentTargets.TARGET_END: group.span.right,
-                SentimentTargets.TARGET_SENTIMENT: group.majority_label(),
-                'num_items': len(group.labeled_spans),
+                SENTENCE_TEXT: group.text,
+                TARGET_TEXT: group.get_labeled_text(),
+                TARGET_BEGIN: group.span.left,
+                TARGET_END: group.span.right,
+                TARGET_SENTIMENT: aggregated_label.most_common_label,
+                NUM_MEMBERS: len(group.labeled_spans),
                 'items': [(labeled_span.get_labeled_text(), labeled_span.begin, labeled_span.end, labeled_span.label)
                           for labeled_span in group.labeled_spans]
             }
-            from targeted_sentiment_analysis.ComprehensiveLabeling.ComprehensiveSentimentTargets import \
-                ComprehensiveSentimentTargets
-            detection_columns = ComprehensiveSentimentTargets.detection_columns(
-                ['positive', 'negative', 'mixed'], as_dictionary=True)
-            for sentiment_label, detection_column in detection_columns.items():
-                group_as_dictionary[detection_column] = group.get_aggregated_label().counter[sentiment_label]
+            for sentiment_label in AGGREGATED_LABELS:
+                group_as_dictionary[f'detected_{sentiment_label}'] = aggregated_label.counter[sentiment_label]
             if detail_members:
-                [group_as_dictionary.update({
-                    f'{SentimentTargets.TARGET_TEXT}_{span_i}': labeled_span.get_labeled_text(),
-                    f'{SentimentTargets.TARGET_BEGIN}_{span_i}': labeled_span.begin,
-                    f'{SentimentTargets.TARGET_END}_{span_i}': labeled_span.end,
-                    f'{SentimentTargets.TARGET_SENTIMENT}_{span_i}': labeled_span.label
-                }) for span_i, labeled_span in enumerate(group.labeled_spans)]
+                for span_i, labeled_span in enumerate(group.labeled_spans):
+                    group_as_dictionary.update({
+                        f'{TARGET_TEXT}_{span_i}': labeled_span.get_labeled_text(),
+                        f'{TARGET_BEGIN}_{span_i}': labeled_span.begin,
+                        f'{TARGET_END}_{span_i}': labeled_span.end,
+                        f'{TARGET_SENTIMENT}_{span_i}': labeled_span.label
+                    })
             group_dictionaries.append(group_as_dictionary)
         return pd.DataFrame(group_dictionaries)
+
+    @staticmethod
+    def assign_clusters(frame):
+        '''
+        Cluster the targets of a frame as create_clusters does: targets of the same sentence whose spans
+        overlap, directly or through other targets, are in the same cluster.
+        :return: The cluster id of each row, numbered by sentence (in order of first appearance) and span begin.
+        '''
+        if frame.empty:
+            return numpy.zeros(0, dtype=numpy.int64)
+        sentence_codes, _ = pd.factorize(frame[SENTENCE_TEXT], use_na_sentinel=False)
+        begins = frame[TARGET_BEGIN].to_numpy(dtype=numpy.int64)
+        ends = frame[TARGET_END].to_numpy(dtype=numpy.int64)
+        order = numpy.lexsort((begins, sentence_codes))
+        sorted_codes = sentence_codes[order]
+        # a target starts a new cluster when it begins after all the previous targets of its sentence end
+        previous_max_end = pd.Series(ends[order]).groupby(sorted_codes).cummax().groupby(sorted_codes).shift(1)
+        starts_cluster = previous_max_end.isna().to_numpy() | (begins[order] > previous_max_end.to_numpy())
+        cluster_ids = numpy.empty(len(frame), dtype=numpy.int64)
+        cluster_ids[order] = numpy.cumsum(starts_cluster) - 1
+        return cluster_ids
+
+    @staticmethod
+    def get_cluster_frames(frame, label_type=SENTIMENT_LABEL_TYPE):
+        '''
+        Export the clusters of the targets of a labels frame, in one pass over integer cluster assignments.
+        :param frame: A labels frame, e.g. TsaLabels.get_frame().
+        :param label_type: The prefix of the label count columns, as in LabeledTarget.
+        :return: (clusters, members): a frame with a row for each cluster, with its span, majority label and
+        summed label counts, and a frame with a row for each labeled target, with its cluster id (long format).
+        '''
+        cluster_ids = LabeledCluster.assign_clusters(frame)
+        member_labels = CategoricalLabels.from_frame(
+            frame, index_label=TARGET_SENTIMENT, labels_to_columns=LabeledTarget.get_labels_to_columns(label_type))
+        members = pd.DataFrame({
+            CLUSTER_ID: cluster_ids,
+            SENTENCE_TEXT: frame[SENTENCE_TEXT].values,
+            TARGET_TEXT: frame[TARGET_TEXT].values,
+            TARGET_BEGIN: frame[TARGET_BEGIN].values.astype(numpy.int64),
+            TARGET_END: frame[TARGET_END].values.astype(numpy.int64),
+            TARGET_SENTIMENT: member_labels.get_most_common_labels()
+        })
+        members = members.sort_values([CLUSTER_ID, TARGET_BEGIN, TARGET_END], kind='stable', ignore_index=True)
+
+        num_clusters = int(cluster_ids.max()) + 1 if len(cluster_ids) else 0
+        counts = numpy.zeros((num_clusters, len(member_labels.labels)), dtype=member_labels.counts.dtype)
+        numpy.add.at(counts, cluster_ids, member_labels.counts)
+        cluster_labels = CategoricalLabels(member_labels.labels, counts)
+        grouped = members.groupby(CLUSTER_ID, sort=True)
+        clusters = pd.DataFrame({
+            SENTENCE_TEXT: grouped[SENTENCE_TEXT].first(),
+            TARGET_BEGIN: grouped[TARGET_BEGIN].min(),
+            TARGET_END: grouped[TARGET_END].max(),
+            NUM_MEMBERS: grouped.size(),
+        })
+        clusters.insert(1, TARGET_TEXT, [text[begin:end] for text, begin, end in
+                                         zip(clusters[SENTENCE_TEXT], clusters[TARGET_BEGIN], clusters[TARGET_END])])
+        clusters[TARGET_SENTIMENT] = cluster_labels.get_most_common_labels()
+        clusters[IS_CONSISTENT] = cluster_labels.is_unanimous
+        for i, label in enumerate(member_labels.labels):
+            clusters[f'{label_type}_{label}'] = counts[:, i]
+        clusters.index.name = CLUSTER_ID
+        return clusters.reset_index(), members
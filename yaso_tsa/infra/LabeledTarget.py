@@ -3,7 +3,7 @@
 # LICENSE: Apache License 2.0 (Apache-2.0)
 # http://www.apache.org/licenses/LICENSE-2.0
 
-from yaso_tsa.infra.CategoricalLabel import CategoricalLabel
+from yaso_tsa.infra.CategoricalLabel import CategoricalLabel, CategoricalLabels
 from yaso_tsa.infra.LabeledSpan import LabeledSpan
 from yaso_tsa.infra.SentimentTargets import SENTENCE_TEXT, TARGET_BEGIN, TARGET_END, TARGET_SENTIMENT
 
@@ -18,9 +18,13 @@ class LabeledTarget:
         if row is not None:
             return LabeledTarget.__create_from_row(row, index_label, label_type)
         if frame is not None:
-            return [LabeledTarget.__create_from_row(row, index_label, label_type) for _, row in frame.iterrows()]
+            return LabeledTarget.__create_from_frame(frame, index_label, label_type)
         return None
 
+    @staticmethod
+    def get_labels_to_columns(label_type=SENTIMENT_LABEL_TYPE):
+        return {label: f'{label_type}_{label}' for label in ['positive', 'negative', 'mixed']}
+
     @staticmethod
     def __create_from_row(row, index_label=None, label_type=SENTIMENT_LABEL_TYPE):
         if index_label is None:
@@ -32,8 +36,21 @@ class LabeledTarget:
             label=CategoricalLabel.from_series(
                 series=row,
                 index_label=index_label,
-                labels_to_columns={
-                    label: f'{label_type}_{label}' for label in ['positive', 'negative', 'mixed']
-                }
+                labels_to_columns=LabeledTarget.get_labels_to_columns(label_type)
             )
         )
+
+    @staticmethod
+    def __create_from_frame(frame, index_label=None, label_type=SENTIMENT_LABEL_TYPE):
+        if index_label is None:
+            index_label = TARGET_SENTIMENT
+        if frame.empty:
+            return []
+        labels = CategoricalLabels.from_frame(
+            frame,
+            index_label=index_label,
+            labels_to_columns=LabeledTarget.get_labels_to_columns(label_type))
+        return [
+            LabeledSpan(text=text, begin=int(begin), end=int(end), label=labels[i])
+            for i, (text, begin, end) in enumerate(zip(frame[SENTENCE_TEXT], frame[TARGET_BEGIN], frame[TARGET_END]))
+        ]
@@ -0,0 +1,71 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import numpy
+import pandas as pd
+
+
+class SentenceIndex:
+
+    '''
+    The sentences of the rows of a frame, hashed once: the unique sentences in order of first appearance,
+    a code per row (the position of its sentence in the unique sentences), and the rows of each sentence.
+    Queries by sentences hash only the queried sentences, instead of the sentence of every row.
+    '''
+
+    def __init__(self, sentences_column):
+        '''
+        :param sentences_column: The sentence text of each row.
+        '''
+        codes, unique_sentences = pd.factorize(numpy.asarray(sentences_column, dtype=object), sort=False)
+        self.codes = codes
+        self.sentences = pd.Index(unique_sentences, dtype=object)
+        # the rows of sentence i are row_order[offsets[i]:offsets[i + 1]], in their original order
+        valid_codes = codes[codes >= 0]
+        self.row_order = numpy.flatnonzero(codes >= 0)[numpy.argsort(valid_codes, kind='stable')]
+        self.offsets = numpy.concatenate([[0], numpy.cumsum(numpy.bincount(valid_codes, minlength=len(self.sentences)))])
+
+    def __repr__(self):
+        return f"<SentenceIndex rows: {len(self.codes)}, sentences: {len(self.sentences)}>"
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def __contains__(self, sentence):
+        return sentence in self.sentences
+
+    def get_sentences(self):
+        '''
+        :return: The unique sentences, in order of first appearance.
+        '''
+        return list(self.sentences)
+
+    def get_rows(self, sentence):
+        '''
+        :return: The positions of the rows of the sentence, in their original order.
+        '''
+        if sentence not in self.sentences:
+            return numpy.zeros(0, dtype=numpy.int64)
+        i = self.sentences.get_loc(sentence)
+        return self.row_order[self.offsets[i]:self.offsets[i + 1]]
+
+    def get_sentence_sizes(self):
+        '''
+        :return: A series from each sentence to its number of rows.
+        '''
+        return pd.Series(numpy.diff(self.offsets), index=self.sentences)
+
+    def contains_mask(self, sentences):
+        '''
+        :return: A boolean mask over the unique sentences, True for each sentence that is in the given sentences.
+        '''
+        return self.sentences.isin(list(sentences))
+
+    def rows_mask(self, sentences):
+        '''
+        :return: A boolean mask over the rows, True for each row whose sentence is in the given sentences.
+        '''
+        # the code of a missing sentence is -1, which selects the appended False
+        return numpy.append(self.contains_mask(sentences), False)[self.codes]
@@ -4,9 +4,13 @@
 # http://www.apache.org/licenses/LICENSE-2.0
 
 import json
+import numpy
 import pandas as pd
 import logging
 
+from yaso_tsa.infra.FrameView import FrameView
+from yaso_tsa.infra.SentenceIndex import SentenceIndex
+
 SOURCE = 'source'
 SENTENCE_TEXT = 'text'
 TARGET_TEXT = 'target_text'
@@ -14,6 +18,7 @@ TARGET_BEGIN = 'location_begin'
 TARGET_END = 'location_end'
 TARGET_SENTIMENT = 'sentiment'
 TARGET_SCORE = 'confidence'
+TARGETS = 'targets'
 
 
 class SentimentTargets:
@@ -27,57 +32,107 @@ class SentimentTargets:
         with open(path, encoding='utf8') as json_file:
             try:
                 json_contents = json.load(json_file)
-                sentiment_targets = pd.json_normalize(
-                    json_contents,
-                    record_path=['targets'],
-                    # add a record_prefix otherwise the target text and sentence text fields collide (both named 'text)
-                    record_prefix='target_',
-                    meta_prefix='',
-                    meta=['text'] + meta_fields)
+                return SentimentTargets.from_json_records(json_contents, meta_fields=meta_fields)
             except Exception as e:
                 raise RuntimeError(f'Cannot read from "{path}"', e)
-            sentiment_targets.rename(
-                columns=lambda x: x.replace('target_', '') if x != TARGET_TEXT else x,
-                inplace=True
-            )
-            sentiment_targets.rename(
-                columns={
-                    'location.begin': TARGET_BEGIN,
-                    'location.end': TARGET_END
-                },
-                inplace=True
-            )
-            if not sentiment_targets.empty:
-                sentiment_targets[TARGET_BEGIN] = sentiment_targets[TARGET_BEGIN].astype(int)
-                sentiment_targets[TARGET_END] = sentiment_targets[TARGET_END].astype(int)
-            result = SentimentTargets(frame=sentiment_targets)
-            result = result.update_sentiment(old='neutral', new='none')
-            return result
-
-    def __init__(self, frame=None):
-        if frame is not None:
-            if frame.empty:
-                self.frame = pd.DataFrame(columns=self.MANDATORY_COLUMNS)
-            else:
-                self.frame = frame.copy()
-                missing_columns = [column_name for column_name in self.MANDATORY_COLUMNS if column_name not in self.frame.columns]
-                if missing_columns:
-                    raise ValueError(f'Missing "{missing_columns}" columns from frame.')
+
+    @staticmethod
+    def from_json_records(json_contents, meta_fields=[]):
+        '''
+        Create from a list of sentences in the json format, e.g., as loaded from a json file,
+        or as received from a client.
+        '''
+        sentiment_targets = pd.json_normalize(
+            json_contents,
+            record_path=[TARGETS],
+            # add a record_prefix otherwise the target text and sentence text fields collide (both named 'text)
+            record_prefix='target_',
+            meta_prefix='',
+            meta=['text'] + meta_fields)
+        sentiment_targets.rename(
+            columns=lambda x: x.replace('target_', '') if x != TARGET_TEXT else x,
+            inplace=True
+        )
+        sentiment_targets.rename(
+            columns={
+                'location.begin': TARGET_BEGIN,
+                'location.end': TARGET_END
+            },
+            inplace=True
+        )
+        if not sentiment_targets.empty:
+            sentiment_targets[TARGET_BEGIN] = sentiment_targets[TARGET_BEGIN].astype(int)
+            sentiment_targets[TARGET_END] = sentiment_targets[TARGET_END].astype(int)
+        result = SentimentTargets(frame=sentiment_targets, copy=False)
+        result = result.update_sentiment(old='neutral', new='none')
+        return result
+
+    def __init__(self, frame=None, copy=True):
+        '''
+        :param frame: The targets frame.
+        :param copy: Whether the given frame is copied, so that the targets and the frame do not change each other.
+        Set to False only when the frame is not used elsewhere, e.g., a frame that was just created by a selection.
+        '''
+        if frame is not None and not frame.empty:
+            missing_columns = [column_name for column_name in self.MANDATORY_COLUMNS if column_name not in frame.columns]
+            if missing_columns:
+                raise ValueError(f'Missing "{missing_columns}" columns from frame.')
+            self.__set_rows(FrameView(frame.copy() if copy else frame))
         else:
-            self.frame = pd.DataFrame(columns=self.MANDATORY_COLUMNS)
+            self.__set_rows(FrameView(pd.DataFrame(columns=self.MANDATORY_COLUMNS)))
+
+    def __set_rows(self, rows: FrameView):
+        self.__rows = rows
+        # built on first use, see get_sentence_index()
+        self.__sentence_index = None
+
+    @staticmethod
+    def __from_rows(rows: FrameView):
+        result = SentimentTargets()
+        result.__set_rows(rows)
+        return result
+
+    def __select(self, mask):
+        '''
+        :return: The selected targets, as a view that shares the rows of this object.
+        '''
+        return SentimentTargets.__from_rows(self.__rows.select(mask))
+
+    @property
+    def frame(self):
+        return self.__rows.get_frame()
+
+    @frame.setter
+    def frame(self, frame):
+        self.__set_rows(FrameView(frame))
 
     def __repr__(self):
         return f"<SentimentTargets , " \
-               f"targets: {self.get_num_targets()}, sentences: {len(self.get_sentences())}>"
+               f"targets: {self.get_num_targets()}, sentences: {self.get_num_sentences()}>"
 
     def copy(self):
-        return SentimentTargets(sentiment_targets=self.frame.copy())
+        return SentimentTargets(frame=self.__rows.read_frame().copy(), copy=False)
 
     def get_frame(self):
+        '''
+        :return: The targets frame, which should not be modified (see add_property).
+        '''
         return self.frame
 
+    def get_column(self, column_name):
+        return self.__rows.get_column(column_name)
+
+    def get_sentence_index(self) -> SentenceIndex:
+        '''
+        :return: The index of the sentences of the targets. It is built on the first call, and rebuilt after the
+        targets are modified.
+        '''
+        if self.__sentence_index is None:
+            self.__sentence_index = SentenceIndex(self.get_column(SENTENCE_TEXT))
+        return self.__sentence_index
+
     def get_column_if_exists(self, column_name, default_value):
-        return self.get_frame().get(
+        return self.__rows.read_frame().get(
             key=column_name,
             default=pd.Series(
                 default_value,
@@ -87,8 +142,7 @@ class SentimentTargets:
 
     def as_labeled_targets(self):
         from ..infra.LabeledTarget import LabeledTarget
-        return self.frame.apply(
-            lambda row: LabeledTarget.create(row=row, index_label=TARGET_SENTIMENT), axis=1)
+        return LabeledTarget.create(frame=self.__rows.read_frame(), index_label=TARGET_SENTIMENT)
 
     def as_labels(self):
         from ..infra.TsaLabels import TsaLabels
@@ -114,105 +168,136 @@ class SentimentTargets:
         else:
             output = self
 
-        output = output.get_frame().copy()
-        output.to_csv(path, columns=output_columns, index=False)
+        output.__rows.read_frame().to_csv(path, columns=output_columns, index=False)
 
     def shuffle(self):
-        result = self.frame.sample(frac=1, random_state=SentimentTargets.get_random_state())
-        return SentimentTargets(frame=result)
+        # the same order as frame.sample(frac=1, random_state=SentimentTargets.get_random_state())
+        positions = numpy.random.RandomState(SentimentTargets.get_random_state())\
+            .choice(self.get_num_targets(), size=self.get_num_targets(), replace=False)
+        return self.__select(positions)
 
     def add(self, other):
-        result = self.frame.append(other.frame)
-        return SentimentTargets(frame=result)
+        result = self.__rows.read_frame().append(other.get_frame())
+        return SentimentTargets(frame=result, copy=False)
 
     def add_property(self, property_name, property_value):
-        self.frame[property_name] = property_value
+        self.__rows.get_writable_frame()[property_name] = property_value
+        if property_name == SENTENCE_TEXT:
+            self.__sentence_index = None
 
     def sample_sentences(self, num_sentences):
-        sentences = self.get_sentences()
+        sentences = pd.Series(self.get_sentences())
         sampled_sentences = sentences.sample(n=num_sentences, random_state=SentimentTargets.get_random_state())
         sampled = self.select_sentences(sentences=sampled_sentences)
         return sampled
 
     def select_sentences(self, sentences):
-        result = self.frame[self.frame[SENTENCE_TEXT].isin(sentences)]
-        return SentimentTargets(frame=result)
-
-    def select_targets(self, required_sentiment=None, condition=None):
+        return self.__select(self.get_sentence_index().rows_mask(sentences))
+
+    def select_targets(self, required_sentiment=None, condition=None, filters=None):
+        '''
+        :param required_sentiment: A list of sentiments to select.
+        :param condition: A TargetFilter, or a function applied on each row that returns whether to select it.
+        Prefer a TargetFilter, which is evaluated on all the rows at once.
+        :param filters: A list of TargetFilter objects, that should all hold for a selected target.
+        :return: The targets that satisfy all given conditions, as a view that shares the rows of this object.
+        '''
+        from ..infra.TargetFilter import TargetFilter
+        target_filters = list(filters) if filters else []
         if required_sentiment is not None:
-            return SentimentTargets(
-                frame=self.frame[self.frame[TARGET_SENTIMENT].isin(required_sentiment)])
+            target_filters.append(TargetFilter.is_in(TARGET_SENTIMENT, required_sentiment))
+        if isinstance(condition, TargetFilter):
+            target_filters.append(condition)
         elif condition:
-            return SentimentTargets(
-                frame=self.frame[self.frame.apply(condition, axis=1)]
-            )
-        else:
+            target_filters.append(TargetFilter(lambda _: self.__rows.read_frame().apply(condition, axis=1), 'condition'))
+        if not target_filters:
             return self
+        return self.__select(TargetFilter.all_of(target_filters).mask(self.__rows))
 
     def update_sentiment(self, old, new):
-        is_old_sentiment = self.frame[TARGET_SENTIMENT] == old
-        self.frame.loc[is_old_sentiment, TARGET_SENTIMENT] = new
+        is_old_sentiment = (self.get_column(TARGET_SENTIMENT) == old).values
+        if is_old_sentiment.any():
+            frame = self.__rows.get_writable_frame()
+            frame.loc[is_old_sentiment, TARGET_SENTIMENT] = new
         return self
 
     def remove_sentences(self, sentences):
-        result = self.frame[~self.frame[SENTENCE_TEXT].isin(sentences)]
-        return SentimentTargets(sentiment_targets=result)
+        return self.__select(~self.get_sentence_index().rows_mask(sentences))
 
-    def sample_targets(self, num_targets_to_sample, required_sentiment_in_samples=None):
-        with_required_sentiment = self.select_targets(required_sentiment=required_sentiment_in_samples).frame
+    def sample_targets(self, num_targets_to_sample, required_sentiment_in_samples=None, random_state=None):
+        '''
+        :param random_state: The seed of the sampling, by default get_random_state().
+        '''
+        with_required_sentiment = self.select_targets(required_sentiment=required_sentiment_in_samples)
         if required_sentiment_in_samples is None:
             required_sentiment_in_samples = 'All'
-        num_available_targets = len(with_required_sentiment)
-        if num_available_targets == 0:
-            result = SentimentTargets(sentiment_targets=pd.DataFrame(columns=SentimentTargets.columns))
-        else:
-            num_targets_to_sample = min(num_targets_to_sample, num_available_targets)
-            sampled = with_required_sentiment.sample(n=num_targets_to_sample)
-            result = SentimentTargets(sentiment_targets=sampled)
+        num_available_targets = with_required_sentiment.get_num_targets()
+        result = with_required_sentiment.group_and_sample_targets(
+            group_column=None, num_targets_to_sample=num_targets_to_sample, random_state=random_state)
         logging.info(f'Sampled {result.get_num_targets()} targets with sentiment "{required_sentiment_in_samples}" '
                      f'from {num_available_targets} available targets.')
         return result
 
-    def group_and_sample_targets(self, group_column, num_targets_to_sample):
-        result = self.frame.groupby(group_column).apply(
-            lambda x:
-                SentimentTargets(sentiment_targets=x).
-                sample_targets(num_targets_to_sample=num_targets_to_sample)
-                .frame
-        )
-        return SentimentTargets(sentiment_targets=result)
+    def group_and_sample_targets(self, group_column, num_targets_to_sample, random_state=None):
+        '''
+        Sample the same number of targets from each group (stratum), or all the targets of a smaller group.
+        :param group_column: The column to group by, e.g. 'sentiment' or 'source', or 'confidence_bin' for the bins
+        of the confidence. None to sample from all the targets.
+        :param num_targets_to_sample: The number of targets to sample from each group, or a dictionary from a group
+        to its number of targets.
+        :param random_state: The seed of the sampling, by default get_random_state().
+        :return: The sampled targets, ordered by group.
+        '''
+        from ..infra.TargetSampler import TargetSampler
+        if random_state is None:
+            random_state = SentimentTargets.get_random_state()
+        if group_column is None:
+            strata = numpy.zeros(self.get_num_targets(), dtype=object)
+        else:
+            strata = TargetSampler.get_strata(self.__rows, group_column)
+        return self.__select(TargetSampler.stratified_positions(strata, num_targets_to_sample, random_state))
 
     def remove_targets(self, targets_to_remove):
-        from labeling.collected_utils import remove_rows
+        from ..infra.KeyIndex import KeyIndex
         num_targets_before_removal = self.get_num_targets()
-        targets_after_removal = remove_rows(
-            source=self.frame,
-            items_to_remove=targets_to_remove.frame,
+        targets_after_removal = KeyIndex.anti_join(
+            self.__rows.read_frame(),
+            targets_to_remove.get_frame(),
             key_columns=SentimentTargets.KEY_COLUMNS)
-        targets_after_removal = SentimentTargets(sentiment_targets=targets_after_removal)
+        targets_after_removal = SentimentTargets(frame=targets_after_removal, copy=False)
         num_targets_after_removal = targets_after_removal.get_num_targets()
         logging.info(f'Num targets: after removal: {num_targets_after_removal}, '
                      f'before removal: {num_targets_before_removal}')
         return targets_after_removal
 
+    def intersect(self, targets_to_keep):
+        '''
+        :return: The targets that are also in targets_to_keep (a SentimentTargets or TsaLabels object).
+        '''
+        from ..infra.KeyIndex import KeyIndex
+        return SentimentTargets(frame=KeyIndex.semi_join(
+            self.__rows.read_frame(),
+            targets_to_keep.get_frame(),
+            key_columns=SentimentTargets.KEY_COLUMNS), copy=False)
+
     def get_sentences(self):
-        sentences = pd.unique(self.frame[SENTENCE_TEXT])
-        return list(pd.Series(sentences))
+        return self.get_sentence_index().get_sentences()
 
     def get_num_sentences(self):
-        return len(self.get_sentences())
+        return len(self.get_sentence_index())
 
     def unique(self, use_sentiment=False):
         key_columns = SentimentTargets.KEY_COLUMNS.copy()
         if use_sentiment:
             key_columns += [TARGET_SENTIMENT]
-        return SentimentTargets(frame=self.frame.drop_duplicates(subset=key_columns))
+        keys = pd.DataFrame({column_name: self.get_column(column_name).values for column_name in key_columns})
+        return self.__select(~keys.duplicated().values)
 
     def get_num_targets(self):
-        return len(self.frame)
+        return len(self.__rows)
 
     def log_num_sentence_with_predictions(self, description=None):
-        num_sentences = len(self.get_sentences())
+        num_sentences = self.get_num_sentences()
         if description is not None:
             description = f'{description}: '
         else:
@@ -223,18 +308,21 @@ class SentimentTargets:
         if description:
             description = f'{description}: '
         logging.info(f'{description}Sentiment histogram\n'
-                     f'{self.frame[TARGET_SENTIMENT].value_counts(normalize=True)}')
+                     f'{self.get_column(TARGET_SENTIMENT).value_counts(normalize=True)}')
 
     def get_sentiment_counts(self):
-        return self.frame[TARGET_SENTIMENT].value_counts()
+        return self.get_column(TARGET_SENTIMENT).value_counts()
 
     def remove_labeled(self, labeled_sentiment_targets):
-        is_labeled = self.frame.apply(
-            lambda x: labeled_sentiment_targets.is_labeled(x['target_text'], x['text']), 1)
+        '''
+        Remove the targets whose target text is labeled in the same sentence, regardless of the target location.
+        '''
+        from ..infra.KeyIndex import KeyIndex
+        is_labeled = KeyIndex(
+            labeled_sentiment_targets.get_frame(), key_columns=[TARGET_TEXT, SENTENCE_TEXT]).contains(self.__rows)
         num_labeled = sum(is_labeled)
         logging.info(f'num_labeled: {num_labeled} targets out of {self.get_num_targets()}')
-        result_frame = self.frame[~is_labeled]
-        return SentimentTargets(sentiment_targets=result_frame)
+        return self.__select(~is_labeled)
 
     @staticmethod
     def get_random_state():
@@ -0,0 +1,116 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import numpy
+
+from yaso_tsa.infra.SentimentTargets import TARGET_TEXT, TARGET_BEGIN, TARGET_END
+
+
+class TargetFilter:
+
+    '''
+    A declarative condition on the rows of a targets frame, evaluated as one vectorized boolean mask.
+    Filters are combined with & (and), | (or) and ~ (not), e.g.:
+        TargetFilter.between('confidence', minimum=0.8) & ~TargetFilter.is_in('sentiment', ['none'])
+    '''
+
+    def __init__(self, compute_mask, description):
+        '''
+        :param compute_mask: A function from a frame to a boolean mask over its rows.
+        :param description: A readable description of the condition.
+        '''
+        self.compute_mask = compute_mask
+        self.description = description
+
+    def __repr__(self):
+        return f"<TargetFilter {self.description}>"
+
+    def mask(self, frame):
+        '''
+        :param frame: A frame, or a FrameView (which is not taken for evaluating the condition).
+        :return: A boolean numpy array, True for each row of the frame that satisfies the condition.
+        '''
+        if len(frame) == 0:
+            return numpy.zeros(0, dtype=bool)
+        return numpy.asarray(self.compute_mask(frame), dtype=bool)
+
+    def __and__(self, other):
+        return TargetFilter(
+            lambda frame: self.mask(frame) & other.mask(frame),
+            f'({self.description} and {other.description})')
+
+    def __or__(self, other):
+        return TargetFilter(
+            lambda frame: self.mask(frame) | other.mask(frame),
+            f'({self.description} or {other.description})')
+
+    def __invert__(self):
+        return TargetFilter(
+            lambda frame: ~self.mask(frame),
+            f'not {self.description}')
+
+    @staticmethod
+    def all_of(filters):
+        '''
+        :return: A filter that holds when all the given filters hold.
+        '''
+        def compute_mask(frame):
+            mask = numpy.ones(len(frame), dtype=bool)
+            for target_filter in filters:
+                mask &= target_filter.mask(frame)
+            return mask
+        return TargetFilter(compute_mask, ' and '.join(target_filter.description for target_filter in filters))
+
+    @staticmethod
+    def equals(column_name, value):
+        return TargetFilter(
+            lambda frame: (frame[column_name] == value).values,
+            f'{column_name} == {value!r}')
+
+    @staticmethod
+    def is_in(column_name, values):
+        values = list(values)
+        return TargetFilter(
+            lambda frame: frame[column_name].isin(values).values,
+            f'{column_name} in {values}')
+
+    @staticmethod
+    def between(column_name, minimum=None, maximum=None):
+        '''
+        A range condition on a numeric column, with inclusive bounds. A missing bound is not checked.
+        '''
+        def compute_mask(frame):
+            values = frame[column_name]
+            mask = numpy.ones(len(frame), dtype=bool)
+            if minimum is not None:
+                mask &= (values >= minimum).values
+            if maximum is not None:
+                mask &= (values <= maximum).values
+            return mask
+        return TargetFilter(compute_mask, f'{minimum} <= {column_name} <= {maximum}')
+
+    @staticmethod
+    def span_length(minimum=None, maximum=None):
+        '''
+        A range condition on the length of the target span (end - begin), with inclusive bounds.
+        '''
+        def compute_mask(frame):
+            lengths = frame[TARGET_END].astype(int) - frame[TARGET_BEGIN].astype(int)
+            mask = numpy.ones(len(frame), dtype=bool)
+            if minimum is not None:
+                mask &= (lengths >= minimum).values
+            if maximum is not None:
+                mask &= (lengths <= maximum).values
+            return mask
+        return TargetFilter(compute_mask, f'{minimum} <= span length <= {maximum}')
+
+    @staticmethod
+    def matches(pattern, column_name=TARGET_TEXT, case=True):
+        '''
+        A regular expression condition, that holds when the pattern is found in the column text.
+        '''
+        return TargetFilter(
+            lambda frame: frame[column_name].astype(str).str.contains(pattern, case=case, regex=True).values,
+            f'{column_name} matches {pattern!r}')
@@ -0,0 +1,169 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import logging
+import math
+import random
+
+import numpy
+import pandas as pd
+
+from yaso_tsa.infra.JsonRecordReader import JsonRecordReader
+from yaso_tsa.infra.SentimentTargets import SentimentTargets, SENTENCE_TEXT, TARGET_SENTIMENT, TARGET_SCORE, TARGETS
+
+CONFIDENCE_BIN = 'confidence_bin'
+DEFAULT_CONFIDENCE_BINS = [0, 0.7, 0.8, 0.9, 1.1]
+
+
+class Reservoir:
+
+    '''
+    A uniform sample of a fixed size from a stream of items of unknown length, using reservoir sampling
+    with geometric skips (Li's algorithm L), so random numbers are drawn only for the items that enter the sample.
+    '''
+
+    def __init__(self, size, random_generator: random.Random):
+        self.size = size
+        self.random_generator = random_generator
+        self.items = []
+        self.num_seen = 0
+        self.__weight = 1.0
+        self.__next_index = None
+
+    def add(self, item):
+        self.num_seen += 1
+        if len(self.items) < self.size:
+            self.items.append((self.num_seen, item))
+            if len(self.items) == self.size:
+                self.__skip()
+        elif self.num_seen == self.__next_index:
+            self.items[self.random_generator.randrange(self.size)] = (self.num_seen, item)
+            self.__skip()
+
+    def get_items(self):
+        '''
+        :return: The sampled items, in the order they were added.
+        '''
+        return [item for _, item in sorted(self.items, key=lambda x: x[0])]
+
+    def __uniform(self):
+        value = self.random_generator.random()
+        while value == 0:
+            value = self.random_generator.random()
+        return value
+
+    def __skip(self):
+        self.__weight *= math.exp(math.log(self.__uniform()) / self.size)
+        self.__next_index = self.num_seen + math.floor(math.log(self.__uniform()) / math.log(1 - self.__weight)) + 1
+
+
+class TargetSampler:
+
+    '''
+    Stratified sampling of targets, e.g., by sentiment, confidence bin or source, with deterministic seeds.
+    Targets are sampled either from a loaded frame, or directly from prediction files (json or jsonl) that are
+    read one record at a time, keeping in memory only the sampled targets.
+    '''
+
+    @staticmethod
+    def get_confidence_bins(confidence, bins=DEFAULT_CONFIDENCE_BINS):
+        '''
+        :return: The label of the bin of each confidence, e.g. '[0.7, 0.8)'. A confidence out of all bins has no bin.
+        '''
+        confidence = numpy.asarray(confidence, dtype=float)
+        bin_labels = numpy.array([f'[{low}, {high})' for low, high in zip(bins[:-1], bins[1:])] + [None], dtype=object)
+        bin_indexes = numpy.searchsorted(bins, confidence, side='right') - 1
+        is_out_of_bins = (bin_indexes < 0) | (bin_indexes >= len(bins) - 1) | numpy.isnan(confidence)
+        bin_indexes[is_out_of_bins] = len(bins) - 1
+        return bin_labels[bin_indexes]
+
+    @staticmethod
+    def get_strata(frame, stratify_by, confidence_bins=DEFAULT_CONFIDENCE_BINS):
+        '''
+        :param frame: A targets frame (or a FrameView).
+        :param stratify_by: A column name, or CONFIDENCE_BIN to stratify by the bins of the confidence column.
+        :return: The stratum of each row.
+        '''
+        if stratify_by == CONFIDENCE_BIN and CONFIDENCE_BIN not in frame.columns:
+            return TargetSampler.get_confidence_bins(frame[TARGET_SCORE], bins=confidence_bins)
+        return numpy.asarray(frame[stratify_by], dtype=object)
+
+    @staticmethod
+    def stratified_positions(strata, num_per_stratum, random_state=None):
+        '''
+        Sample rows uniformly within each stratum, without replacement.
+        :param strata: The stratum of each row.
+        :param num_per_stratum: The number of rows to sample from each stratum, or a dictionary from a stratum
+        to its number of rows. A stratum with fewer rows is fully sampled.
+        :param random_state: A seed, or a numpy RandomState.
+        :return: The positions of the sampled rows, grouped by stratum in order of first appearance.
+        '''
+        if not isinstance(random_state, numpy.random.RandomState):
+            random_state = numpy.random.RandomState(random_state)
+        codes, unique_strata = pd.factorize(numpy.asarray(strata, dtype=object), use_na_sentinel=False)
+        if isinstance(num_per_stratum, dict):
+            limits = numpy.array([num_per_stratum.get(stratum, 0) for stratum in unique_strata], dtype=numpy.int64)
+        else:
+            limits = numpy.full(len(unique_strata), num_per_stratum, dtype=numpy.int64)
+        # a random order of the rows, stably sorted by stratum, is a random order within each stratum
+        order = random_state.permutation(len(codes))
+        order = order[numpy.argsort(codes[order], kind='stable')]
+        sorted_codes = codes[order]
+        rank_in_stratum = numpy.arange(len(order)) - numpy.searchsorted(sorted_codes, sorted_codes, side='left')
+        return order[rank_in_stratum < limits[sorted_codes]]
+
+    @staticmethod
+    def get_record_stratum(sentence_record, target, stratify_by, confidence_bins=DEFAULT_CONFIDENCE_BINS):
+        if stratify_by == CONFIDENCE_BIN:
+            confidence = target.get(TARGET_SCORE)
+            confidence = numpy.nan if confidence is None else confidence
+            return TargetSampler.get_confidence_bins([confidence], bins=confidence_bins)[0]
+        if stratify_by == TARGET_SENTIMENT:
+            sentiment = target.get(TARGET_SENTIMENT)
+            return 'none' if sentiment == 'neutral' else sentiment
+        # a field of the target, or else of the sentence (e.g. its source)
+        return target.get(stratify_by, sentence_record.get(stratify_by))
+
+    @staticmethod
+    def sample_files(paths, num_per_stratum, stratify_by=None, seed=None, meta_fields=[],
+                     confidence_bins=DEFAULT_CONFIDENCE_BINS) -> SentimentTargets:
+        '''
+        Sample targets from prediction files, in a single pass over the files, without loading them.
+        :param paths: json or jsonl files of sentence records, in the format of the predictions file.
+        :param num_per_stratum: The number of targets to sample from each stratum (or from all the targets when
+        stratify_by is None), or a dictionary from a stratum to its number of targets.
+        :param stratify_by: A target field (e.g. 'sentiment'), CONFIDENCE_BIN, or a sentence field (e.g. 'source').
+        :param seed: The seed of the sampling. The same seed and files give the same sample.
+        :param meta_fields: Sentence fields to keep in the sampled targets.
+        :return: The sampled targets.
+        '''
+        if isinstance(paths, str):
+            paths = [paths]
+        random_generator = random.Random(seed)
+        reservoirs = {}
+        for path in paths:
+            for sentence_record in JsonRecordReader(path):
+                for target in sentence_record.get(TARGETS, []):
+                    stratum = None if stratify_by is None else TargetSampler.get_record_stratum(
+                        sentence_record, target, stratify_by, confidence_bins=confidence_bins)
+                    reservoir = reservoirs.get(stratum)
+                    if reservoir is None:
+                        size = num_per_stratum.get(stratum, 0) if isinstance(num_per_stratum, dict) else num_per_stratum
+                        reservoir = reservoirs[stratum] = Reservoir(size, random_generator)
+                    if reservoir.size > 0:
+                        reservoir.add((sentence_record, target))
+        sampled_records = []
+        for stratum, reservoir in reservoirs.items():
+            logging.info(f'Sampled {len(reservoir.items)} out of {reservoir.num_seen} targets '
+                         f'{"" if stratify_by is None else f"with {stratify_by} {stratum}"}')
+            sampled_records += [
+                {SENTENCE_TEXT: sentence_record[SENTENCE_TEXT],
+                 TARGETS: [target],
+                 **{meta_field: sentence_record.get(meta_field) for meta_field in meta_fields}}
+                for sentence_record, target in reservoir.get_items()
+            ]
+        if not sampled_records:
+            return SentimentTargets()
+        return SentimentTargets.from_json_records(sampled_records, meta_fields=meta_fields)
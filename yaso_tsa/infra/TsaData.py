@@ -7,6 +7,7 @@ import json
 import logging
 import pandas as pd
 
+from yaso_tsa.infra.SentenceIndex import SentenceIndex
 from yaso_tsa.infra.SentimentTargets import SentimentTargets, SENTENCE_TEXT, TARGET_TEXT, TARGET_BEGIN, TARGET_END, \
     TARGET_SENTIMENT, TARGETS
 
@@ -58,22 +59,32 @@ class TsaData:
                 }, ignore_index=True)
         result = TsaData(
             sentences=pd.DataFrame({SENTENCE_TEXT: sentence_texts}),
-            sentiment_targets=SentimentTargets(frame=sentiment_targets)
+            sentiment_targets=SentimentTargets(frame=sentiment_targets, copy=False)
         )
         logging.info(f'Loaded {result} from "{path}"')
         return result
 
     @staticmethod
     def read_json(path, meta_fields=[]):
-        sentiment_targets = SentimentTargets.read_json(path=path, meta_fields=meta_fields)
         with open(path, "rt", encoding="utf-8") as json_file:
-            json_contents = json.load(json_file)
-            sentences = pd.DataFrame()
-            for meta_field in [SENTENCE_TEXT] + meta_fields:
-                sources = [labeled_sentence[meta_field] for labeled_sentence in json_contents]
-                sentences[meta_field] = sources
-            logging.debug(f'Found {len(sentences)} sentences in json "{path}"')
-            return TsaData(sentiment_targets=sentiment_targets, sentences=sentences, name=path)
+            try:
+                json_contents = json.load(json_file)
+            except Exception as e:
+                raise RuntimeError(f'Cannot read from "{path}"', e)
+        result = TsaData.from_json_records(json_contents, meta_fields=meta_fields, name=path)
+        logging.debug(f'Found {result.get_num_sentences()} sentences in json "{path}"')
+        return result
+
+    @staticmethod
+    def from_json_records(json_contents, meta_fields=[], name=None):
+        '''
+        Create from a list of sentences in the json format, each with its text, targets and meta fields.
+        '''
+        sentiment_targets = SentimentTargets.from_json_records(json_contents, meta_fields=meta_fields)
+        sentences = pd.DataFrame()
+        for meta_field in [SENTENCE_TEXT] + meta_fields:
+            sentences[meta_field] = [labeled_sentence[meta_field] for labeled_sentence in json_contents]
+        return TsaData(sentiment_targets=sentiment_targets, sentences=sentences, name=name)
 
     @staticmethod
     def read_jsons(files, verbose=False, meta_fields=[]):
@@ -102,10 +113,34 @@ class TsaData:
                 raise ValueError('Missing column from sentences.')
             self.__sentences = sentences
         self.__name = name
+        # built on first use, see get_sentence_index() and get_has_targets_mask()
+        self.__sentence_index = None
+        self.__has_targets_mask = None
+
+    def __set_sentiment_targets(self, sentiment_targets: SentimentTargets):
+        self.__sentiment_targets = sentiment_targets
+        self.__has_targets_mask = None
+
+    def get_sentence_index(self) -> SentenceIndex:
+        '''
+        :return: The index of the input sentences, built on the first call.
+        '''
+        if self.__sentence_index is None:
+            self.__sentence_index = SentenceIndex(self.__sentences[SENTENCE_TEXT])
+        return self.__sentence_index
+
+    def get_has_targets_mask(self):
+        '''
+        :return: A boolean mask over the rows of the sentences frame, True for each sentence with targets.
+        '''
+        if self.__has_targets_mask is None:
+            sentences_with_targets = self.__sentiment_targets.get_sentence_index().sentences
+            self.__has_targets_mask = self.get_sentence_index().rows_mask(sentences_with_targets)
+        return self.__has_targets_mask
 
     def __repr__(self):
         return f"<TsaData {self.get_name()}, " \
-               f"targets: {self.__sentiment_targets}, # sentences: {len(self.get_sentences())}>"
+               f"targets: {self.__sentiment_targets}, # sentences: {self.get_num_sentences()}>"
 
     def get_name(self):
         return self.__name if self.__name else 'unnamed'
@@ -116,15 +151,24 @@ class TsaData:
     def get_sentences_frame(self):
         return self.__sentences
 
-    def select_targets(self, required_sentiment=None):
-        self.__sentiment_targets = self.__sentiment_targets.select_targets(required_sentiment)
+    def select_targets(self, required_sentiment=None, condition=None, filters=None):
+        '''
+        Keep only the targets that satisfy the conditions, see SentimentTargets.select_targets.
+        '''
+        self.__set_sentiment_targets(self.__sentiment_targets.select_targets(
+            required_sentiment=required_sentiment,
+            condition=condition,
+            filters=filters))
 
     def drop_duplicates(self):
-        self.__sentiment_targets = self.__sentiment_targets.unique(use_sentiment=True)
+        self.__set_sentiment_targets(self.__sentiment_targets.unique(use_sentiment=True))
 
     def get_sentences(self):
         return list(self.__sentences[SENTENCE_TEXT])
 
+    def get_num_sentences(self):
+        return len(self.__sentences)
+
     def select_first_sentences(
             self, num_to_select=None, percentage=None, select_from_start=True):
         sentences = self.get_sentences()
@@ -140,7 +184,7 @@ class TsaData:
 
     def select_sentences(self, sentences, new_name=""):
         selected_targets = self.__sentiment_targets.select_sentences(sentences)
-        selected_sentences = self.__sentences[self.__sentences[SENTENCE_TEXT].isin(sentences)]
+        selected_sentences = self.__sentences[self.get_sentence_index().rows_mask(sentences)]
         return TsaData(sentiment_targets=selected_targets, sentences=selected_sentences, name=new_name)
 
     def shuffle(self):
@@ -170,14 +214,19 @@ class TsaData:
                 result.update(to_dict(single_target))
             return result
 
-        sentences = self.get_sentiment_targets().get_frame()\
-            .groupby(SENTENCE_TEXT).apply(single_sentence_as_dictionary)
-        sentences_without_targets = self.get_sentences_without_targets()
-        for sentence in sentences_without_targets:
-            sentences[sentence] = {
-                SENTENCE_TEXT: sentence,
-                TARGETS: []
-            }
+        targets_frame = self.get_sentiment_targets().get_frame()
+        if targets_frame.empty:
+            sentences = pd.Series(dtype=object)
+        else:
+            sentences = targets_frame.groupby(SENTENCE_TEXT).apply(single_sentence_as_dictionary)
+        sentences_without_targets = pd.unique(self.__sentences[SENTENCE_TEXT][~self.get_has_targets_mask()])
+        sentences = pd.concat([
+            sentences,
+            pd.Series(
+                [{SENTENCE_TEXT: sentence, TARGETS: []} for sentence in sentences_without_targets],
+                index=sentences_without_targets,
+                dtype=object)
+        ])
         if shuffle:
             logging.info("Shuffling output")
             sentences = sentences.sample(frac=1)
@@ -190,10 +239,7 @@ class TsaData:
         return self.__sentiment_targets.get_sentences()
 
     def get_sentences_without_targets(self):
-        sentences_with_predictions = self.get_sentences_with_predictions()
-        all_sentences = self.get_sentences()
-        result = set(all_sentences).difference(sentences_with_predictions)
-        return result
+        return set(self.__sentences[SENTENCE_TEXT][~self.get_has_targets_mask()])
 
     def add(self, other):
         sentiment_targets = self.get_sentiment_targets().add(other.get_sentiment_targets())
@@ -222,6 +268,7 @@ class TsaData:
             files_to_remove = [files_to_remove]
         excluded_sentences = TsaData.read_jsons(files=files_to_remove).get_sentences()
         result = TsaData(json_path=file)
+        excluded_sentences = set(excluded_sentences)
         selected_sentences = [sentence for sentence in result.get_sentences() if sentence not in excluded_sentences]
         result = result.select_sentences(selected_sentences)
         return result
@@ -8,8 +8,10 @@ from typing import List
 import numpy
 import pandas as pd
 
+from yaso_tsa.infra.FrameView import FrameView
 from yaso_tsa.infra.LabeledCluster import LabeledCluster
 from yaso_tsa.infra.LabeledTarget import LabeledTarget
+from yaso_tsa.infra.SentenceIndex import SentenceIndex
 from yaso_tsa.infra.SentimentTargets import SentimentTargets, SENTENCE_TEXT, TARGET_TEXT, TARGET_SENTIMENT, \
     TARGET_BEGIN, TARGET_END
 from yaso_tsa.infra.TsaData import TsaData
@@ -26,6 +28,9 @@ DETECTION_MIXED = 'detected_mixed'
 
 DEFAULT_CONFIDENCE_THRESHOLD = 0.7
 
+# The prefixes (lower case) that extend_labels adds to and removes from the labeled targets
+EXTENSION_PREFIXES = ['the ']
+
 
 class TsaLabels:
 
@@ -37,83 +42,138 @@ class TsaLabels:
 
     @staticmethod
     def read_json(path, meta_fields=[]):
-        as_tsa_data = TsaData.read_json(path, meta_fields=meta_fields)
+        return TsaLabels.from_tsa_data(TsaData.read_json(path, meta_fields=meta_fields))
+
+    @staticmethod
+    def read_xml(path):
+        '''
+        :param path: A SemEval xml file (see TsaData.read_xml).
+        '''
+        return TsaLabels.from_tsa_data(TsaData.read_xml(path))
+
+    @staticmethod
+    def from_tsa_data(as_tsa_data: TsaData):
         sentiment_targets = as_tsa_data.get_sentiment_targets()
-        sentiment_targets.get_frame().rename(
-            columns=lambda x: x.replace('detected_by.', ''),
-            inplace=True
+        frame = sentiment_targets.get_frame().rename(
+            columns=lambda x: x.replace('detected_by.', '')
         )
         return TsaLabels(
-            frame=sentiment_targets.get_frame(),
+            frame=frame,
             sentences=as_tsa_data.get_sentences_frame()
         )
 
     def __init__(self, *, frame=None, sentences=pd.DataFrame(columns=[SENTENCE_TEXT])):
+        '''
+        :param frame: The labels frame. It is shared, and copied only before the labels are modified.
+        :param sentences: The labeled sentences frame.
+        '''
         if frame is None:
             frame = pd.DataFrame(
                 columns=SentimentTargets.KEY_COLUMNS + TsaLabels.LABEL_COLUMNS
             )
-        self.frame = frame
+        self.__rows = FrameView(frame, is_shared=True)
         self.sentences = sentences
 
+    @property
+    def sentences(self):
+        return self.__sentences
+
+    @sentences.setter
+    def sentences(self, sentences):
+        self.__sentences = sentences
+        # built on first use, see get_sentence_index()
+        self.__sentence_index = None
+
+    def get_sentence_index(self) -> SentenceIndex:
+        '''
+        :return: The index of the labeled sentences. It is built on the first call, and rebuilt when the
+        sentences are replaced.
+        '''
+        if self.__sentence_index is None:
+            self.__sentence_index = SentenceIndex(self.__sentences[SENTENCE_TEXT])
+        return self.__sentence_index
+
+    def __select(self, mask, sentences=None):
+        '''
+        :return: The selected labels, as a view that shares the rows of this object.
+        '''
+        result = TsaLabels(sentences=self.sentences if sentences is None else sentences)
+        result.__rows = self.__rows.select(mask)
+        return result
+
+    @property
+    def frame(self):
+        return self.__rows.get_frame()
+
+    @frame.setter
+    def frame(self, frame):
+        self.__rows = FrameView(frame)
+
     def __repr__(self):
         return f"<TsaLabels " \
                f"labeled: {self.get_num_labels()}, sentences: {self.get_num_sentences()}>"
 
     def empty(self):
-        return self.frame.empty and self.sentences.empty
+        return len(self.__rows) == 0 and self.sentences.empty
 
     def get_frame(self):
+        '''
+        :return: The labels frame, which should not be modified (see add_property).
+        '''
         return self.frame
 
+    def get_column(self, column_name):
+        return self.__rows.get_column(column_name)
+
     def get_sentences_frame(self):
         return self.sentences
 
     def get_num_labels(self):
-        return len(self.frame)
+        return len(self.__rows)
 
     def is_valid_target(self):
-        return self.frame[TARGET_SENTIMENT] != 'none'
+        return self.__rows.get_column(TARGET_SENTIMENT) != 'none'
 
     def get_valid_targets(self):
-        valid_targets = self.frame[self.is_valid_target()]
-        return TsaLabels(frame=valid_targets, sentences=self.sentences)
+        return self.__select(self.is_valid_target().values)
 
     def get_non_targets(self):
-        non_targets = self.frame[~self.is_valid_target()]
-        return TsaLabels(frame=non_targets, sentences=self.sentences)
+        return self.__select(~self.is_valid_target().values)
 
     def get_num_sentences(self):
-        return len(self.get_sentences())
+        return len(self.__sentences)
 
     def get_sentences(self):
-        return list(self.sentences[SENTENCE_TEXT])
+        return list(self.__sentences[SENTENCE_TEXT])
 
     def is_labeled(self, target_text, text):
-        return ((self.frame[TARGET_TEXT] == target_text) &
-                (self.frame[SENTENCE_TEXT] == text)).any()
+        return ((self.__rows.get_column(TARGET_TEXT) == target_text) &
+                (self.__rows.get_column(SENTENCE_TEXT) == text)).any()
 
     def as_labeled_spans(self):
-        if self.frame.empty:
-            return []
-        else:
-            return self.frame.apply(lambda x: LabeledTarget.create(row=x), axis=1)
+        return LabeledTarget.create(frame=self.__rows.read_frame())
 
     def as_labeled_clusters(self) -> List[LabeledCluster]:
-        labeled_targets = self.frame.groupby(SENTENCE_TEXT).apply(
+        labeled_targets = self.__rows.read_frame().groupby(SENTENCE_TEXT).apply(
             lambda x: LabeledTarget.create(frame=x))
         result = labeled_targets.apply(LabeledCluster.create_clusters)
         result = result.values
         result = numpy.hstack(result) if len(result) > 0 else result
         return result
 
+    def get_cluster_frames(self):
+        '''
+        :return: (clusters, members) frames of the clusters of the valid targets, see LabeledCluster.get_cluster_frames.
+        '''
+        return LabeledCluster.get_cluster_frames(self.get_valid_targets().get_frame())
+
     def shuffle(self):
         """
         Shuffle the order of the labels and the sentences.
         :return: A shuffled TsaLabels object.
         """
         return TsaLabels(
-            frame=self.frame.sample(frac=1),
+            frame=self.__rows.read_frame().sample(frac=1),
             sentences=self.sentences.sample(frac=1)
         )
 
@@ -135,7 +195,7 @@ class TsaLabels:
                 self.select_sentences(second_split_sentences)]
 
     def to_csv(self, path, shuffle=False):
-        output = self.frame
+        output = self.__rows.read_frame()
         if shuffle:
             output = output.sample(frac=1)
         output.to_csv(path)
@@ -166,50 +226,59 @@ class TsaLabels:
             return result
 
         from yaso_tsa.infra.TsaData import TsaData
-        as_tsa_data = TsaData(SentimentTargets(frame=self.frame), sentences=self.sentences)
+        as_tsa_data = TsaData(SentimentTargets(frame=self.__rows.read_frame(), copy=False), sentences=self.sentences)
         as_tsa_data.to_json(path, to_dict=to_dict, shuffle=shuffle)
 
     def add_detection_annotations(self, detection_annotations):
-        self.frame = self.frame.merge(
+        self.frame = self.__rows.read_frame().merge(
             right=detection_annotations,
             on=SentimentTargets.KEY_COLUMNS
         )
 
     def get_answer_counts(self, normalize=False):
-        result = self.frame[TARGET_SENTIMENT].value_counts(normalize=normalize)
+        result = self.__rows.get_column(TARGET_SENTIMENT).value_counts(normalize=normalize)
 
         if normalize:
             result = result.rename(lambda x: f'% {x}')
         return result
 
     def add_property(self, property_name, property_value):
-        self.frame[property_name] = property_value
+        self.__rows.get_writable_frame()[property_name] = property_value
 
     def add_sentence_property(self, property_name, property_value):
         self.sentences[property_name] = property_value
 
     def append(self, other):
         return TsaLabels(
-            frame=self.frame.append(other.frame, ignore_index=True),
+            frame=self.__rows.read_frame().append(other.get_frame(), ignore_index=True),
             sentences=self.sentences.append(other.sentences, ignore_index=True)
         )
 
     def add_confidence_bin(self, bins=[0, 0.7, 0.8, 0.9, 1.1]):
-        self.frame['confidence_bin'] = pd.cut(
-            self.frame[TARGET_CONFIDENCE].copy(),
+        frame = self.__rows.get_writable_frame()
+        frame['confidence_bin'] = pd.cut(
+            frame[TARGET_CONFIDENCE].copy(),
             include_lowest=True,
             right=False,
             bins=bins
         )
 
-    def sample_by_confidence(self, num_to_sample):
-        sampled_frame = self.frame.groupby('confidence_bin').apply(
-            lambda d: d.sample(n=num_to_sample)).reset_index(drop=True)
-        return TsaLabels(frame=sampled_frame)
+    def sample_by_confidence(self, num_to_sample, random_state=None):
+        '''
+        Sample the same number of labels from each confidence bin (see add_confidence_bin), or all the labels of
+        a bin with fewer labels.
+        :param random_state: The seed of the sampling, by default SentimentTargets.get_random_state().
+        '''
+        from yaso_tsa.infra.TargetSampler import TargetSampler, CONFIDENCE_BIN
+        if random_state is None:
+            random_state = SentimentTargets.get_random_state()
+        strata = TargetSampler.get_strata(self.__rows, CONFIDENCE_BIN)
+        sampled = self.__rows.select(TargetSampler.stratified_positions(strata, num_to_sample, random_state))
+        return TsaLabels(frame=sampled.read_frame().reset_index(drop=True))
 
     def get_confidence_counts(self, bins=[0, 0.7, 0.8, 0.9, 1.1], normalize=False):
         result = pd.cut(
-            self.frame[TARGET_CONFIDENCE],
+            self.__rows.get_column(TARGET_CONFIDENCE),
             include_lowest=True,
             right=False,
             bins=bins
@@ -219,17 +288,13 @@ class TsaLabels:
         return result
 
     def select_sentences(self, sentences):
-        return TsaLabels(
-            frame=self.frame[self.frame[SENTENCE_TEXT].isin(sentences)],
-            sentences=self.sentences[self.sentences[SENTENCE_TEXT].isin(sentences)]
+        return self.__select(
+            self.__rows.get_column(SENTENCE_TEXT).isin(sentences).values,
+            sentences=self.sentences[self.get_sentence_index().rows_mask(sentences)]
         )
 
     def get_targets_with_confidence(self, confidence_condition):
-        selected = self.frame[confidence_condition(self.frame[TARGET_CONFIDENCE])]
-        return TsaLabels(
-            frame=selected,
-            sentences=self.get_sentences_frame()
-        )
+        return self.__select(numpy.asarray(confidence_condition(self.__rows.get_column(TARGET_CONFIDENCE))))
 
     def get_high_confidence_labels(self, confidence_threshold=DEFAULT_CONFIDENCE_THRESHOLD):
         return self.get_targets_with_confidence(lambda confidence: confidence >= confidence_threshold)
@@ -238,24 +303,52 @@ class TsaLabels:
         return self.get_targets_with_confidence(lambda confidence: confidence < confidence_threshold)
 
     def remove_targets_from_domain(self, domain):
-        self.frame = self.frame[self.frame['domain'] != domain]
+        frame = self.__rows.read_frame()
+        self.frame = frame[frame['domain'] != domain]
 
     def remove(self, other):
-        from labeling.collected_utils import remove_rows
-        result = remove_rows(
-            source=self.frame,
-            items_to_remove=other.frame,
+        from yaso_tsa.infra.KeyIndex import KeyIndex
+        result = KeyIndex.anti_join(
+            self.__rows.read_frame(),
+            other.get_frame(),
             key_columns=SentimentTargets.KEY_COLUMNS)
         return TsaLabels(frame=result)
 
+    def intersect(self, other):
+        '''
+        :return: The labels of targets that are also in other (a TsaLabels or SentimentTargets object).
+        '''
+        from yaso_tsa.infra.KeyIndex import KeyIndex
+        result = KeyIndex.semi_join(
+            self.__rows.read_frame(),
+            other.get_frame(),
+            key_columns=SentimentTargets.KEY_COLUMNS)
+        return TsaLabels(frame=result, sentences=self.sentences)
+
     def as_sentiment_targets(self, extra_columns=[]):
         returned_columns = SentimentTargets.KEY_COLUMNS + [TARGET_SENTIMENT] + extra_columns
-        sentiment_targets_frame = self.frame[returned_columns].copy()
-        return SentimentTargets(frame=sentiment_targets_frame)
+        sentiment_targets_frame = self.__rows.read_frame()[returned_columns].copy()
+        return SentimentTargets(frame=sentiment_targets_frame, copy=False)
 
     def extend_labels(self):
-        result = self.extend_labels_by_removing_prefix(prefix='the ')
-        result = result.extend_lables_by_including_prefix(prefix='the ')
+        result = self
+        for prefix in EXTENSION_PREFIXES:
+            result = result.extend_labels_by_removing_prefix(prefix=prefix)
+            result = result.extend_lables_by_including_prefix(prefix=prefix)
+        return result
+
+    @staticmethod
+    def normalize_target_texts(target_texts):
+        '''
+        Normalize target texts by the rules of extend_labels, so that a target and its extensions have the same
+        normalized text: lower case, with single spaces, and without a leading extension prefix. For example,
+        "The  Battery life" is normalized to "battery life".
+        :return: A series of the normalized texts.
+        '''
+        result = pd.Series(target_texts, dtype=object).str.lower().str.split().str.join(' ')
+        for prefix in EXTENSION_PREFIXES:
+            has_prefix = result.str.startswith(prefix)
+            result = result.where(~has_prefix, result.str.slice(len(prefix)))
         return result
 
     def extend_labels_by_removing_prefix(self, prefix):
@@ -266,7 +359,7 @@ class TsaLabels:
         :return:
             A TsaLabels() object containing the union of the original labels and the extended labels.
         '''
-        target_starts_with_prefix = self.frame[TARGET_TEXT].str.lower().str.startswith(prefix)
+        target_starts_with_prefix = self.__rows.get_column(TARGET_TEXT).str.lower().str.startswith(prefix)
         return self._add_new_offseted_labels(target_starts_with_prefix, offset=len(prefix))
 
     def extend_lables_by_including_prefix(self, prefix):
@@ -288,15 +381,15 @@ class TsaLabels:
                     return True
             return False
 
-        with_prefix = self.frame.apply(has_prefix, axis=1)
+        with_prefix = self.__rows.read_frame().apply(has_prefix, axis=1)
         return self._add_new_offseted_labels(with_prefix, offset=-len(prefix))
 
     def _add_new_offseted_labels(self, labels_to_add, offset):
-        new_labels = self.frame[labels_to_add].copy()
+        new_labels = self.__rows.read_frame()[labels_to_add].copy()
         new_labels[TARGET_BEGIN] = new_labels[TARGET_BEGIN].apply(lambda x: x + offset)
         new_labels[TARGET_TEXT] = new_labels.apply(
             lambda row: row[SENTENCE_TEXT][row[TARGET_BEGIN]:row[TARGET_END]], axis=1, result_type='reduce')
-        extended_frame = pd.concat([self.frame, new_labels], ignore_index=True)
+        extended_frame = pd.concat([self.__rows.read_frame(), new_labels], ignore_index=True)
         # keep the first duplicate, which is an the original label
         # So, for example, if both "The <X>" and <X>" are originally labeled,
         # the extension of the label from "The <X>" to <X> is discarded, and the original label for <X> is kept.
@@ -0,0 +1,47 @@
+# © Copyright IBM Corporation 2021.
+#
+# LICENSE: Apache License 2.0 (Apache-2.0)
+# http://www.apache.org/licenses/LICENSE-2.0
+
+import argparse
+import logging
+
+logging.basicConfig(format='[%(threadName)s] %(asctime)s,%(msecs)d %(levelname)-8s [%(filename)s:%(lineno)d] %(message)s',
+                    datefmt='%Y-%m-%d:%H:%M:%S',
+                    level=logging.INFO)
+
+DEFAULT_SEED = 888
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Sample targets from prediction files (json or jsonl), without loading the files.')
+    parser.add_argument('--predictions_path', action='append', required=True,
+                        help='path to a predictions json or jsonl file, may be repeated')
+    parser.add_argument('--output_path', required=True, help='path of the output csv file')
+    parser.add_argument('--num_to_sample', type=int, required=True,
+                        help='number of targets to sample (from each stratum, when stratified)')
+    parser.add_argument('--stratify_by', default=None,
+                        help='a target field (e.g. sentiment), confidence_bin, or a sentence field (e.g. source)')
+    parser.add_argument('--meta_field', action='append', default=[],
+                        help='a sentence field to keep in the output, may be repeated')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help=f'sampling seed (default: {DEFAULT_SEED})')
+    args = parser.parse_args()
+
+    # imported here, so that parsing the arguments (or failing to) does not wait for pandas to load
+    from yaso_tsa.infra.TargetSampler import TargetSampler
+
+    sampled = TargetSampler.sample_files(
+        args.predictions_path,
+        num_per_stratum=args.num_to_sample,
+        stratify_by=args.stratify_by,
+        seed=args.seed,
+        meta_fields=args.meta_field)
+    extra_columns = [column_name for column_name in sampled.get_frame().columns
+                     if column_name not in sampled.MANDATORY_COLUMNS]
+    sampled.to_csv(args.output_path, extra_columns=extra_columns, with_sentiment=True, shuffle=False)
+    logging.info(f'Wrote {sampled} to "{args.output_path}"')
+
+
+if __name__ == '__main__':
+    main()